@@ -7,34 +7,34 @@ Required properties and methods for child classes prior to initialization:
     The surface connectivity graph (networkx.Graph instance) property with name 'surfaceConGraph'
         The nodes are the atom entries
     The positive direction of the surface(numpy.array instance) named 'positiveDir'
+    The surface detection mode of SubstrateLattice named 'surfaceMode'
     The active site list (list() instance) named 'sites'
     The adjacency of the sites (networkx.Graph() instance) named 'siteAdjacency'
+    The minimum image method for displacement vectors named 'minimumImage'
+    The periodic image translations ((s,3) numpy.array instance) property named 'imageShifts'
+    The method returning the image translations within a distance named 'imageShiftsWithin'
+    The symmetry of the surface (SurfaceSymmetry instance) property named 'surfaceSymmetry'
+        only used if useSymmetry is True
 """
 
 #import networkx as nx
 import numpy as np
-from scipy.optimize import minimize,NonlinearConstraint
+
+from ..Utilities.CellList import neighbourPairs
 
 #from CO2RRfragGen.ActiveSite.MonodentateAS import MonodentateAS as MonoAS
 #from CO2RRfragGen.Utilities.UtilFunctions import con2graph
 
 
-class NormSquareFitFunction(object):
-    #calculates the sum of squared dot between input vector and a collection of vectors
-    def __init__(self,vecs):
-        self.vecs = vecs
-
-    def __call__(self,inputVec):
-        residual = 0.0
-        for v in self.vecs:
-            residual += (np.dot(inputVec,v))**2
-        return residual
-
-
 
 
 
 class ASMixin(object):
+    #whether the symmetry of the surface is detected (see SurfaceSymmetry)
+    #   the atom normals are then fitted once per orbit and the sites are
+    #   labelled with their orbit, at the cost of the symmetry detection
+    useSymmetry = False
+
     def __init__(self):
         """
         The mixin base class
@@ -45,6 +45,23 @@ class ASMixin(object):
 
     def buildMASAdjacency(self,adjThresh = 1.):
         #any Monodentate Active Site whose origin are shorter than originThresh are connected
+        asList,pairI,pairJ,pairShifts = self.adjacentSitePairs(adjThresh)
+        for asite in asList:
+            self.siteAdjacency.add_node(asite)
+        self.siteAdjacency.add_edges_from((asList[i],asList[j]) for i,j in zip(pairI,pairJ))
+        #kept to pair the sites of supercells, see adjacentSitePairs
+        self.adjThresh = adjThresh
+
+    def adjacentSitePairs(self,adjThresh=None,allImages=False):
+        #the pairs of adjacent Monodentate Active Sites
+        #input - adjThresh: defaults to the threshold the adjacency was built with
+        #        allImages: if True, every periodic image of a site within the
+        #                   threshold is paired, including the images of a site
+        #                   itself, as needed to tile the sites of a small cell
+        #output - (asList,i,j,shifts), asList[j] translated by shifts[k] is
+        #           adjacent to asList[i] for the k-th pair
+        if adjThresh is None:
+            adjThresh = self.adjThresh
         #The 1.01 scaling factor ensures adjacent V sites are connected
         maxThresh = adjThresh*1.01
         #the minimum thresh aims to prevent ASs with the same origin to be adjacent
@@ -64,22 +81,19 @@ class ASMixin(object):
 
         asList = [asite for asite in self.sites\
                    if asite.type in [asite.V,asite.E,asite.F]]
-        for asite in asList:
-            self.siteAdjacency.add_node(asite)
-        for i in range(len(asList)):
-            site_i = asList[i]
-            for j in range(i+1,len(asList)):
-                site_j = asList[j]
-                #distance between the two AS's origin
-                dist_ij = np.linalg.norm(site_i.origin - site_j.origin)
-                if site_i.type == site_i.V and site_j.type == site_j.V:
-                    #V-V type pair
-                    upperBound = maxThresh
-                else:
-                    upperBound = maxThresh*maxScale
-                lowerBound = minThresh
-                if lowerBound<dist_ij <upperBound:
-                    self.siteAdjacency.add_edge(site_i,site_j)
+
+        origins = np.array([asite.origin for asite in asList],dtype=float).reshape(-1,3)
+        isVertex = np.array([asite.type == asite.V for asite in asList],dtype=bool)
+        #candidate pairs within the largest threshold from a cell list
+        #   the distance of each pair is that of the nearest periodic image
+        shifts = self.imageShiftsWithin(maxThresh) if allImages else self.imageShifts
+        pairI,pairJ,shiftIndex,dists = neighbourPairs(origins,maxThresh,shifts=shifts,
+                                                      allImages=allImages)
+        #V-V type pairs use the full threshold
+        upperBound = np.where(isVertex[pairI] & isVertex[pairJ],maxThresh,maxThresh*maxScale)
+        lowerBound = minThresh
+        adjacent = (lowerBound<dists) & (dists<upperBound)
+        return asList,pairI[adjacent],pairJ[adjacent],shifts[shiftIndex[adjacent]].reshape(-1,3)
 
     # @staticmethod
     # def findNormal(vecs,positiveDirection=(0,0,1)):
@@ -121,35 +135,115 @@ class ASMixin(object):
                  in numpy.array
         positiveDirection - the direction the resulting vector aligns with.
          """
-        pdir = positiveDirection
-        normalVec = np.cross(vecs[0],vecs[1])
-        nVecNorm = np.linalg.norm(normalVec)
-        if nVecNorm < 0.01:
-            normalVec = pdir
-            normalVec /= np.linalg.norm(pdir)
-        
-        if len(vecs) == 2:
-            if np.dot(normalVec,pdir) < 0:
-                normalVec *= -1
-            return normalVec
-        else:
-            #find the best normal vector of length 1
-            nsfc = NormSquareFitFunction(vecs)
-            nVecGuess = normalVec
-            nVecConstrain = NonlinearConstraint(lambda x:np.linalg.norm(x),0.99,1.01)
-            optResult = minimize(nsfc,nVecGuess,constraints=[nVecConstrain])
-            optVec = optResult.x
-            if np.dot(optVec,pdir) < 0:
-                optVec *= -1
-            optVec /= np.linalg.norm(optVec)
-            return optVec
-            
+        return ASMixin.findNormals([vecs],positiveDirection=positiveDirection)[0]
+
+    @staticmethod
+    def findNormals(vecSets,positiveDirection=(0,0,1),coneAxis=False):
+        """
+        Batched findNormal
+        vecSets - a list of vector sets, each an array-like of shape (k,3)
+        positiveDirection - the direction the resulting vectors align with
+        coneAxis - whether sets on a cone below the atom (e.g. adatoms) may use
+                    the cone axis, see below
+        output - (n,3) array, the unit vector minimizing the sum of squared dot
+                    products with each set, i.e. the eigenvector of the smallest
+                    eigenvalue of sum(v v^T), found with one stacked eigh per set size
+                 sets of 2 vectors use their cross product, sets spanning no
+                    plane fall back to positiveDirection
+                 with coneAxis, sets use the opposite of their mean instead if
+                    it is closer to positiveDirection
+        """
+        pdir = np.asarray(positiveDirection,dtype=float)
+        pdir = pdir/np.linalg.norm(pdir)
+        normals = np.tile(pdir,(len(vecSets),1))
+        bySize = {}
+        for n,vecs in enumerate(vecSets):
+            bySize.setdefault(len(vecs),[]).append(n)
+        for size,members in bySize.items():
+            if size < 2:
+                continue
+            vecs = np.array([np.asarray(vecSets[n],dtype=float).reshape(size,3) for n in members])
+            if size == 2:
+                normalVecs = np.cross(vecs[:,0],vecs[:,1])
+                norms = np.linalg.norm(normalVecs,axis=-1)
+                planar = norms >= 0.01
+                normalVecs[planar] /= norms[planar,None]
+                normalVecs[~planar] = pdir
+            else:
+                #eigenvalues in ascending order, eigenvectors in columns
+                evals,evecs = np.linalg.eigh(np.einsum('mki,mkj->mij',vecs,vecs))
+                normalVecs = evecs[:,:,0]
+                #nearly collinear sets leave a plane of candidate normals,
+                #   take the direction in it closest to positiveDirection
+                collinear = evals[:,1] < 1e-6*np.maximum(evals[:,2],1e-12)
+                if collinear.any():
+                    axis = evecs[collinear,:,2]
+                    projected = pdir - (axis @ pdir)[:,None]*axis
+                    norms = np.linalg.norm(projected,axis=-1)
+                    projected[norms > 1e-6] /= norms[norms > 1e-6,None]
+                    projected[norms <= 1e-6] = normalVecs[collinear][norms <= 1e-6]
+                    normalVecs[collinear] = projected
+            flip = normalVecs @ pdir < 0
+            normalVecs[flip] *= -1
+            if coneAxis:
+                #an atom standing on its neighbours (e.g. an adatom) has them on a cone,
+                #   whose axis, pointing away from them, is the normal the plane fit misses
+                away = -vecs.mean(axis=1)
+                awayNorms = np.linalg.norm(away,axis=-1)
+                protruding = awayNorms > 0.1
+                away[protruding] /= awayNorms[protruding,None]
+                protruding &= away @ pdir > normalVecs @ pdir
+                normalVecs[protruding] = away[protruding]
+            normals[members] = normalVecs
+        return normals
+
+    def surfaceAtomNormals(self):
+        """
+        The normal direction at every surface atom, computed once and cached
+        With useSymmetry, the neighbour vectors are only fitted for one atom per
+            symmetry orbit, the normals of the others are the fitted ones rotated
+            onto them
+        output - dict, surface atom data entry -> unit normal (np.array)
+        """
+        normals = getattr(self,'_surfaceAtomNormals',None)
+        if normals is None:
+            #adatoms only occur on surfaces detected by coordination
+            coneAxis = self.surfaceMode == 'coordination'
+            if self.useSymmetry:
+                symmetry = self.surfaceSymmetry
+                atoms = symmetry.atoms
+                vecSets = [self.findNeighbourVecs(atoms[rep]) for rep in symmetry.representatives]
+                repNormals = self.findNormals(vecSets,positiveDirection=self.positiveDir,
+                                              coneAxis=coneAxis)
+                normalVecs = np.einsum('aij,aj->ai',symmetry.orbitRotations,
+                                       repNormals[symmetry.atomOrbits].reshape(-1,3))
+            else:
+                atoms = list(self.surfaceConGraph.nodes())
+                vecSets = [self.findNeighbourVecs(atom) for atom in atoms]
+                normalVecs = self.findNormals(vecSets,positiveDirection=self.positiveDir,
+                                              coneAxis=coneAxis)
+            normals = dict(zip(atoms,normalVecs))
+            self._surfaceAtomNormals = normals
+        return normals
+
+    def labelSiteOrbits(self):
+        """
+        Set the orbit label of every site bound to the surface
+        Sites with the same label are mapped onto each other by a symmetry
+            of the surface, so their environment only needs to be looked at once
+        """
+        sites = [asite for asite in self.sites
+                 if all(atom in self.surfaceSymmetry.atomIndex for atom in asite.boundAtoms)]
+        for asite,orbit in zip(sites,self.surfaceSymmetry.siteOrbits(sites)):
+            asite.orbit = int(orbit)
 
 
     def findNeighbourVecs(self,atom):
         """
         Given a surface atom
         Find the vectors pointing from itself to its neighbour atoms
+        The vectors point to the nearest image of each neighbour, so atoms at
+            the cell boundary see the same neighbours as those inside
 
         input - atom: the data entry of a surface atom (starting from 1)
         output - a list of np.array instances pointing to its neighbours
@@ -159,7 +253,7 @@ class ASMixin(object):
         neighbours = self.surfaceConGraph.neighbors(atom)
         for neibr in neighbours:
             neiCoord = np.array(neibr.coordinate)
-            neiVec = neiCoord - centerCoord
+            neiVec = self.minimumImage(neiCoord - centerCoord)
             neiVec /= np.linalg.norm(neiVec)
             neibrVecs.append(neiVec)
         return neibrVecs
\ No newline at end of file
@@ -9,6 +9,7 @@ Required properties and methods for child classes prior to initialization:
     The positive direction of the surface(numpy.array instance) named 'positiveDir'
     The active site list (list() instance) named 'sites'
     The adjacency of the sites (networkx.Graph() instance) named 'siteAdjacency'
+    The minimum image method for displacement vectors named 'minimumImage'
 """
 import numpy as np
 
@@ -33,27 +34,27 @@ class EdgeASMixin(ASMixin):
         if hasattr(self,'eInitialized'):
             return None
         
-        for edge in self.surfaceConGraph.edges():
-            atom1,atom2 = edge
-            atom1Coord = np.array(atom1.coordinate)
-            atom2Coord = np.array(atom2.coordinate)
-            middlePoint = 0.5*(atom1Coord+atom2Coord)
-
-            #find the normal direction of the active site
-            a1NeibrVecs = self.findNeighbourVecs(atom1)
-            a2NeibrVecs = self.findNeighbourVecs(atom2)
-            a1Norm = super().findNormal(a1NeibrVecs)
-            a2Norm = super().findNormal(a2NeibrVecs)
-            enorm = a1Norm+a2Norm
-            enorm /= np.linalg.norm(enorm)
+        edges = list(self.surfaceConGraph.edges())
+        if len(edges) == 0:
+            self.eInitialized = True
+            return None
 
-            #find the origin of the site
-            origin = middlePoint + enorm * surfDistance
+        #the geometry of all edges as arrays
+        #   the normal of an edge is the mean of the normals of its atoms
+        atomNormals = self.surfaceAtomNormals()
+        atom1Coords = np.array([np.array(atom1.coordinate) for atom1,atom2 in edges],dtype=float)
+        atom2Coords = np.array([np.array(atom2.coordinate) for atom1,atom2 in edges],dtype=float)
+        #bonds across a periodic boundary join the nearest image of the second atom
+        atom2Coords = atom1Coords + self.minimumImage(atom2Coords - atom1Coords)
+        middlePoints = 0.5*(atom1Coords+atom2Coords)
+        enorms = np.array([atomNormals[atom1]+atomNormals[atom2] for atom1,atom2 in edges])
+        enorms /= np.linalg.norm(enorms,axis=-1)[:,None]
+        origins = middlePoints + enorms*surfDistance
+        etangents = atom1Coords - atom2Coords
+        etangents /= np.linalg.norm(etangents,axis=-1)[:,None]
 
-            #find the tangental direction
-            #two directions can be found
-            etangentF = atom1Coord - atom2Coord
-            etangentF /= np.linalg.norm(etangentF)
+        for (atom1,atom2),origin,enorm,etangentF in zip(edges,origins,enorms,etangents):
+            #two tangental directions can be found
             activeSiteF = MonoAS(siteType=MonoAS.EDGE,
                                 origin= origin,
                                 normalDir = enorm,
@@ -62,8 +63,7 @@ class EdgeASMixin(ASMixin):
             self.sites.append(activeSiteF)
 
             if C2Adsorbate is False:
-                etangentB = atom2Coord - atom1Coord
-                etangentB /= np.linalg.norm(etangentB)
+                etangentB = -etangentF
                 activeSiteB = MonoAS(siteType=MonoAS.EDGE,
                                     origin= origin,
                                     normalDir = enorm,
@@ -9,7 +9,10 @@ Required properties and methods for child classes prior to initialization:
     The positive direction of the surface(numpy.array instance) named 'positiveDir'
     The active site list (list() instance) named 'sites'
     The adjacency of the sites (networkx.Graph() instance) named 'siteAdjacency'
+    The minimum image method for displacement vectors named 'minimumImage'
 """
+from itertools import combinations
+
 import networkx as nx
 import numpy as np
 
@@ -76,6 +79,93 @@ class FaceASMixin(ASMixin):
 
 
 
+    def findFaces(self,edgePerFace=(3,)):
+        #the faces of the surface graph with a number of edges in edgePerFace
+        #   a face is a chordless cycle, listed once in the order of its atoms
+        #   triangles and squares are listed from the common neighbours of
+        #   adjacent atoms, in time linear in the number of surface atoms
+        #   larger faces fall back to nx.chordless_cycles
+        #output - list of lists of surface atoms
+        graph = self.surfaceConGraph
+        order = {atom:n for n,atom in enumerate(graph.nodes())}
+        #neighbours in node order, so that the faces come out in a fixed order
+        neighbours = {atom:sorted(graph.neighbors(atom),key=order.get) for atom in graph}
+        neighbourSets = {atom:set(neis) for atom,neis in neighbours.items()}
+
+        faces = []
+        for u in graph:
+            #u is the first atom in node order of every face listed here
+            later = [v for v in neighbours[u] if order[v] > order[u]]
+            if 3 in edgePerFace:
+                for v in later:
+                    for w in neighbours[v]:
+                        if order[w] > order[v] and w in neighbourSets[u]:
+                            faces.append([u,v,w])
+            if 4 in edgePerFace:
+                for v,x in combinations(later,2):
+                    if x in neighbourSets[v]:
+                        continue
+                    for w in neighbours[v]:
+                        if (order[w] > order[u] and w in neighbourSets[x]
+                                and w not in neighbourSets[u]):
+                            faces.append([u,v,w,x])
+
+        larger = [n for n in edgePerFace if n > 4]
+        if len(larger) > 0:
+            for cycle in nx.chordless_cycles(graph,length_bound=max(larger)):
+                if len(cycle) in larger:
+                    faces.append(cycle)
+        return self._closedFaces(faces)
+
+    def _closedFaces(self,faces):
+        #drop the cycles winding around a periodic direction of a small cell
+        #   their bonds, taken to the nearest images, do not add up to zero
+        isClosed = np.ones(len(faces),dtype=bool)
+        bySize = {}
+        for n,face in enumerate(faces):
+            bySize.setdefault(len(face),[]).append(n)
+        for size,members in bySize.items():
+            coords = np.array([[np.array(atom.coordinate) for atom in faces[n]] for n in members],
+                              dtype=float).reshape(len(members),size,3)
+            steps = self.minimumImage(np.roll(coords,-1,axis=1) - coords)
+            isClosed[members] = np.linalg.norm(steps.sum(axis=1),axis=-1) < 1e-3
+        return [face for face,closed in zip(faces,isClosed) if closed]
+
+    def faceGeometry(self,cycles,surfDistance=1.0):
+        #the site geometry over each face, computed per face size in arrays
+        #input - cycles: lists of the surface atoms bounding each face
+        #        surfDistance: the distance between the surface and the AS' origin
+        #output - list of (origin,normal,tangents) per face
+        #           tangents is an (n,3) array, the direction from the centroid
+        #           to the first atom rotated by -2pi/n * i around the normal
+        faces = [None]*len(cycles)
+        bySize = {}
+        for n,cycle in enumerate(cycles):
+            bySize.setdefault(len(cycle),[]).append(n)
+        for ncycle,members in bySize.items():
+            #(m,ncycle,3) coordinates of the face atoms
+            vecs = np.array([[np.array(atom.coordinate) for atom in cycles[n]] for n in members],
+                            dtype=float)
+            #faces across a periodic boundary use the images nearest to their first atom
+            vecs = vecs[:,:1] + self.minimumImage(vecs - vecs[:,:1])
+            centroids = vecs.mean(axis=1)
+            vecsFromO = vecs - centroids[:,None,:]
+            normalVecs = self.findNormals(vecsFromO,positiveDirection=self.positiveDir)
+            sorigins = centroids + surfDistance*normalVecs
+
+            #tangent towards the first atom, projected onto the face plane
+            tangentVecs = vecsFromO[:,0]
+            tangentVecs = tangentVecs - np.einsum('mi,mi->m',tangentVecs,normalVecs)[:,None]*normalVecs
+            tangentVecs /= np.linalg.norm(tangentVecs,axis=-1)[:,None]
+            #rotations around the normal (Rodrigues' formula), one per face vertex
+            theta = -2*np.pi*np.arange(ncycle)/ncycle
+            crossVecs = np.cross(normalVecs,tangentVecs)
+            rotated = (np.cos(theta)[None,:,None]*tangentVecs[:,None,:] +
+                       np.sin(theta)[None,:,None]*crossVecs[:,None,:])
+            for k,n in enumerate(members):
+                faces[n] = (sorigins[k],normalVecs[k],rotated[k])
+        return faces
+
     def __init__(self,
                  surfDistance=1.0,
                  edgePerFace=(3,),
@@ -93,58 +183,20 @@ class FaceASMixin(ASMixin):
         if hasattr(self,'fInitialized'):
             return None
         
-        maxEdgePerFace = max(edgePerFace)
-        
-        for cycle in nx.simple_cycles(self.surfaceConGraph,
-                                      length_bound=maxEdgePerFace):
-            ncycle = len(cycle)
-            #print(ncycle)
-            #if ncycle > maxEdgePerFace:
-            #    break
-
-            if ncycle in edgePerFace:
-                cycleIndex = edgePerFace.index(ncycle)
-                #fsites.append(cycle)
-                vecs = [np.array(atom.coordinate) for atom in cycle]
-                origin,normalVec,radius = self.findCentroid(vecs,
-                                                          positiveDirection=self.positiveDir)
-                sorigin = origin + surfDistance*normalVec
-                
-                #calculating tangent vector
-                tangentVec = (vecs[0]-origin)
-                tangentVec -= np.dot(tangentVec,normalVec)*normalVec
-                tangentVec /= np.linalg.norm(tangentVec)
-
+        cycles = self.findFaces(edgePerFace)
+        faces = self.faceGeometry(cycles,surfDistance)
+        for cycle,(sorigin,normalVec,tangentVecs) in zip(cycles,faces):
+            cycleIndex = edgePerFace.index(len(cycle))
+            if CnAdsorbate[cycleIndex] is not False:
+                #only one AS over the face
+                tangentVecs = tangentVecs[:1]
+            for tangentVec in tangentVecs:
                 fSite = MonoAS(siteType=MonoAS.FACE,
                                 origin=sorigin,
                                 normalDir=normalVec,
                                 tangentDir=tangentVec,
                                 boundAtoms=cycle)
                 self.sites.append(fSite)
-                
-                if CnAdsorbate[cycleIndex] is False:
-                    #rotate the tangentVec by 2pi/n * i
-                    #   around normalVec
-                    theta = 2*np.pi/ncycle
-                    for i in (1,ncycle):
-                        # Construct the rotation matrix using Rodrigues' rotation formula
-                        cos_theta = np.cos(theta)
-                        sin_theta = np.sin(theta)
-                        K = np.matrix([[0, -normalVec[2], normalVec[1]],
-                                       [normalVec[2], 0, -normalVec[0]],
-                                       [-normalVec[1], normalVec[0], 0]])
-                        K2 = np.dot(K,K)
-                        R = np.identity(3) + sin_theta*K+ (1-cos_theta)*K2
-                        tangentVec = tangentVec * R
-                        newtangentVec =np.array([tangentVec[0,0],
-                                                 tangentVec[0,1],
-                                                 tangentVec[0,2]])
-                        fSite = MonoAS(siteType=MonoAS.FACE,
-                                origin=sorigin,
-                                normalDir=normalVec,
-                                tangentDir=newtangentVec,
-                                boundAtoms=cycle)
-                        self.sites.append(fSite)
                         
         self.fInitialized = True
 
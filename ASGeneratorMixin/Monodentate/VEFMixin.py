@@ -10,10 +10,12 @@ Required properties and methods for child classes prior to initialization:
     The active site list (list() instance) named 'sites'
     The adjacency of the sites (networkx.Graph() instance) named 'siteAdjacency'
 """
+import os
 
 from .VertexMixin import VertexASMixin
 from .EdgeMixin import EdgeASMixin
 from .FaceMixin import FaceASMixin
+from ..SiteCache import siteCacheKey,saveSites,loadSites
 
 class VEFASMixin(VertexASMixin,EdgeASMixin,FaceASMixin):
     #A combinational mixin for Vertex, Edge, and Face sites
@@ -25,12 +27,36 @@ class VEFASMixin(VertexASMixin,EdgeASMixin,FaceASMixin):
     #       fsurfDist: distance between F type AS origin and surface
     #       adjThresh: distance threshold between origins of V type AS
     #                  to be considered neighbours
+    #       cacheDir: optional directory of cached sites and adjacency
+    #                  the sites are read from it if this substrate and these
+    #                  parameters were seen before, and written to it otherwise
+    #       useSymmetry: if True, the symmetry of the surface is detected to fit
+    #                  the atom normals once per orbit and to label the sites
+    #                  with their orbit, see ASMixin.useSymmetry
     def __init__(self,
                  vsurfDist=1.0,
                  esurfDist=1.0,
                  fsurfDist=1.0,
-                 adjThresh=1.0
+                 adjThresh=1.0,
+                 cacheDir=None,
+                 useSymmetry=False
                  ):
+        self.useSymmetry = useSymmetry
+        cachePath = None
+        if cacheDir is not None:
+            params = {'vsurfDist':vsurfDist,'esurfDist':esurfDist,
+                      'fsurfDist':fsurfDist,'adjThresh':adjThresh,
+                      'useSymmetry':useSymmetry}
+            cachePath = os.path.join(cacheDir,siteCacheKey(self,params)+'.npz')
+            if os.path.exists(cachePath):
+                print("Loading cached AS")
+                loadSites(cachePath,self)
+                self.vInitialized = True
+                self.eInitialized = True
+                self.fInitialized = True
+                self.adjThresh = adjThresh
+                return
+
         print("Loading Vertex AS")
         VertexASMixin.__init__(self,surfDistance=vsurfDist)
         print("Loading Edge AS")
@@ -38,4 +64,11 @@ class VEFASMixin(VertexASMixin,EdgeASMixin,FaceASMixin):
         print("Loading Face AS")
         FaceASMixin.__init__(self,surfDistance=fsurfDist)
         print("Building Site Adjacency Matrix")
-        self.buildMASAdjacency(adjThresh=adjThresh)
\ No newline at end of file
+        self.buildMASAdjacency(adjThresh=adjThresh)
+        if useSymmetry:
+            print("Labelling Site Orbits")
+            self.labelSiteOrbits()
+
+        if cachePath is not None:
+            os.makedirs(cacheDir,exist_ok=True)
+            saveSites(cachePath,self)
\ No newline at end of file
@@ -29,10 +29,11 @@ class VertexASMixin(ASMixin):
         if hasattr(self,'vInitialized'):
             return
 
+        #normals of all surface atoms in one batch
+        atomNormals = self.surfaceAtomNormals()
         for atom in self.surface:
             centerCoord = np.array(atom.coordinate)
-            neiVecs = super().findNeighbourVecs(atom)
-            asNorm = super().findNormal(neiVecs)
+            asNorm = atomNormals[atom]
             asOrigin = centerCoord + asNorm*surfDistance
             activeSite = MonoAS(siteType=MonoAS.VERTEX,
                                 origin=asOrigin,
@@ -0,0 +1,105 @@
+"""
+On-disk cache of the monodentate active sites and the site adjacency of a substrate
+The cache file is an uncompressed .npz holding
+    types    - (n,) site type values
+    origins, normals, tangents - (n,3) site geometry
+    bound    - (n,k) indices of the bound atoms in the surface cluster, -1 padded
+    edges    - (m,2) site index pairs of siteAdjacency
+    orbits   - (n,) symmetry orbit labels of the sites, -1 if unlabelled
+Files are named by siteCacheKey, a hash of everything the sites depend on,
+    so a changed substrate or parameter never reads a stale file
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from CO2RRfragGen.ActiveSite.MonodentateAS import MonodentateAS as MonoAS
+from CO2RRfragGen.ActiveSite.MonodentateAS import MonoASType
+
+#bump when the site generation changes, invalidating the existing files
+CACHE_VERSION = 5
+
+
+def siteCacheKey(substrate,params):
+    #hex digest of the substrate atoms, lattice vectors, pbc, surface, and mixin parameters
+    #   the surface atoms and their bonds are hashed themselves, so surfaces
+    #   detected differently from the same slab never share a file
+    #input - substrate: the SubstrateLattice
+    #        params: dict of the site generation parameters
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("version {}".format(CACHE_VERSION).encode())
+    atomCoords = substrate.absAtomCoordinate()
+    digest.update(" ".join(atom.symbol for atom,coord in atomCoords).encode())
+    coords = np.array([coord for atom,coord in atomCoords],dtype=float).reshape(-1,3)
+    digest.update(np.ascontiguousarray(coords).tobytes())
+    digest.update(np.ascontiguousarray(substrate.cell,dtype=float).tobytes())
+    digest.update(repr(tuple(substrate.pbc)).encode())
+    digest.update("surface {}".format(substrate.surfaceMode).encode())
+    surfaceAtoms = list(substrate.surface)
+    surfaceIndex = {atom:n for n,atom in enumerate(surfaceAtoms)}
+    surfaceCoords = np.array([np.array(atom.coordinate) for atom in surfaceAtoms],dtype=float).reshape(-1,3)
+    digest.update(np.ascontiguousarray(surfaceCoords).tobytes())
+    bonds = np.sort(np.array([(surfaceIndex[atomA],surfaceIndex[atomB])
+                              for atomA,atomB in substrate.surfaceConGraph.edges()],
+                             dtype=np.int64).reshape(-1,2),axis=1)
+    digest.update(np.ascontiguousarray(bonds[np.lexsort(bonds.T[::-1])]).tobytes())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+
+def saveSites(path,substrate):
+    #write substrate.sites and substrate.siteAdjacency to path
+    #   the file is written to a temporary file next to path first, so readers
+    #   never see a partial file and concurrent writers never share one
+    sites = substrate.sites
+    surfaceIndex = {atom:n for n,atom in enumerate(substrate.surface)}
+    siteIndex = {site:n for n,site in enumerate(sites)}
+    nbound = max([len(site.boundAtoms) for site in sites],default=0)
+    bound = np.full((len(sites),nbound),-1,dtype=np.int32)
+    for n,site in enumerate(sites):
+        bound[n,:len(site.boundAtoms)] = [surfaceIndex[atom] for atom in site.boundAtoms]
+    edges = np.array([(siteIndex[siteA],siteIndex[siteB])
+                      for siteA,siteB in substrate.siteAdjacency.edges()],dtype=np.int32).reshape(-1,2)
+    handle = tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)),
+                                         prefix=os.path.basename(path)+'.',suffix='.tmp',
+                                         delete=False)
+    try:
+        with handle:
+            np.savez(handle,
+                     types=np.array([site.type.value for site in sites],dtype=np.int8),
+                     origins=np.array([site.origin for site in sites],dtype=float).reshape(-1,3),
+                     normals=np.array([site.normalDir for site in sites],dtype=float).reshape(-1,3),
+                     tangents=np.array([site.tangentDir for site in sites],dtype=float).reshape(-1,3),
+                     bound=bound,
+                     edges=edges,
+                     orbits=np.array([-1 if getattr(site,'orbit',None) is None else site.orbit
+                                      for site in sites],dtype=np.int64))
+        os.replace(handle.name,path)
+    except BaseException:
+        if os.path.exists(handle.name):
+            os.remove(handle.name)
+        raise
+
+
+def loadSites(path,substrate):
+    #append the cached sites to substrate.sites and their adjacency to substrate.siteAdjacency
+    surfaceAtoms = list(substrate.surface)
+    siteTypes = {siteType.value:siteType for siteType in MonoASType}
+    with np.load(path) as data:
+        sites = [MonoAS(siteType=siteTypes[int(value)],
+                        origin=origin,
+                        normalDir=normal,
+                        tangentDir=tangent,
+                        boundAtoms=[surfaceAtoms[k] for k in row if k >= 0])
+                 for value,origin,normal,tangent,row in zip(data['types'],data['origins'],
+                                                            data['normals'],data['tangents'],
+                                                            data['bound'])]
+        edges = data['edges'].tolist()
+        for site,orbit in zip(sites,data['orbits'].tolist()):
+            site.orbit = None if orbit < 0 else orbit
+    substrate.sites.extend(sites)
+    substrate.siteAdjacency.add_nodes_from(sites)
+    substrate.siteAdjacency.add_edges_from([(sites[i],sites[j]) for i,j in edges])
+    return sites
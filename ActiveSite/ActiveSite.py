@@ -32,17 +32,14 @@ class ActiveSite(object):
             self.boundAtoms = []
         else:
             self.boundAtoms = boundAtoms
+        #label of the symmetry orbit of the site, set by the substrate
+        #   sites with the same label only differ by a symmetry operation
+        self.orbit = None
 
-    def __hash__(self):
-        o = self.origin
-        n = self.normalDir
-        t = self.tangentDir
-        #print(o,n,t)
-        hashData = tuple([self.type.value,
-                          o[0],o[1],o[2],
-                          n[0],n[1],n[2],
-                          t[0],t[1],t[2]])
-        return hash(hashData)
+    #sites compare by identity, and so do their hashes
+    #   (object.__hash__ needs no instance state, which keeps sites usable
+    #   as dict keys while a packer is being unpickled)
+    __hash__ = object.__hash__
 
     @property
     def origin(self):
@@ -28,6 +28,11 @@ class MonoASType(Enum):
             return self.value < other.value
         raise NotImplemented
 
+    #defining __eq__ drops the inherited hash
+    #   restore it so the types can key dicts
+    def __hash__(self):
+        return hash(self.value)
+
 
 
 class MonodentateAS(ActiveSite):
@@ -1,7 +1,12 @@
 from enum import Enum,auto
 #import networkx as nx
 import numpy as np
-import random
+from scipy.spatial import cKDTree
+
+from .Utilities.CellList import SpatialHash
+from .Utilities.IndexedSet import IndexedSet
+from .SubstrateLattice.Symmetry import SiteSymmetry,templateLabel
+from .ConflictGraph import ConflictGraph,siteFrames,poseCoordinates
 
 #state flags for ASStatus
 class ASState(Enum):
@@ -24,9 +29,12 @@ class ASStatus(object):
     def HINDERED(self):
         return ASState.HINDERED
 
-    def __init__(self,site):
+    def __init__(self,site,observer=None):
         #the site the status object is associated with
         self.site = site 
+        #object notified whenever the site becomes available or unavailable
+        #   it provides availabilityChanged(site,isAvailable)
+        self.observer = observer
         self.resetState()
     
     @property
@@ -45,36 +53,93 @@ class ASStatus(object):
         self.state = self.AVAILABLE
         self.occupyingAS = None
         self.hinderingAS = []
+        if self.observer is not None:
+            self.observer.availabilityChanged(self.site,True)
 
     def updateState(self,newState,relevantAS = None):
+        wasAvailable = self.isAvailable
         if newState == self.AVAILABLE:
-            if self.isOccupied:
-                self.state = newState
+            if self.isOccupied and relevantAS is self.occupyingAS:
+                #the occupying adsorbate leaves
+                #   the site falls back to hindered if any neighbour is occupied
                 self.occupyingAS = None
-            elif self.isHindered:
-                self.hinderingAS.remove(relevantAS)
                 if len(self.hinderingAS) == 0:
                     self.state = newState
+                else:
+                    self.state = self.HINDERED
+            elif relevantAS in self.hinderingAS:
+                #a hindering neighbour leaves
+                self.hinderingAS.remove(relevantAS)
+                if len(self.hinderingAS) == 0 and not self.isOccupied:
+                    self.state = newState
         elif newState == self.OCCUPIED:
             if self.isAvailable:
                 self.state = newState
                 self.occupyingAS = relevantAS
         elif newState == self.HINDERED:
+            #hindrance is recorded on occupied sites as well
+            #   so that the site stays hindered once its adsorbate leaves
+            self.hinderingAS.append(relevantAS)
             if not self.isOccupied:
                 self.state = newState
-                self.hinderingAS.append(relevantAS)
         else:
             raise ValueError("Invalid State: {}".format(newState))
 
+        if self.observer is not None and wasAvailable != self.isAvailable:
+            self.observer.availabilityChanged(self.site,self.isAvailable)
+
+
+class AvailableSiteIndex(object):
+    """
+    The available sites of a packer grouped by site type
+    Kept up to date by ASStatus.updateState, so drawing a random available site
+        of a given type is O(1)
+    """
+    def __init__(self):
+        super().__init__()
+        #site type -> IndexedSet of available sites
+        self._byType = {}
+
+    def availabilityChanged(self,site,isAvailable):
+        sitesOfType = self._byType.setdefault(site.type,IndexedSet())
+        if isAvailable:
+            sitesOfType.add(site)
+        else:
+            sitesOfType.discard(site)
+
+    def sitesOfType(self,siteType):
+        #the IndexedSet of available sites of siteType
+        #   the set is live, copy it before modifying
+        return self._byType.setdefault(siteType,IndexedSet())
+
 class AdsorbateHinderedException(Exception):
     def __init__(self):
         super().__init__()
 
+class PackingExhaustedException(Exception):
+    #raised when no remaining site can hold an adsorbate
+    def __init__(self,adsorbate):
+        super().__init__("No feasible site left for adsorbate '{}'".format(adsorbate.name))
+        self.adsorbate = adsorbate
+
+def recordDtype(nAdsorbates):
+    #numpy dtype of the compact record of a conformation of nAdsorbates adsorbates
+    #   sites   - index in packer.sites of the site below each adsorbate, -1 if free
+    #               the site also fixes the tangent direction of the adsorbate
+    #   labels  - the template label of each adsorbate
+    #   seed    - the seed of the distortions, see AdsorbatePacker.seededConformation
+    #   nTrials - passed to randomizeConformation
+    #arrays of records are saved and loaded with np.save and np.load
+    return np.dtype([('sites','<i4',(nAdsorbates,)),
+                     ('labels','<u4',(nAdsorbates,)),
+                     ('seed','<u8'),
+                     ('nTrials','<u4')])
+
 #Manages sites matching between adsorbates and substrate
 #   generate conformations where given adsorbates are placed on the substrate
 class AdsorbatePacker(object):
     
-    def __init__(self,substrate,adsorbates=None):
+    def __init__(self,substrate,adsorbates=None,collisionThresh=0.7,seed=None):
         #class that manages which sites sits what
         #expected ops
         #   place an adsorbate
@@ -92,14 +157,58 @@ class AdsorbatePacker(object):
             self.adsorbates = adsorbates
 
 
+        #available sites grouped by type, maintained by the status objects
+        self.availableIndex = AvailableSiteIndex()
+
         #assign status flag for each site
         for site in self.sites:
-            siteStatus = ASStatus(site)
+            siteStatus = ASStatus(site,observer=self.availableIndex)
             site.status = siteStatus
 
-        #tuple in (site,adsorbate) format
-        self.siteOccupation = []
+        #bidirectional occupation maps
+        #   adsorbate -> site, kept in placement order so that it doubles
+        #   as the undo stack
+        self._adsToSite = {}
+        #   site -> adsorbate
+        self._siteToAds = {}
+
+        #interatomic distance below which two adsorbates collide
+        self.collisionThresh = collisionThresh
+        #spatial hash of the atoms of all placed adsorbates
+        #   keyed by adsorbate, cells are sized to the collision threshold
+        self._atomHash = SpatialHash(cellSize=collisionThresh)
+
+        #(n,3) array of the substrate coordinates, built on first use
+        self._substrateCoords = None
+        #origins and frames of self.sites, built on first use
+        self._siteFrames = None
+
+        #random number generator driving the packing
+        self.rng = None
+        self.reseed(seed)
+
+        #site -> its index in self.sites
+        self.siteIndex = {site:i for i,site in enumerate(self.sites)}
+        #symmetry operations of the sites, built on first use
+        self._siteSymmetry = None
+        #fingerprints of the packings yielded by sample(unique=True)
+        self.seenFingerprints = set()
+
+        #precomputed placement conflicts, see buildConflictGraph
+        self.conflictGraph = None
+        #placed adsorbates the conflict graph cannot answer for
+        #   (distorted, or no graph built)
+        self._uncoveredPlaced = set()
     
+    def reseed(self,seed=None):
+        #reset the random number generator of the packer
+        #input - seed: None, an int, or a numpy.random.SeedSequence
+        #               None draws fresh entropy from the system
+        #the distortions draw from self.rng as well, through the distortion
+        #   functions taking an rng keyword (see AdsorbateDistortor.addDistFunction)
+        #   the global random state is never touched
+        self.rng = np.random.default_rng(seed)
+
     @property
     def sites(self):
         return self.substrate.sites
@@ -124,13 +233,28 @@ class AdsorbatePacker(object):
     def availableSites(self):
         return [site for site in self.sites if site.status.isAvailable]
     
+    @property
+    def siteOccupation(self):
+        #list of (site,adsorbate) tuples in placement order
+        return [(site,ads) for ads,site in self._adsToSite.items()]
+
+    def orbitOccupation(self):
+        #number of occupied sites in each symmetry orbit of the sites
+        #output - dict, orbit label -> count
+        #           sites without an orbit label are counted under None
+        counts = {}
+        for site in self._adsToSite.values():
+            orbit = getattr(site,'orbit',None)
+            counts[orbit] = counts.get(orbit,0) + 1
+        return counts
+
     @property
     def occupiedActiveSites(self):
-        return [occEntry[0] for occEntry in self.siteOccupation]
+        return list(self._adsToSite.values())
 
     @property
     def occupiedAdsorbates(self):
-        return [occEntry[1] for occEntry in self.siteOccupation]
+        return list(self._adsToSite)
 
     @property
     def subSiteAdjacency(self,siteType):
@@ -164,37 +288,89 @@ class AdsorbatePacker(object):
     
     def adsAboveSite(self,site):
         #find the adsorbate connecting to a given site
-        for soPair in self.siteOccupation:
-            if soPair[0] is site:
-                return soPair[1]
-        return None
+        return self._siteToAds.get(site)
 
     def siteBelowAds(self,adsorbate):
         #find the site that the given adsorbate connects
-        for soPair in self.siteOccupation:
-            if soPair[1] is adsorbate:
-                return soPair[0]
-        return None
+        return self._adsToSite.get(adsorbate)
 
-    def hasCollision(self,adsorbate,thresh=0.7):
+    def hasCollision(self,adsorbate,thresh=None):
         #determine if an adsorbate collides with the rest adsorbates
         #adsorbate can be either new ones or old ones on the surface
 
         #input - adsorbate   : the adsorbate to be tested
         #        thresh      : the interatomic distance threshold for collision 
-        testCoords = adsorbate.absAtomCoordinate(withAtoms=False)
-        restCoords = []
-        for restAds in self.occupiedAdsorbates:
-            if restAds is not adsorbate:
-                restCoords += restAds.absAtomCoordinate(withAtoms=False)
-
-        #presume no colission within new coordinates and existing coordinates
-
-        for tcoord in testCoords:
-            for rcoord in restCoords:
-                dist = np.linalg.norm(tcoord-rcoord)
-                if dist < thresh:
-                    return True
+        #                       defaults to self.collisionThresh
+        if thresh is None:
+            thresh = self.collisionThresh
+        testCoords = self._hashCoords(adsorbate)
+
+        #presume no colission within new coordinates
+        #only the hashed atoms around testCoords are compared
+        if self.substrate.isPeriodic:
+            #the hashed atoms are wrapped into the home cell
+            #   test the periodic images of testCoords near the cell as well
+            testCoords = self.substrate.nearImages(testCoords,thresh)
+        return self._atomHash.hasPointWithin(testCoords,thresh,exclude=adsorbate)
+
+    def _hashCoords(self,adsorbate):
+        #absolute atom coordinates of adsorbate in the frame used by the hash
+        #   wrapped into the home cell for periodic substrates
+        coords = adsorbate.absCoordinateArray()
+        if self.substrate.isPeriodic:
+            coords = self.substrate.wrap(coords)
+        return coords
+
+    def poseCoordinates(self,adsorbate,sites,thresh=None):
+        #place adsorbate, in its current geometry, on every site of sites at once
+        #input - adsorbate: the adsorbate template, placed or free
+        #        sites: list of active sites of self.sites
+        #        thresh: the collision threshold, defaults to self.collisionThresh
+        #output - (n_sites,n_atoms,3) array of the absolute atom coordinates
+        #         (n_sites,) bool array, True where the site is available and
+        #           the adsorbate collides with none of the other placed adsorbates
+        if thresh is None:
+            thresh = self.collisionThresh
+        if self._siteFrames is None:
+            self._siteFrames = siteFrames(self.sites)
+        siteIndices = np.array([self.siteIndex[site] for site in sites],dtype=int)
+        origins,frames = self._siteFrames
+        coords = poseCoordinates(adsorbate.relCoordinateArray(),
+                                 origins[siteIndices],frames[siteIndices])
+        feasible = np.array([site.status.isAvailable for site in sites],dtype=bool)
+
+        placed = [self._hashCoords(ads) for ads in self._adsToSite if ads is not adsorbate]
+        if len(placed) > 0 and feasible.any():
+            placed = np.concatenate(placed)
+            testCoords = coords[feasible].reshape(-1,3)
+            if self.substrate.isPeriodic:
+                #placed atoms are in the home cell, test against their images too
+                shifts = self.substrate.imageShifts
+                placed = (placed[None,:,:] + shifts[:,None,:]).reshape(-1,3)
+                testCoords = self.substrate.wrap(testCoords)
+            dist,idx = cKDTree(placed).query(testCoords,distance_upper_bound=thresh)
+            hit = (dist < thresh).reshape(-1,coords.shape[1]).any(axis=1)
+            feasible[np.flatnonzero(feasible)[hit]] = False
+        return coords,feasible
+
+    def buildConflictGraph(self,thresh=None):
+        #precompute the collisions between all template placements
+        #   placeAdsorbate then only does graph lookups as long as the
+        #   adsorbates involved are undistorted
+        self.conflictGraph = ConflictGraph(self,thresh=thresh)
+        self._uncoveredPlaced = {ads for ads in self._adsToSite
+                                 if not self.conflictGraph.covers(ads)}
+        return self.conflictGraph
+
+    def _collides(self,adsorbate,site):
+        #whether adsorbate, already moved onto site, collides with the placed ones
+        graph = self.conflictGraph
+        if graph is None or len(self._uncoveredPlaced) > 0 or not graph.covers(adsorbate):
+            return self.hasCollision(adsorbate)
+        for otherLabel,j in graph.conflictsOf(templateLabel(adsorbate),self.siteIndex[site]):
+            other = self._siteToAds.get(self.sites[j])
+            if other is not None and other is not adsorbate and templateLabel(other) == otherLabel:
+                return True
         return False
 
     def placeAdsorbate(self,adsorbate,activeSite):
@@ -205,7 +381,7 @@ class AdsorbatePacker(object):
         #place an adsorbate
         ads.placeOnSite(asite)
         #test collision
-        if self.hasCollision(ads):
+        if self._collides(ads,asite):
             #   remove adsorbate
             ads.removeFromSite()
             raise AdsorbateHinderedException
@@ -220,8 +396,14 @@ class AdsorbatePacker(object):
                 neiStatus = neiSite.status
                 neiStatus.updateState(neiStatus.HINDERED,asite)
            
-            #   add an entry in self.siteOccupation
-            self.siteOccupation.append((asite,ads))
+            #   register the occupation in both directions
+            self._adsToSite[ads] = asite
+            self._siteToAds[asite] = ads
+
+            #   hash the atoms of the placed adsorbate
+            self._atomHash.insert(ads,self._hashCoords(ads))
+            if self.conflictGraph is None or not self.conflictGraph.covers(ads):
+                self._uncoveredPlaced.add(ads)
             #pass
 
     def removeAdsorbate(self,adsorbate):
@@ -240,47 +422,151 @@ class AdsorbatePacker(object):
             neiStatus = neiSite.status
             neiStatus.updateState(neiStatus.AVAILABLE,asite)
         
-        #   remove entry in self.siteOccupation
-        self.siteOccupation.remove((asite,ads))
+        #   remove the occupation in both directions
+        del self._adsToSite[ads]
+        del self._siteToAds[asite]
+
+        #   drop the atoms of ads from the hash
+        self._atomHash.remove(ads)
+        self._uncoveredPlaced.discard(ads)
        
-    def randomPacking(self):
-        random.seed()
+    def randomPacking(self,maxBacktrack=0):
+        #place every adsorbate on a random available site of its type
+        #the sites found to collide with an adsorbate are dropped from its
+        #   candidate pool, so each site is tried at most once per adsorbate
+        #   and the packing never spins on rejected sites
+        #input - maxBacktrack: the number of times an earlier placement may be
+        #           revised when an adsorbate runs out of candidate sites
+        #raise PackingExhaustedException if an adsorbate cannot be placed
         self.reset()
-        for ads in self.adsorbates:
-            while ads.isFreeAdsorbate():
-                potentialSites= [site for site in self.availableSites\
-                                  if site.type==ads.siteType]
-                randomSite = random.choice(potentialSites)
-                #print(randomSite)
-                try:
-                    self.placeAdsorbate(ads,randomSite)
-                except AdsorbateHinderedException:
-                    continue
+        #adsorbate -> IndexedSet of its sites not yet known to be infeasible
+        #   valid as long as the adsorbates placed before it are unchanged
+        candidates = {}
+        nBacktrack = 0
+        i = 0
+        while i < len(self.adsorbates):
+            ads = self.adsorbates[i]
+            if ads not in candidates:
+                candidates[ads] = self.availableIndex.sitesOfType(ads.siteType).copy()
+            if self._placeFromPool(ads,candidates[ads]):
+                i += 1
+                continue
+
+            #ads cannot be placed given the earlier placements
+            del candidates[ads]
+            if i == 0 or nBacktrack >= maxBacktrack:
+                raise PackingExhaustedException(ads)
+            #move the previous adsorbate to another one of its candidates
+            nBacktrack += 1
+            i -= 1
+            prevAds = self.adsorbates[i]
+            prevSite = self.siteBelowAds(prevAds)
+            self.removeAdsorbate(prevAds)
+            candidates[prevAds].discard(prevSite)
+
+    def _placeFromPool(self,adsorbate,pool):
+        #place adsorbate on a random site of pool
+        #   sites that turn out to collide are removed from pool
+        #output - True if adsorbate is placed, False once pool is exhausted
+        while len(pool) > 0:
+            site = pool[int(self.rng.integers(len(pool)))]
+            try:
+                self.placeAdsorbate(adsorbate,site)
+                return True
+            except AdsorbateHinderedException:
+                pool.discard(site)
+        return False
     
     def reset(self):
         #reset all packed adsorbates
-        while len(self.siteOccupation) > 0:
+        #   each undo is O(1) in the number of placed adsorbates
+        while len(self._adsToSite) > 0:
             self.undo()
 
     def undo(self):
-        occupation = self.siteOccupation[-1]
-        ads   = occupation[1]
+        #remove the most recently placed adsorbate
+        ads = next(reversed(self._adsToSite))
         self.removeAdsorbate(ads)
 
 
-    def randomizeConformation(self):
+    def randomizeConformation(self,nTrials=1,weight=None):
         #call the random distortion method
         #test collision
         #   if true: undo the distortion
+        #input - nTrials: the number of candidate distortions per adsorbate
+        #           with nTrials > 1 the candidates are made in one batch, tested
+        #           in one distance evaluation, and one of the collision-free
+        #           candidates is taken
+        #        weight: optional callable(adsorbate,relCoords) -> (nTrials,) array
+        #           of nonnegative candidate weights, relCoords being the
+        #           (nTrials,n_atoms,3) candidate geometries, uniform if None
+
+        if nTrials > 1:
+            for ads in self.adsorbates:
+                if ads.isFreeAdsorbate() is False:
+                    self._distortFromTrials(ads,nTrials,weight)
+            return
 
         for ads in self.adsorbates:
             if ads.isFreeAdsorbate() is False:
                 #print(ads.absAtomCoordinate())
-                ads.distort()
+                ads.distort(rng=self.rng)
                 #print(ads.absAtomCoordinate())
                 if self.hasCollision(ads):
                     ads.undistort()
-
+                else:
+                    #move the hashed atoms to the distorted geometry
+                    self._atomHash.update(ads,self._hashCoords(ads))
+                    self._uncoveredPlaced.add(ads)
+
+
+    def _distortFromTrials(self,adsorbate,nTrials,weight=None):
+        #distort a placed adsorbate to one of nTrials collision-free candidates
+        #output - True if the geometry changed
+        trials = adsorbate.distortionTrials(nTrials,rng=self.rng)
+        if trials is None:
+            return False
+        if self._siteFrames is None:
+            self._siteFrames = siteFrames(self.sites)
+        origins,frames = self._siteFrames
+        i = self.siteIndex[self.siteBelowAds(adsorbate)]
+        poses = origins[i] + trials @ frames[i]
+        feasible = np.flatnonzero(~self._collidingPoses(poses,adsorbate))
+        if len(feasible) == 0:
+            return False
+        if weight is None:
+            k = feasible[int(self.rng.integers(len(feasible)))]
+        else:
+            w = np.asarray(weight(adsorbate,trials),dtype=float)[feasible]
+            if w.sum() <= 0.:
+                return False
+            k = feasible[int(self.rng.choice(len(feasible),p=w/w.sum()))]
+        adsorbate.applyDistortion(trials[k])
+        #move the hashed atoms to the distorted geometry
+        self._atomHash.update(adsorbate,self._hashCoords(adsorbate))
+        self._uncoveredPlaced.add(adsorbate)
+        return True
+
+    def _collidingPoses(self,poses,exclude=None,thresh=None):
+        #whether each of the poses collides with the placed adsorbates
+        #input - poses: (k,n_atoms,3) array of absolute coordinates
+        #        exclude: a placed adsorbate that is ignored
+        #output - (k,) bool array
+        if thresh is None:
+            thresh = self.collisionThresh
+        points = poses.reshape(-1,3)
+        query = points
+        if self.substrate.isPeriodic:
+            points = self.substrate.wrap(points)
+            query = self.substrate.nearImages(points,thresh)
+        rest = self._atomHash.neighbourCoords(query,thresh,exclude=exclude)
+        if len(rest) == 0:
+            return np.zeros(len(poses),dtype=bool)
+        diff = points[:,None,:] - rest[None,:,:]
+        if self.substrate.isPeriodic:
+            diff = self.substrate.minimumImage(diff)
+        dist2 = np.einsum('ijk,ijk->ij',diff,diff)
+        return (dist2 < thresh**2).any(axis=1).reshape(len(poses),-1).any(axis=1)
 
     def conformation(self):
         #substrate coordinates
@@ -288,7 +574,214 @@ class AdsorbatePacker(object):
 
         #add adsorbate coordinates
         for ads in self.adsorbates:
-            atomCoords += ads.absAtomCoordinate()
+            if not ads.isFreeAdsorbate():
+                atomCoords += ads.absAtomCoordinate()
         
         return atomCoords
-    
\ No newline at end of file
+    
+
+    @property
+    def siteSymmetry(self):
+        #SiteSymmetry instance of self.sites
+        #   the tangents of vertex sites are ignored if every adsorbate on them
+        #   lies on the site normal, a rotation about the site then leaves it as is
+        if self._siteSymmetry is None:
+            self._siteSymmetry = SiteSymmetry(self.sites,self.substrate,
+                                              vertexTangents=not self._vertexAdsorbatesAxial())
+        return self._siteSymmetry
+
+    def _vertexAdsorbatesAxial(self,tol=0.05):
+        #whether all atoms of every vertex adsorbate lie on the site normal
+        for ads in self.adsorbates:
+            if ads.siteType == ads.activeSite.V:
+                offAxis = np.linalg.norm(ads.relCoordinateArray()[:,:2],axis=1)
+                if (offAxis > tol).any():
+                    return False
+        return True
+
+    def fingerprint(self):
+        #compact hash of the current occupation state
+        #   (site, adsorbate template, orientation) of every placed adsorbate
+        #   states related by a lattice translation or surface rotation share it
+        siteIndices = [self.siteIndex[site] for site in self._adsToSite.values()]
+        labels = [templateLabel(ads) for ads in self._adsToSite]
+        return self.siteSymmetry.fingerprint(siteIndices,labels)
+
+    def conformationSymbols(self,includeFree=False):
+        #element symbols of the atoms, in the order of conformationArray
+        #input - includeFree: if True, the atoms of the free adsorbates are
+        #           listed as well, e.g. for the conformations of sample, which
+        #           places every adsorbate
+        symbols = [atom.symbol for atom,coord in self.substrate.absAtomCoordinate()]
+        for ads in self.adsorbates:
+            if includeFree or not ads.isFreeAdsorbate():
+                symbols += [atomData.atom.symbol for atomData in ads.cluster]
+        return np.array(symbols)
+
+    def conformationArray(self,out=None):
+        #the coordinates of the substrate and the placed adsorbates as one
+        #   contiguous (n_atoms,3) array, free adsorbates have no atoms in it
+        #input - out: optional preallocated (n_atoms,3) array to fill
+        if self._substrateCoords is None:
+            self._substrateCoords = np.array(self.substrate.absAtomCoordinate(withAtoms=False),
+                                             dtype=float).reshape(-1,3)
+        adsCoords = [ads.absCoordinateArray() for ads in self.adsorbates
+                     if not ads.isFreeAdsorbate()]
+        nsub = len(self._substrateCoords)
+        natom = nsub + sum(len(coords) for coords in adsCoords)
+        if out is None:
+            out = np.empty((natom,3))
+        out[:nsub] = self._substrateCoords
+        start = nsub
+        for coords in adsCoords:
+            out[start:start+len(coords)] = coords
+            start += len(coords)
+        return out
+
+    def sample(self,n,batchSize=None,maxBacktrack=0,unique=False,maxTries=None,nTrials=1):
+        #lazily generate n random conformations
+        #   each one is a randomPacking of the reference geometries followed
+        #   by randomizeConformation
+        #input - n: the number of conformations
+        #        batchSize: None to yield conformations one by one as (n_atoms,3) arrays
+        #                   otherwise up to batchSize conformations are stacked
+        #                   into one (k,n_atoms,3) array per yield
+        #        maxBacktrack: passed to randomPacking
+        #        unique: if True, packings whose fingerprint is in
+        #                   self.seenFingerprints are dropped
+        #        maxTries: with unique, stop after this many packings in total
+        #                   even if fewer than n are yielded, default 100*n
+        #        nTrials: passed to randomizeConformation
+        #output - yields (symbols,coords)
+        #           symbols is one (n_atoms,) array shared by every yield
+        symbols = self.conformationSymbols(includeFree=True)
+        natom = len(symbols)
+        nbatch = 1 if batchSize is None else batchSize
+        if maxTries is None:
+            maxTries = 100*n
+        nyield = 0
+        ntry = 0
+        while nyield < n:
+            k = min(nbatch,n-nyield)
+            batch = np.empty((k,natom,3))
+            i = 0
+            while i < k and (not unique or ntry < maxTries):
+                ntry += 1
+                #pack the reference geometries, so that the conflict graph
+                #   covers the adsorbates (see _collides)
+                self.reset()
+                self.resetGeometry()
+                self.randomPacking(maxBacktrack=maxBacktrack)
+                if unique:
+                    fprint = self.fingerprint()
+                    if fprint in self.seenFingerprints:
+                        continue
+                    self.seenFingerprints.add(fprint)
+                self.randomizeConformation(nTrials=nTrials)
+                self.conformationArray(out=batch[i])
+                i += 1
+            if i == 0:
+                return
+            nyield += i
+            if batchSize is None:
+                yield symbols,batch[0]
+            else:
+                yield symbols,batch[:i]
+            if i < k:
+                return
+
+    def resetGeometry(self):
+        #return every adsorbate to its reference geometry
+        #   placed adsorbates are rehashed
+        for ads in self.adsorbates:
+            if ads.isDistorted:
+                ads.resetGeometry()
+                if ads in self._adsToSite:
+                    self._atomHash.update(ads,self._hashCoords(ads))
+                    if self.conflictGraph is not None and self.conflictGraph.covers(ads):
+                        self._uncoveredPlaced.discard(ads)
+
+    def seededConformation(self,seed,nTrials=1):
+        #distort the placed adsorbates from their reference geometries
+        #   the random numbers are all drawn from seed, so the same seed and
+        #   occupation always give the same conformation, as long as the
+        #   distortion functions take the rng keyword
+        self.resetGeometry()
+        packerRng = self.rng
+        self.rng = np.random.default_rng(seed)
+        try:
+            self.randomizeConformation(nTrials=nTrials)
+        finally:
+            self.rng = packerRng
+
+    def record(self,seed=0,nTrials=1):
+        #the compact record (see recordDtype) of the current occupation
+        #   with distortions made by seededConformation(seed,nTrials)
+        rec = np.zeros(1,dtype=recordDtype(len(self.adsorbates)))[0]
+        rec['sites'] = [self.siteIndex[self._adsToSite[ads]] if ads in self._adsToSite else -1
+                        for ads in self.adsorbates]
+        rec['labels'] = [templateLabel(ads) for ads in self.adsorbates]
+        rec['seed'] = seed
+        rec['nTrials'] = nTrials
+        return rec
+
+    def sampleRecords(self,n,maxBacktrack=0,nTrials=1):
+        #n random conformations as an array of compact records
+        #   each one is a randomPacking of the reference geometries followed by
+        #   seededConformation with a seed drawn from self.rng
+        #   the packer holds the last conformation afterwards
+        records = np.zeros(n,dtype=recordDtype(len(self.adsorbates)))
+        for i in range(n):
+            self.reset()
+            self.resetGeometry()
+            self.randomPacking(maxBacktrack=maxBacktrack)
+            seed = int(self.rng.integers(2**63))
+            self.seededConformation(seed,nTrials=nTrials)
+            records[i] = self.record(seed,nTrials)
+        return records
+
+    def rebuild(self,record,out=None):
+        #restore the conformation of a compact record
+        #input - record: one record of sampleRecords
+        #        out: passed to conformationArray
+        #output - the (n_atoms,3) coordinates of the conformation
+        labels = [templateLabel(ads) for ads in self.adsorbates]
+        if not np.array_equal(record['labels'],labels):
+            raise ValueError("the record was made with different adsorbates")
+        self.reset()
+        self.resetGeometry()
+        for ads,i in zip(self.adsorbates,record['sites']):
+            if i >= 0:
+                self.placeAdsorbate(ads,self.sites[i])
+        self.seededConformation(int(record['seed']),nTrials=int(record['nTrials']))
+        return self.conformationArray(out=out)
+
+    def reconstruct(self,records,batchSize=None):
+        #lazily rebuild the conformations of an array of records
+        #   free adsorbates have no atoms (see conformationArray), so a batch
+        #   only stacks consecutive records placing the same adsorbates and
+        #   ends early where they change
+        #output - yields (symbols,coords) like sample, symbols is shared by
+        #           the yields placing the same adsorbates
+        nbatch = 1 if batchSize is None else batchSize
+        symbolsOf = {}
+        start = 0
+        while start < len(records):
+            placed = records[start]['sites'] >= 0
+            stop = start + 1
+            while (stop < len(records) and stop - start < nbatch and
+                   np.array_equal(records[stop]['sites'] >= 0,placed)):
+                stop += 1
+            first = self.rebuild(records[start])
+            key = placed.tobytes()
+            if key not in symbolsOf:
+                symbolsOf[key] = self.conformationSymbols()
+            batch = np.empty((stop-start,)+first.shape)
+            batch[0] = first
+            for i in range(start+1,stop):
+                self.rebuild(records[i],out=batch[i-start])
+            if batchSize is None:
+                yield symbolsOf[key],batch[0]
+            else:
+                yield symbolsOf[key],batch
+            start = stop
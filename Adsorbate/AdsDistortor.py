@@ -1,14 +1,29 @@
-from copy import deepcopy
+import functools
+import inspect
+
+import numpy as np
 
 from HOLUDA.Cluster import ClusterManip
 
+from ..Utilities.ArrayCoordinate import ArrayCoordinate
+
 class CannotUndoError(Exception):
     pass
 
+@functools.lru_cache(maxsize=None)
+def _takesRng(dfunction):
+    #whether a distortion function takes the rng keyword
+    try:
+        return 'rng' in inspect.signature(dfunction).parameters
+    except (TypeError,ValueError):
+        return False
+
 class AdsorbateDistortor(object):
     """
     A molecular geom distortor that is attached to an adsorbate class
     A distortor may contain one or multiple distortion operations
+    Distortions only move atoms, so undo restores the atom coordinates from
+        a preallocated snapshot buffer and keeps the cluster object itself
     """
 
     def __init__(self,cluster):
@@ -16,8 +31,46 @@ class AdsorbateDistortor(object):
         self.cmanip = ClusterManip(cluster)
         self._functions =[]
         self._fargs = []
-        self._last = None
         self._geomChanged = False
+        #the atom data entries of the cluster, atoms are never added or removed
+        self._atomEntries = list(self.cmanip.cluster)
+        #(n,3) coordinates before the last distortion
+        self._snapshot = np.empty((len(self._atomEntries),3))
+        self._hasSnapshot = False
+        #(n,3) coordinates before the first distortion, see restoreReference
+        self._reference = np.empty_like(self._snapshot)
+        #the number of distortions applied and not undone
+        self._nApplied = 0
+        #incremented on every geometry change, see version
+        self._version = 0
+
+    def __setstate__(self,state):
+        #distortors pickled before the coordinate buffers existed only hold
+        #   the cluster, and in _last the cluster before the last distortion
+        self.__dict__.update(state)
+        self.__dict__.setdefault('_version',0)
+        if '_atomEntries' not in state:
+            self._atomEntries = list(self.cmanip.cluster)
+            self._snapshot = np.empty((len(self._atomEntries),3))
+            self._reference = np.empty_like(self._snapshot)
+            last = self.__dict__.pop('_last',None)
+            self._hasSnapshot = last is not None
+            self._nApplied = int(self._hasSnapshot)
+            if self._hasSnapshot:
+                for i,atomData in enumerate(last):
+                    self._snapshot[i] = atomData.coordinate
+                self._reference[:] = self._snapshot
+
+    @property
+    def nApplied(self):
+        #the number of distortions applied and not undone
+        return self._nApplied
+
+    @property
+    def version(self):
+        #a counter that changes whenever the geometry does, so that
+        #   caches of the coordinates can tell whether they are stale
+        return self._version
 
     @property
     def geomChanged(self):
@@ -25,33 +78,112 @@ class AdsorbateDistortor(object):
         self._geomChanged = False
         return gchanged
 
+    def _entries(self):
+        #the atom data entries of the cluster
+        return self._atomEntries
+
+    def coordinates(self,out=None):
+        #the atom coordinates of the cluster as an (n,3) array
+        #input - out: optional (n,3) array to fill
+        entries = self._entries()
+        if out is None:
+            out = np.empty((len(entries),3))
+        for i,atomData in enumerate(entries):
+            out[i] = atomData.coordinate
+        return out
+
+    def setCoordinates(self,coords):
+        #move the atoms of the cluster to coords, an (n,3) array
+        #   the values are written into the coordinate object of each atom if
+        #   it is a writable array subclass, e.g. a HOLUDA coordinate, otherwise
+        #   the atom gets its own ArrayCoordinate copy, so .x, .y, and .z keep
+        #   working and coords may be a reused buffer
+        for atomData,coord in zip(self._entries(),coords):
+            current = atomData.coordinate
+            if (isinstance(current,np.ndarray) and type(current) is not np.ndarray
+                    and current.shape == (3,) and current.flags.writeable):
+                current[:] = coord
+            else:
+                atomData.coordinate = np.array(coord,dtype=float).view(ArrayCoordinate)
+
     def addDistFunction(self,dfunction,dargs):
         #dfunction is a reference to a function
+        #   called as dfunction(cmanip,*dargs), with rng=<numpy.random.Generator>
+        #   added if it takes an rng keyword and the caller passes a generator
+        #   (see AdsorbatePacker.reseed), the distortions are then reproducible
         #dargs are in tuples
         self._functions.append(dfunction)
         self._fargs.append(dargs)
 
-    def __call__(self):
+    def _saveSnapshot(self):
+        #record geometry before distortion
+        self.coordinates(out=self._snapshot)
+        self._hasSnapshot = True
+        if self.nApplied == 0:
+            self._reference[:] = self._snapshot
+
+    def _distortCluster(self,rng=None):
+        #perform distortions to the cluster
+        for i,func in enumerate(self._functions):
+            #print(self.cmanip.cluster.atomPosition)
+            if rng is not None and _takesRng(func):
+                func(self.cmanip,*self._fargs[i],rng=rng)
+            else:
+                func(self.cmanip,*self._fargs[i])
+            #print(self.cmanip.cluster.atomPosition)
+
+    def __call__(self,rng=None):
         if len(self._functions) == 0:
             return None
         else:
-            #record geometry before distortion
-            self._last = deepcopy(self.cmanip.cluster)
+            self._saveSnapshot()
+            self._distortCluster(rng)
 
-            #perform distortions to the cluster
-            for i,func in enumerate(self._functions):
-                #print(self.cmanip.cluster.atomPosition)
-                func(self.cmanip,*self._fargs[i])
-                #print(self.cmanip.cluster.atomPosition)
+            self._geomChanged = True
+            self._version += 1
+            self._nApplied += 1
 
+    def trialCoordinates(self,nTrials,rng=None):
+        #nTrials independent distortions of the current geometry
+        #   the geometry is restored after each one and left unchanged
+        #input - rng: passed to the distortion functions, see addDistFunction
+        #output - (nTrials,n,3) array of candidate coordinates,
+        #           None if there is no distortion function
+        if len(self._functions) == 0:
+            return None
+        current = self.coordinates()
+        trials = np.empty((nTrials,)+current.shape)
+        for k in range(nTrials):
+            self._distortCluster(rng)
+            self.coordinates(out=trials[k])
+            self.setCoordinates(current)
+        return trials
+
+    def applyCoordinates(self,coords):
+        #distort the cluster to coords, e.g. a row of trialCoordinates
+        #   undone like any other distortion
+        self._saveSnapshot()
+        self.setCoordinates(coords)
+        self._geomChanged = True
+        self._version += 1
+        self._nApplied += 1
+
+    def restoreReference(self):
+        #undo every distortion applied since the geometry was last undistorted
+        if self.nApplied != 0:
+            self.setCoordinates(self._reference)
             self._geomChanged = True
+            self._version += 1
+        self._nApplied = 0
+        self._hasSnapshot = False
 
     def undo(self):
-        if self._last is not None:
-            self.cmanip.cluster = self._last
-            self._last = None
-            self._geomChanged = True
-        else:
+        if not self._hasSnapshot:
             raise CannotUndoError
+        self.setCoordinates(self._snapshot)
+        self._hasSnapshot = False
+        self._geomChanged = True
+        self._version += 1
+        self._nApplied -= 1
 
 
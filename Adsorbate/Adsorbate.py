@@ -48,9 +48,31 @@ class Adsorbate(object):
         #the means of distortion of an adsorbate's geometry
         self._cdistort = distortionMethod
 
+        #(n,3) relative coordinates of the atoms, rebuilt when the geometry changes
+        self._relCoords = None
+        #the distortor version the relative coordinates were read at
+        self._relCoordsVersion = None
+        #(n,3) absolute coordinates in the current pose, rebuilt when the adsorbate moves
+        self._poseCoords = None
+
+    def __setstate__(self,state):
+        #adsorbates pickled before the coordinate caches existed lack them,
+        #   the caches are rebuilt on first use in any case
+        self.__dict__.update(state)
+        self._relCoords = None
+        self._relCoordsVersion = None
+        self._poseCoords = None
+
     @property
     def geomChanged(self):
-        return self._cdistort.geomChanged
+        #whether the geometry changed since the coordinate arrays were built
+        #   reading it has no side effect
+        return self._cdistort is not None and self._cdistort.version != self._relCoordsVersion
+
+    @property
+    def isDistorted(self):
+        #whether the geometry differs from the reference geometry of the cluster
+        return self._cdistort is not None and self._cdistort.nApplied > 0
 
     @property
     def origin(self):
@@ -58,6 +80,7 @@ class Adsorbate(object):
     @origin.setter
     def origin(self,newOrigin):
         self.activeSite.origin = newOrigin
+        self._poseCoords = None
 
     @property
     def normalDir(self):
@@ -66,6 +89,7 @@ class Adsorbate(object):
     @normalDir.setter
     def normalDir(self,newDir):
         self.activeSite.normalDir = newDir
+        self._poseCoords = None
     
     @property
     def tangentDir(self):
@@ -74,6 +98,7 @@ class Adsorbate(object):
     @tangentDir.setter
     def tangentDir(self,newDir):
         self.activeSite.tangentDir = newDir
+        self._poseCoords = None
 
     @property
     def siteType(self):
@@ -90,34 +115,51 @@ class Adsorbate(object):
         #self.normalDir = None
         #self.tangentDir = None
     
+    def relCoordinateArray(self):
+        #the relative coordinates of the atoms in cluster as one (n,3) array
+        #   cached until the version of the distortor changes
+        if self._relCoords is None or self.geomChanged:
+            self._relCoords = np.array([np.array(atomData.coordinate,dtype=float)
+                                        for atomData in self.cluster]).reshape(-1,3)
+            self._relCoords.setflags(write=False)
+            self._relCoordsVersion = None if self._cdistort is None else self._cdistort.version
+            self._poseCoords = None
+        return self._relCoords
+
+    def absCoordinateArray(self):
+        #the absolute cartesian coordinates of the atoms as one (n,3) array
+        #   memoized until the adsorbate moves or its geometry changes
+        #   the array is read-only, copy it before modifying
+        #output - None if the adsorbate is removed from surface
+        if self.origin is None:
+            return None
+        relCoords = self.relCoordinateArray()
+        if self._poseCoords is None:
+            #rows of the frame are x, y, z, the coord system is right handed
+            z = np.asarray(self.normalDir,dtype=float)
+            y = np.asarray(self.tangentDir,dtype=float)
+            frame = np.array([np.cross(y,z),y,z])
+            self._poseCoords = np.asarray(self.origin,dtype=float) + relCoords @ frame
+            self._poseCoords.setflags(write=False)
+        return self._poseCoords
+
     def absAtomCoordinate(self,withAtoms=True):
         #return the absolute cartesian coordinate of the atoms
         #the coordinate in cluster is relative coordinate
         #   the origin centered at the first active site
         #   normal/tangent direction are (0,0,1) and (0,1,0) respectively
         #considering the origin and normal/tangent direction
+        #the rows of absCoordinateArray are returned as a list
 
-        if self.origin is None:
+        coords = self.absCoordinateArray()
+        if coords is None:
             #in this state the adsorbate is removed from surface
             #thus no line is generated
             return None
 
-        #the coordinate system
-        origin = self.origin
-        z = self.normalDir
-        y = self.tangentDir
-        #the coord system is right handed
-        x = np.cross(y,z)
-        absCoords = []
-        for atomData in self.cluster:
-            atom = atomData.atom
-            acoord = atomData.coordinate
-            newCoord = origin + x*acoord.x + y*acoord.y + z*acoord.z
-            if withAtoms is True:
-                absCoords.append((atom,newCoord))
-            else:
-                absCoords.append(newCoord)
-        return absCoords
+        if withAtoms is True:
+            return [(atomData.atom,coord) for atomData,coord in zip(self.cluster,coords)]
+        return list(coords)
     
     def isFreeAdsorbate(self):
         if self.origin is None:
@@ -125,18 +167,36 @@ class Adsorbate(object):
         else:
             return False
         
-    def distort(self):
+    def distort(self,rng=None):
+        #rng - optional numpy.random.Generator for the distortion functions
         if self._cdistort is None:
             return None
         try:
             #print(self.absAtomCoordinate())
             #print(self.cluster)
             #print(self._cdistort.cmanip.cluster)
-            self._cdistort()
+            self._cdistort(rng)
             #print(self.absAtomCoordinate())
         except TypeError:
             raise
 
+    def distortionTrials(self,nTrials,rng=None):
+        #nTrials candidate relative geometries, the geometry itself is unchanged
+        #input - rng: optional numpy.random.Generator for the distortion functions
+        #output - (nTrials,n,3) array, None if the adsorbate cannot be distorted
+        if self._cdistort is None:
+            return None
+        return self._cdistort.trialCoordinates(nTrials,rng)
+
+    def applyDistortion(self,relCoords):
+        #take the candidate geometry relCoords, undone by undistort
+        self._cdistort.applyCoordinates(relCoords)
+
+    def resetGeometry(self):
+        #return to the reference geometry, undoing all distortions
+        if self._cdistort is not None:
+            self._cdistort.restoreReference()
+
     def undistort(self):
         try:
             self._cdistort.undo()
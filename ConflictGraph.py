@@ -0,0 +1,136 @@
+"""
+Precomputed collisions between adsorbate placements
+A placement is a (template label, site index) pair
+Two placements conflict if the reference geometries of the two templates,
+    placed on the two sites, have atoms closer than the collision threshold
+Whether they do depends on geometry only, so the conflicts are computed once
+    and packing becomes a set of graph lookups
+For periodic substrates only one site per translation orbit is evaluated,
+    the conflicts of the other sites are obtained by translating its conflicts
+"""
+import numpy as np
+
+from .SubstrateLattice.Symmetry import templateLabel
+
+
+def relativeCoordinates(adsorbate):
+    #(n,3) array of the atom coordinates of adsorbate in its active site frame
+    return adsorbate.relCoordinateArray()
+
+
+def siteFrames(sites):
+    #origins (n,3) and frames (n,3,3) of sites
+    #   the rows of a frame are the x, y (tangent), and z (normal) directions
+    origins = np.array([site.origin for site in sites],dtype=float).reshape(-1,3)
+    z = np.array([site.normalDir for site in sites],dtype=float).reshape(-1,3)
+    y = np.array([site.tangentDir for site in sites],dtype=float).reshape(-1,3)
+    x = np.cross(y,z)
+    return origins,np.stack([x,y,z],axis=1)
+
+
+def poseCoordinates(relCoords,origins,frames):
+    #(n_sites,n_atoms,3) coordinates of relCoords placed in each site frame
+    return origins[:,None,:] + np.einsum('ak,skj->saj',relCoords,frames)
+
+
+class ConflictGraph(object):
+    """
+    packer     - the AdsorbatePacker whose sites are used
+    thresh     - the collision threshold, defaults to packer.collisionThresh
+    adsorbates - the adsorbates defining the templates, defaults to packer.adsorbates
+                    the first undistorted adsorbate of each template defines its
+                    site type and reference geometry, adsorbates sharing its
+                    label but not these are not covered (see covers)
+    """
+    def __init__(self,packer,thresh=None,adsorbates=None):
+        super().__init__()
+        self.thresh = packer.collisionThresh if thresh is None else thresh
+        self.substrate = packer.substrate
+        sites = packer.sites
+        self.origins,self.frames = siteFrames(sites)
+
+        #template label -> (site type, relative coordinates)
+        self.templates = {}
+        if adsorbates is None:
+            adsorbates = packer.adsorbates
+        for ads in adsorbates:
+            label = templateLabel(ads)
+            if label not in self.templates and not ads.isDistorted:
+                self.templates[label] = (ads.siteType,relativeCoordinates(ads))
+
+        #(label,site index) -> frozenset of conflicting (label,site index)
+        self.conflicts = {}
+
+        #translation orbits of the sites
+        #   orbitOf[i] = (representative site, index of the permutation taking
+        #   the representative onto i)
+        identity = np.arange(len(sites))
+        translations = [identity]
+        if self.substrate.isPeriodic:
+            symmetry = packer.siteSymmetry
+            translations += [perm for (R,t),perm in zip(symmetry.operations,symmetry.permutations)
+                             if np.allclose(R,np.identity(3)) and not np.array_equal(perm,identity)]
+        orbitOf = [None]*len(sites)
+        for i in range(len(sites)):
+            if orbitOf[i] is None:
+                for k,perm in enumerate(translations):
+                    if orbitOf[perm[i]] is None:
+                        orbitOf[perm[i]] = (i,k)
+
+        siteTypes = [site.type for site in sites]
+        #site type -> boolean mask of the sites of that type
+        self._typeMasks = {}
+        for typeA,relA in self.templates.values():
+            self._typeMasks[typeA] = np.array([t == typeA for t in siteTypes],dtype=bool)
+        for labelA,(typeA,relA) in self.templates.items():
+            for rep in sorted({orbitOf[i][0] for i in range(len(sites)) if siteTypes[i] == typeA}):
+                repConflicts = self._conflictsOnSite(labelA,rep)
+                self.conflicts[(labelA,rep)] = frozenset(repConflicts)
+            for i in range(len(sites)):
+                rep,k = orbitOf[i]
+                if siteTypes[i] == typeA and i != rep:
+                    perm = translations[k]
+                    self.conflicts[(labelA,i)] = frozenset((labelB,int(perm[j]))
+                                                           for labelB,j in self.conflicts[(labelA,rep)])
+
+    def poseCoordinates(self,relCoords,siteIndices):
+        #(n_sites,n_atoms,3) coordinates of a template on the given sites
+        return poseCoordinates(relCoords,self.origins[siteIndices],self.frames[siteIndices])
+
+    def _conflictsOnSite(self,labelA,i):
+        #list of the (label,site index) placements colliding with labelA on site i
+        typeA,relA = self.templates[labelA]
+        coordsA = self.poseCoordinates(relA,[i])[0]
+        radiusA = np.linalg.norm(relA,axis=1).max(initial=0.)
+        originDists = np.linalg.norm(self.substrate.minimumImage(self.origins - self.origins[i]),axis=-1)
+        found = []
+        for labelB,(typeB,relB) in self.templates.items():
+            radiusB = np.linalg.norm(relB,axis=1).max(initial=0.)
+            reach = radiusA + radiusB + self.thresh
+            candidates = np.flatnonzero((originDists < reach) & self._typeMasks[typeB])
+            if len(candidates) == 0:
+                continue
+            coordsB = self.poseCoordinates(relB,candidates)
+            diff = self.substrate.minimumImage(coordsB[:,:,None,:] - coordsA[None,None,:,:])
+            dist2 = np.einsum('sabk,sabk->sab',diff,diff)
+            hits = (dist2 < self.thresh**2).reshape(len(candidates),-1).any(axis=1)
+            found += [(labelB,int(j)) for j in candidates[hits]]
+        return found
+
+    def covers(self,adsorbate,tol=1e-8):
+        #whether the conflicts of adsorbate can be looked up
+        #   its template must be known, and it must have the site type and the
+        #   reference geometry of the template, as the label only derives from
+        #   the name (unnamed adsorbates all share one)
+        template = self.templates.get(templateLabel(adsorbate))
+        if template is None or adsorbate.isDistorted:
+            return False
+        siteType,relCoords = template
+        if adsorbate.siteType != siteType:
+            return False
+        coords = adsorbate.relCoordinateArray()
+        return coords is relCoords or (coords.shape == relCoords.shape and
+                                       not (np.abs(coords - relCoords) > tol).any())
+
+    def conflictsOf(self,label,siteIndex):
+        return self.conflicts.get((label,siteIndex),frozenset())
@@ -0,0 +1,258 @@
+"""
+Densest packings as maximum weight independent sets
+A placement is a (template label, site index) pair, two placements conflict if
+    their sites are the same or neighbours in siteAdjacency, share an origin,
+    or the adsorbates collide (ConflictGraph)
+A packing is a set of pairwise non-conflicting placements, the densest packing
+    is the independent set of the placement conflict graph of largest weight
+The conflict graph is held as one python int bitmask of neighbours per placement
+Solvers
+    greedy - one pass in order of weight/(degree+1)
+    local  - greedy followed by an iterated (1,*)-swap local search
+    exact  - branch and bound with a clique cover bound, seeded with local
+The upper bound is the weight of a clique cover of the conflict graph, or the
+    best weight itself once branch and bound completes
+"""
+import copy
+import time
+
+from .ConflictGraph import ConflictGraph
+from .SubstrateLattice.Symmetry import templateLabel
+
+
+def _bits(mask):
+    #indices of the set bits of mask, lowest first
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class SolverTimeoutException(Exception):
+    pass
+
+
+class CoverageSolver(object):
+    """
+    packer    - the AdsorbatePacker whose sites are packed
+    templates - the adsorbates that may be placed, one per template
+                    defaults to the first undistorted adsorbate of each template
+                    in packer.adsorbates
+                    any number of copies of each template may be placed
+    weights   - dict, adsorbate name -> weight of one placed copy, default 1
+                    with unit weights the solvers maximize the number of adsorbates
+    thresh    - the collision threshold, defaults to packer.collisionThresh
+    """
+    def __init__(self,packer,templates=None,weights=None,thresh=None):
+        super().__init__()
+        self.packer = packer
+        if templates is None:
+            templates = packer.adsorbates
+        #template label -> adsorbate
+        self.templates = {}
+        for ads in templates:
+            if not ads.isDistorted:
+                self.templates.setdefault(templateLabel(ads),ads)
+        weights = {} if weights is None else weights
+
+        graph = ConflictGraph(packer,thresh=thresh,adsorbates=list(self.templates.values()))
+        self.conflictGraph = graph
+        sites = packer.sites
+        siteIndex = packer.siteIndex
+
+        #placements and their weights
+        self.nodes = []
+        self.weights = []
+        for label,ads in self.templates.items():
+            for i,site in enumerate(sites):
+                if site.type == ads.siteType:
+                    self.nodes.append((label,i))
+                    self.weights.append(float(weights.get(ads.name,1.)))
+        nodeIndex = {node:k for k,node in enumerate(self.nodes)}
+
+        #bitmask of the placements on each site
+        siteNodes = [0]*len(sites)
+        for k,(label,i) in enumerate(self.nodes):
+            siteNodes[i] |= 1 << k
+        #bitmask of the sites excluded by occupying site i
+        #   the site itself, its neighbours, and the sites sharing its origin
+        sameOrigin = {}
+        for i,site in enumerate(sites):
+            key = (site.type,) + tuple(round(x,6) for x in site.origin)
+            sameOrigin.setdefault(key,[]).append(i)
+        blocked = []
+        for i,site in enumerate(sites):
+            members = set(sameOrigin[(site.type,) + tuple(round(x,6) for x in site.origin)])
+            if site in packer.siteAdjacency:
+                members.update(siteIndex[nei] for nei in packer.siteAdjacency.neighbors(site))
+            mask = 0
+            for j in members:
+                mask |= siteNodes[j]
+            blocked.append(mask)
+
+        #conflict bitmask of each placement, kept symmetric
+        self.adjacency = [0]*len(self.nodes)
+        for k,(label,i) in enumerate(self.nodes):
+            mask = blocked[i]
+            for node in graph.conflictsOf(label,i):
+                if node in nodeIndex:
+                    mask |= 1 << nodeIndex[node]
+            self.adjacency[k] |= mask
+        for k in range(len(self.nodes)):
+            for m in _bits(self.adjacency[k]):
+                self.adjacency[m] |= 1 << k
+        for k in range(len(self.nodes)):
+            self.adjacency[k] &= ~(1 << k)
+
+        self.allNodes = (1 << len(self.nodes)) - 1
+        #result of the last solve
+        self.bestNodes = 0
+        self.bestWeight = 0.
+        self.upperBound = self.cliqueCoverBound(self.allNodes)
+        self.isOptimal = False
+        #adsorbates placed by the last solve
+        self.placed = []
+
+    def weightOf(self,mask):
+        return sum(self.weights[k] for k in _bits(mask))
+
+    def cliqueCoverBound(self,mask):
+        #upper bound of the independent set weight within mask
+        #   the placements are greedily partitioned into cliques, heaviest first,
+        #   an independent set holds at most one placement of each clique
+        order = sorted(_bits(mask),key=lambda k: -self.weights[k])
+        cliques = []
+        bound = 0.
+        for k in order:
+            for c,clique in enumerate(cliques):
+                if clique & ~self.adjacency[k] == 0:
+                    cliques[c] = clique | (1 << k)
+                    break
+            else:
+                cliques.append(1 << k)
+                bound += self.weights[k]
+        return bound
+
+    def greedy(self):
+        #independent set built in one pass, lightly constrained heavy placements first
+        order = sorted(range(len(self.nodes)),
+                       key=lambda k: -self.weights[k]/(bin(self.adjacency[k]).count('1')+1))
+        chosen = 0
+        excluded = 0
+        for k in order:
+            if not (excluded >> k) & 1:
+                chosen |= 1 << k
+                excluded |= self.adjacency[k] | (1 << k)
+        return chosen
+
+    def localSearch(self,chosen,deadline,walkProb=0.01,target=None):
+        #iterated local search from the independent set chosen
+        #   a random placement is forced in, its conflicts are dropped, and the
+        #   freed placements are refilled in random order
+        #   the move is kept if it does not lose weight, or with walkProb
+        #output - the best independent set found before deadline,
+        #           or as soon as its weight reaches target
+        rng = self.packer.rng
+        nnode = len(self.nodes)
+        weight = self.weightOf(chosen)
+        best,bestWeight = chosen,weight
+        while nnode > 0 and time.perf_counter() < deadline:
+            k = int(rng.integers(nnode))
+            if (chosen >> k) & 1:
+                continue
+            removed = chosen & self.adjacency[k]
+            trial = (chosen & ~removed) | (1 << k)
+            trialWeight = weight + self.weights[k] - self.weightOf(removed)
+            #placements that only conflicted with the removed ones
+            freed = 0
+            for r in _bits(removed):
+                freed |= self.adjacency[r]
+            freed = list(_bits(freed & ~trial & ~self.adjacency[k]))
+            for f in rng.permutation(len(freed)):
+                m = freed[f]
+                if self.adjacency[m] & trial == 0:
+                    trial |= 1 << m
+                    trialWeight += self.weights[m]
+            if trialWeight >= weight or rng.random() < walkProb:
+                chosen,weight = trial,trialWeight
+                if weight > bestWeight:
+                    best,bestWeight = chosen,weight
+                    if target is not None and bestWeight >= target:
+                        break
+        return best
+
+    def _branch(self,candidates,chosen,weight,deadline):
+        #include/exclude search, excluding in the loop
+        #   branching on the most constrained candidate keeps the tree shallow
+        while candidates:
+            if time.perf_counter() > deadline:
+                raise SolverTimeoutException
+            if weight + self.cliqueCoverBound(candidates) <= self.bestWeight:
+                return
+            k = max(_bits(candidates),key=lambda m: bin(self.adjacency[m] & candidates).count('1'))
+            self._branch(candidates & ~self.adjacency[k] & ~(1 << k),
+                         chosen | (1 << k),weight + self.weights[k],deadline)
+            candidates &= ~(1 << k)
+        if weight > self.bestWeight:
+            self.bestNodes,self.bestWeight = chosen,weight
+
+    def solve(self,method='local',timeBudget=10.,replaceAdsorbates=False):
+        #find a dense packing and apply it to the packer
+        #input - method: 'greedy', 'local', or 'exact'
+        #        timeBudget: seconds available to the local and exact solvers
+        #        replaceAdsorbates: passed to apply
+        #output - (weight of the packing, upper bound of the optimal weight)
+        #the placed adsorbates are kept in self.placed
+        if method not in ('greedy','local','exact'):
+            raise ValueError("unknown method {}".format(method))
+        deadline = time.perf_counter() + timeBudget
+        self.upperBound = self.cliqueCoverBound(self.allNodes)
+        self.bestNodes = self.greedy()
+        if method != 'greedy' and self.weightOf(self.bestNodes) < self.upperBound:
+            #leave most of the budget to branch and bound
+            lsDeadline = deadline if method == 'local' else time.perf_counter() + 0.1*timeBudget
+            self.bestNodes = self.localSearch(self.bestNodes,lsDeadline,target=self.upperBound)
+        self.bestWeight = self.weightOf(self.bestNodes)
+        self.isOptimal = self.bestWeight >= self.upperBound
+
+        if method == 'exact' and not self.isOptimal:
+            try:
+                self._branch(self.allNodes,0,0.,deadline)
+                self.isOptimal = True
+                self.upperBound = self.bestWeight
+            except SolverTimeoutException:
+                pass
+
+        self.placed = self.apply(self.bestNodes,replaceAdsorbates=replaceAdsorbates)
+        return self.bestWeight,self.upperBound
+
+    def apply(self,chosen,replaceAdsorbates=False):
+        #place one adsorbate on each placement of the independent set chosen
+        #   the unplaced adsorbates of each template are reused before copies are made,
+        #   if they have its geometry (see ConflictGraph.covers)
+        #input - replaceAdsorbates: if True, packer.adsorbates becomes the placed
+        #           adsorbates, otherwise it keeps all its adsorbates and the
+        #           copies are appended to it
+        #output - list of the placed adsorbates
+        packer = self.packer
+        packer.reset()
+        spare = {}
+        for ads in packer.adsorbates:
+            if self.conflictGraph.covers(ads):
+                spare.setdefault(templateLabel(ads),[]).append(ads)
+        placed = []
+        copies = []
+        for k in _bits(chosen):
+            label,i = self.nodes[k]
+            if len(spare.get(label,[])) > 0:
+                ads = spare[label].pop(0)
+            else:
+                ads = copy.deepcopy(self.templates[label])
+                copies.append(ads)
+            packer.placeAdsorbate(ads,packer.sites[i])
+            placed.append(ads)
+        if replaceAdsorbates:
+            packer.adsorbates = placed
+        else:
+            packer.adsorbates.extend(copies)
+        return placed
@@ -22,7 +22,7 @@ from adspacker.ASGeneratorMixin.Monodentate import VEFASMixin
 
 from adspacker.AdsPacker import AdsorbatePacker
 
-from HOLUDA.File.General import XYZFile
+from adspacker.Trajectory import TrajectoryWriter
 
 from adspacker.Workshop.Visualization import printSurface,plotSurfAndSite
 
@@ -98,34 +98,11 @@ packer = AdsorbatePacker(lattice,adsorbates=adsorbates)
 #plotSurfAndSite(packer.substrate)
 
 #generate 10,000 samples of strucutre in cartesian coordinate
-#   write to xyz file
+#   write to a binary trajectory, read back with TrajectoryReader
 #"""
-xyzName = "sampleXYZ.xyz"
-with open(xyzName,'a+') as xyzf:
-    for i in range(100):
-        packer.randomPacking()
-        packer.randomizeConformation()
-        geom = packer.conformation()
-        #print(geom[:3])
-        natom = len(geom)
-        title = "Conformation {}".format(i+1)
-        xyzLines = []
-        for item in geom:
-            symbol = item[0].symbol
-            x = item[1][0]
-            y = item[1][1]
-            z = item[1][2]
-            #print(symbol,x,y,z)
-            line = "{}\t{:10f}\t{:10f}\t{:10f}".format(symbol,x,y,z)
-            xyzLines.append(line)
-        #xyzLines = ["{}\t{}\t{}\t{}".format(item[0].symbol,
-        #                                    item[1][0],
-        #                                    item[1][1].
-        #                                    item[1][2])
-        #                                    for item in geom]
-        xyzGeom = "\n".join(xyzLines)+"\n"
-        xyzObj = XYZFile(natom,title,xyzGeom)
-        xyzContent = xyzObj.toStream()
-        xyzf.write(xyzContent)
-        #packer.reset()
+trajName = "samples.adtraj"
+symbols = packer.conformationSymbols(includeFree=True)
+with TrajectoryWriter(trajName,symbols,lattice=np.array([a,b,c]),append=True) as traj:
+    for symbols,coords in packer.sample(100,batchSize=1000):
+        traj.write(coords)
 #"""
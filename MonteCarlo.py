@@ -0,0 +1,314 @@
+"""
+Metropolis Monte Carlo over the occupation states of an AdsorbatePacker
+Moves
+    hop    - move an adsorbate to a neighbouring site (siteAdjacency) of its type
+    rotate - move an adsorbate to another orientation of the same site origin
+    swap   - exchange the sites of two adsorbates of different templates
+    insert - place a free adsorbate of the packer (grand canonical)
+    delete - remove a placed adsorbate (grand canonical)
+Energies come from a pluggable PairEnergyModel and are evaluated incrementally,
+    only the sites within the model cutoff of a moved adsorbate are visited
+"""
+import numpy as np
+
+from .AdsPacker import AdsorbateHinderedException
+from .SubstrateLattice.Symmetry import templateLabel
+
+
+class PairEnergyModel(object):
+    """
+    The base energy model, all energies are zero
+    Subclasses override siteEnergy and/or pairEnergy
+    cutoff - the site distance beyond which pair energies vanish
+    """
+    def __init__(self,cutoff=0.):
+        super().__init__()
+        self.cutoff = cutoff
+
+    def siteEnergy(self,adsorbate,site):
+        #energy of adsorbate bound to site, e.g. the binding energy
+        return 0.
+
+    def pairEnergy(self,adsorbateA,adsorbateB,distance):
+        #interaction energy of two adsorbates whose sites are distance apart
+        return 0.
+
+
+class DistancePairEnergy(PairEnergyModel):
+    """
+    Pair energy given by a function of the adsorbate names and the site distance
+    pairFunction - callable(nameA,nameB,distance) -> energy
+    siteEnergies - optional dict, (adsorbate name, site type) -> energy
+    """
+    def __init__(self,pairFunction,cutoff,siteEnergies=None):
+        super().__init__(cutoff=cutoff)
+        self.pairFunction = pairFunction
+        self.siteEnergies = {} if siteEnergies is None else siteEnergies
+
+    def siteEnergy(self,adsorbate,site):
+        return self.siteEnergies.get((adsorbate.name,site.type),0.)
+
+    def pairEnergy(self,adsorbateA,adsorbateB,distance):
+        return self.pairFunction(adsorbateA.name,adsorbateB.name,distance)
+
+
+def linearSchedule(kTStart,kTEnd,nSteps):
+    #simulated annealing schedule, kT changes linearly over nSteps
+    def schedule(step):
+        frac = min(step/max(nSteps-1,1),1.)
+        return kTStart + frac*(kTEnd-kTStart)
+    return schedule
+
+
+def geometricSchedule(kTStart,kTEnd,nSteps):
+    #simulated annealing schedule, kT changes geometrically over nSteps
+    def schedule(step):
+        frac = min(step/max(nSteps-1,1),1.)
+        return kTStart*(kTEnd/kTStart)**frac
+    return schedule
+
+
+class MonteCarlo(object):
+    """
+    Metropolis Monte Carlo driver on top of an AdsorbatePacker
+    packer      - the AdsorbatePacker, its current packing is the initial state
+    model       - the PairEnergyModel
+    kT          - the temperature in the energy unit of model
+    moveWeights - dict, move name -> relative frequency
+    mu          - dict, adsorbate name -> chemical potential
+                    the free adsorbates of packer with a chemical potential
+                    form the reservoir of the insert and delete moves
+                    both moves pick one of these species uniformly, so that
+                    the selection probabilities cancel in the acceptance ratio
+    """
+    MOVES = ('hop','rotate','swap','insert','delete')
+
+    def __init__(self,packer,model,kT=0.025,moveWeights=None,mu=None):
+        super().__init__()
+        self.packer = packer
+        self.model = model
+        self.kT = kT
+        self.mu = {} if mu is None else dict(mu)
+        #the adsorbate names the insert and delete moves pick from
+        self.species = sorted(self.mu)
+        if moveWeights is None:
+            grandCanonical = 1. if len(self.mu) > 0 else 0.
+            moveWeights = {'hop':1.,'rotate':1.,'swap':1.,
+                           'insert':grandCanonical,'delete':grandCanonical}
+        weights = np.array([moveWeights.get(move,0.) for move in self.MOVES],dtype=float)
+        self._moveProb = weights/weights.sum()
+
+        sites = packer.sites
+        origins = np.array([site.origin for site in sites],dtype=float)
+        substrate = packer.substrate
+        #per site arrays of (site index, distance) within the model cutoff
+        self.interactions = []
+        for i in range(len(sites)):
+            dists = np.linalg.norm(substrate.minimumImage(origins - origins[i]),axis=-1)
+            #sites sharing the origin of site i never hold a second adsorbate
+            nearby = np.flatnonzero((dists < model.cutoff) & (dists > 1e-6))
+            self.interactions.append((nearby,dists[nearby]))
+
+        #per site list of the other orientations sharing its origin
+        byOrigin = {}
+        for site in sites:
+            key = (site.type,) + tuple(np.round(site.origin,6))
+            byOrigin.setdefault(key,[]).append(site)
+        self.variants = {}
+        for site in sites:
+            key = (site.type,) + tuple(np.round(site.origin,6))
+            self.variants[site] = [other for other in byOrigin[key] if other is not site]
+
+        self.energy = self.totalEnergy()
+        self.nAttempted = dict.fromkeys(self.MOVES,0)
+        self.nAccepted = dict.fromkeys(self.MOVES,0)
+
+    @property
+    def rng(self):
+        return self.packer.rng
+
+    def localEnergy(self,adsorbate,site,exclude=()):
+        #site energy of adsorbate on site plus its pair energies with the
+        #   adsorbates on the sites within the cutoff, skipping those in exclude
+        model = self.model
+        sites = self.packer.sites
+        energy = model.siteEnergy(adsorbate,site)
+        nearby,dists = self.interactions[self.packer.siteIndex[site]]
+        for j,dist in zip(nearby,dists):
+            other = self.packer.adsAboveSite(sites[j])
+            if other is not None and other is not adsorbate and other not in exclude:
+                energy += model.pairEnergy(adsorbate,other,dist)
+        return energy
+
+    def totalEnergy(self):
+        #energy of the current packing from scratch
+        energy = 0.
+        for site,ads in self.packer.siteOccupation:
+            energy += self.model.siteEnergy(ads,site)
+            #each pair is seen from both sides
+            energy += 0.5*(self.localEnergy(ads,site) - self.model.siteEnergy(ads,site))
+        return energy
+
+    def _groupEnergy(self,adsorbates):
+        #energy of the placed adsorbates including the pairs among them once
+        energy = 0.
+        for i,ads in enumerate(adsorbates):
+            site = self.packer.siteBelowAds(ads)
+            energy += self.localEnergy(ads,site,exclude=adsorbates[:i])
+        return energy
+
+    def _accept(self,deltaE,prefactor=1.):
+        #Metropolis criterion
+        if deltaE <= 0. and prefactor >= 1.:
+            return True
+        if self.kT <= 0.:
+            return False
+        return self.rng.random() < prefactor*np.exp(min(-deltaE/self.kT,700.))
+
+    def _relocate(self,moves):
+        #move adsorbates to new sites, moves is a list of (adsorbate,newSite)
+        #   either all of them move, or nothing changes
+        #output - True if the adsorbates moved
+        packer = self.packer
+        oldSites = [packer.siteBelowAds(ads) for ads,newSite in moves]
+        for ads,newSite in moves:
+            packer.removeAdsorbate(ads)
+        placed = []
+        try:
+            for ads,newSite in moves:
+                if not newSite.status.isAvailable:
+                    raise AdsorbateHinderedException
+                packer.placeAdsorbate(ads,newSite)
+                placed.append(ads)
+        except AdsorbateHinderedException:
+            for ads in placed:
+                packer.removeAdsorbate(ads)
+            for (ads,newSite),oldSite in zip(moves,oldSites):
+                packer.placeAdsorbate(ads,oldSite)
+            return False
+        return True
+
+    def _tryRelocation(self,moves):
+        #Metropolis step for moving adsorbates between sites
+        adsorbates = [ads for ads,newSite in moves]
+        oldSites = [self.packer.siteBelowAds(ads) for ads in adsorbates]
+        oldEnergy = self._groupEnergy(adsorbates)
+        if not self._relocate(moves):
+            return False
+        deltaE = self._groupEnergy(adsorbates) - oldEnergy
+        if self._accept(deltaE):
+            self.energy += deltaE
+            return True
+        self._relocate(list(zip(adsorbates,oldSites)))
+        return False
+
+    def _choice(self,items):
+        return items[int(self.rng.integers(len(items)))]
+
+    def _hop(self):
+        placed = self.packer.occupiedAdsorbates
+        if len(placed) == 0:
+            return False
+        ads = self._choice(placed)
+        site = self.packer.siteBelowAds(ads)
+        targets = [nei for nei in self.packer.neighborOf(site) if nei.type == ads.siteType]
+        if len(targets) == 0:
+            return False
+        return self._tryRelocation([(ads,self._choice(targets))])
+
+    def _rotate(self):
+        placed = self.packer.occupiedAdsorbates
+        if len(placed) == 0:
+            return False
+        ads = self._choice(placed)
+        variants = self.variants[self.packer.siteBelowAds(ads)]
+        if len(variants) == 0:
+            return False
+        return self._tryRelocation([(ads,self._choice(variants))])
+
+    def _swap(self):
+        placed = self.packer.occupiedAdsorbates
+        if len(placed) < 2:
+            return False
+        adsA = self._choice(placed)
+        partners = [ads for ads in placed if ads.siteType == adsA.siteType
+                    and templateLabel(ads) != templateLabel(adsA)]
+        if len(partners) == 0:
+            return False
+        adsB = self._choice(partners)
+        siteA = self.packer.siteBelowAds(adsA)
+        siteB = self.packer.siteBelowAds(adsB)
+        return self._tryRelocation([(adsA,siteB),(adsB,siteA)])
+
+    def _countTemplate(self,name):
+        return sum(1 for ads in self.packer.occupiedAdsorbates if ads.name == name)
+
+    def _insert(self):
+        #pick a species, then one of its free adsorbates and an available site
+        if len(self.species) == 0:
+            return False
+        name = self._choice(self.species)
+        reservoir = [ads for ads in self.packer.adsorbates
+                     if ads.isFreeAdsorbate() and ads.name == name]
+        if len(reservoir) == 0:
+            return False
+        ads = self._choice(reservoir)
+        pool = self.packer.availableIndex.sitesOfType(ads.siteType)
+        nAvailable = len(pool)
+        if nAvailable == 0:
+            return False
+        site = pool[int(self.rng.integers(nAvailable))]
+        nPlaced = self._countTemplate(name)
+        try:
+            self.packer.placeAdsorbate(ads,site)
+        except AdsorbateHinderedException:
+            return False
+        deltaE = self.localEnergy(ads,site)
+        if self._accept(deltaE - self.mu[name],nAvailable/(nPlaced+1)):
+            self.energy += deltaE
+            return True
+        self.packer.removeAdsorbate(ads)
+        return False
+
+    def _delete(self):
+        #pick a species, then one of its placed adsorbates, the reverse of _insert
+        if len(self.species) == 0:
+            return False
+        name = self._choice(self.species)
+        placed = [ads for ads in self.packer.occupiedAdsorbates if ads.name == name]
+        if len(placed) == 0:
+            return False
+        ads = self._choice(placed)
+        site = self.packer.siteBelowAds(ads)
+        nPlaced = len(placed)
+        deltaE = -self.localEnergy(ads,site)
+        self.packer.removeAdsorbate(ads)
+        nAvailable = len(self.packer.availableIndex.sitesOfType(ads.siteType))
+        if self._accept(deltaE + self.mu[name],nPlaced/max(nAvailable,1)):
+            self.energy += deltaE
+            return True
+        self.packer.placeAdsorbate(ads,site)
+        return False
+
+    def step(self):
+        #attempt one move chosen by moveWeights
+        #output - (move name, whether it was accepted)
+        move = self.MOVES[int(self.rng.choice(len(self.MOVES),p=self._moveProb))]
+        accepted = getattr(self,'_'+move)()
+        self.nAttempted[move] += 1
+        if accepted:
+            self.nAccepted[move] += 1
+        return move,accepted
+
+    def run(self,nSteps,schedule=None,callback=None):
+        #attempt nSteps moves
+        #input - schedule: optional callable(step) -> kT for simulated annealing
+        #        callback: optional callable(montecarlo,step) called after each move
+        #output - the energy of the final state
+        for step in range(nSteps):
+            if schedule is not None:
+                self.kT = schedule(step)
+            self.step()
+            if callback is not None:
+                callback(self,step)
+        return self.energy
@@ -0,0 +1,92 @@
+"""
+Exhaustive enumeration of the packings of the adsorbates of an AdsorbatePacker
+The search is depth-first over the adsorbates, placing them with
+    AdsorbatePacker.placeAdsorbate and backing out with AdsorbatePacker.undo
+Candidate sites are pruned with per-site exclusion bitmasks, and partial
+    packings equivalent under the site symmetry are explored only once, so
+    every inequivalent packing is produced exactly once
+"""
+from .AdsPacker import AdsorbateHinderedException
+from .SubstrateLattice.Symmetry import templateLabel
+
+
+class PackingEnumerator(object):
+    """
+    packer    - the AdsorbatePacker whose adsorbates are packed
+                    every adsorbate of packer.adsorbates is placed in each packing
+    symmetric - if True, packings related by a symmetry operation of the sites
+                    count as one, otherwise only the interchange of adsorbates
+                    copied from the same template is factored out
+    """
+    def __init__(self,packer,symmetric=True):
+        super().__init__()
+        self.packer = packer
+        self.symmetric = symmetric
+
+        sites = packer.sites
+        siteIndex = packer.siteIndex
+        #bitmask of the sites of each type
+        self.typeMasks = {}
+        for i,site in enumerate(sites):
+            self.typeMasks[site.type] = self.typeMasks.get(site.type,0) | (1 << i)
+
+        #bitmask of the sites excluded by occupying site i
+        #   the site itself, its neighbours in siteAdjacency,
+        #   and the other orientations sharing its origin
+        sameOrigin = {}
+        for i,site in enumerate(sites):
+            key = (site.type,) + tuple(round(x,6) for x in site.origin)
+            sameOrigin[key] = sameOrigin.get(key,0) | (1 << i)
+        self.exclusion = []
+        for i,site in enumerate(sites):
+            mask = sameOrigin[(site.type,) + tuple(round(x,6) for x in site.origin)]
+            if site in packer.siteAdjacency:
+                for neiSite in packer.siteAdjacency.neighbors(site):
+                    mask |= 1 << siteIndex[neiSite]
+            self.exclusion.append(mask)
+
+    def _stateKey(self):
+        #key identifying the current partial packing up to equivalence
+        if self.symmetric:
+            return self.packer.fingerprint()
+        return frozenset((self.packer.siteIndex[site],templateLabel(ads))
+                         for site,ads in self.packer.siteOccupation)
+
+    def _search(self,depth,blocked,visited):
+        adsorbates = self.packer.adsorbates
+        if depth == len(adsorbates):
+            yield self.packer.siteOccupation
+            return
+        ads = adsorbates[depth]
+        candidates = self.typeMasks.get(ads.siteType,0) & ~blocked
+        while candidates:
+            lowest = candidates & -candidates
+            candidates ^= lowest
+            i = lowest.bit_length() - 1
+            try:
+                self.packer.placeAdsorbate(ads,self.packer.sites[i])
+            except AdsorbateHinderedException:
+                continue
+            key = self._stateKey()
+            if key in visited[depth]:
+                self.packer.undo()
+                continue
+            visited[depth].add(key)
+            yield from self._search(depth+1,blocked | self.exclusion[i],visited)
+            self.packer.undo()
+
+    def __iter__(self):
+        #yield every inequivalent packing once
+        #   as the packer's siteOccupation list of (site,adsorbate) tuples
+        #   the packer holds that packing until the next item is requested
+        #the packer is reset before and after the enumeration
+        self.packer.reset()
+        visited = [set() for ads in self.packer.adsorbates]
+        try:
+            yield from self._search(0,0,visited)
+        finally:
+            self.packer.reset()
+
+    def count(self):
+        #the number of inequivalent packings, e.g. for sizing a campaign
+        return sum(1 for packing in self)
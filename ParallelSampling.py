@@ -0,0 +1,81 @@
+"""
+Parallel sampling of packed conformations over a process pool
+The requested samples are split into fixed-size chunks, and each chunk gets
+    its own child of one numpy.random.SeedSequence
+Every chunk starts from a pristine copy of the packer, so the output depends
+    only on the seed and the chunk size, not on the number of workers
+Distortion functions must take the rng keyword for this to hold, see
+    AdsorbateDistortor.addDistFunction
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pickle
+
+import numpy as np
+
+#pickled packer of the current worker process
+_workerPacker = None
+
+
+def _initWorker(packerBytes):
+    global _workerPacker
+    _workerPacker = packerBytes
+
+
+def _sampleChunk(n,seedSeq,maxBacktrack,packerBytes=None):
+    #sample n conformations from a fresh copy of the packer
+    #output - (n,n_atoms,3) array of coordinates
+    if packerBytes is None:
+        packerBytes = _workerPacker
+    packer = pickle.loads(packerBytes)
+    packer.reseed(seedSeq)
+    symbols,coords = next(packer.sample(n,batchSize=n,maxBacktrack=maxBacktrack))
+    return coords
+
+
+def parallelSample(packer,n,seed=None,nWorkers=None,chunkSize=1000,maxBacktrack=0):
+    #sample n conformations of packer on a process pool
+    #input - packer: the AdsorbatePacker to sample, it must be picklable
+    #                   together with its distortion functions
+    #        n: the number of conformations
+    #        seed: int or numpy.random.SeedSequence of the whole campaign
+    #               None draws fresh entropy from the system
+    #        nWorkers: the number of worker processes
+    #                   None uses every core, 0 samples in the calling process
+    #        chunkSize: the number of conformations per task
+    #        maxBacktrack: passed to randomPacking
+    #output - yields (symbols,coords) per chunk in chunk order
+    #           coords is a (k,n_atoms,3) array, k <= chunkSize
+    #           symbols is one (n_atoms,) array shared by every yield
+    seedSeq = seed if isinstance(seed,np.random.SeedSequence) else np.random.SeedSequence(seed)
+    chunkSizes = [min(chunkSize,n-start) for start in range(0,n,chunkSize)]
+    chunkSeeds = seedSeq.spawn(len(chunkSizes))
+    symbols = packer.conformationSymbols(includeFree=True)
+    packerBytes = pickle.dumps(packer)
+
+    if nWorkers == 0:
+        for size,chunkSeed in zip(chunkSizes,chunkSeeds):
+            yield symbols,_sampleChunk(size,chunkSeed,maxBacktrack,packerBytes)
+        return
+
+    if nWorkers is None:
+        nWorkers = os.cpu_count()
+    with ProcessPoolExecutor(max_workers=nWorkers,
+                             initializer=_initWorker,
+                             initargs=(packerBytes,)) as pool:
+        #keep a bounded number of chunks in flight so that memory stays
+        #   constant when the consumer is slower than the workers
+        maxPending = 2*nWorkers
+        tasks = iter(zip(chunkSizes,chunkSeeds))
+        pending = deque()
+        for size,chunkSeed in tasks:
+            pending.append(pool.submit(_sampleChunk,size,chunkSeed,maxBacktrack))
+            if len(pending) >= maxPending:
+                break
+        while len(pending) > 0:
+            coords = pending.popleft().result()
+            for size,chunkSeed in tasks:
+                pending.append(pool.submit(_sampleChunk,size,chunkSeed,maxBacktrack))
+                break
+            yield symbols,coords
@@ -7,18 +7,38 @@ Lattice parameters (3 3d vectors)
 """
 import numpy as np
 import networkx as nx
+from scipy.spatial import cKDTree
+
+from ..Utilities.CellList import neighbourPairs
+from ..Utilities.UtilFunctions import latticeShifts,minimumImage,wrapCoordinates
+from .Symmetry import SurfaceSymmetry
+from .Supercell import tileSubstrate
 
 class SubstrateLattice(object):
+    #smallest elevation above the surface plane of a neighbour that covers an atom
+    coverElevation = np.pi/6
+
     def __init__(self,cluster,              #lattice atoms
                  a=(1.,0.,0.),              #lattice dimensiion vectors
                  b=(0.,1.,0.),
-                 c=(0.,0.,1.)):
+                 c=(0.,0.,1.),
+                 pbc=False,                 #periodicity along a, b, c
+                 surfaceMode='flat',        #'flat' or 'coordination', see below
+                 bondCutoff=None):          #bond length cutoff of 'coordination'
         #super().__init__()
         #lattice constant vectors
         #length is in Angstroms
         self.a = np.array(a)
         self.b = np.array(b)
         self.c = np.array(c)
+
+        #periodic boundary condition flags along a, b, and c
+        #   either 3 bools or a single bool
+        #   a single True means periodic along a and b, i.e. the surface plane
+        if pbc is True or pbc is False:
+            self.pbc = (pbc,pbc,False)
+        else:
+            self.pbc = tuple(bool(p) for p in pbc)
         
         #HOLUDA.cluster that includes
         #  atom type, atom position, and connectivity
@@ -28,21 +48,104 @@ class SubstrateLattice(object):
         #assume z direction is the normal direction of the surface
         self.positiveDir = np.array([0.,0.,1.])
         
-        #this is only suitable for perfect surfaces
-        #   for defected surfaces, this method is subject to change
-        maxZ = max([atom.coordinate.z for atom in self.cluster])
-        self.surface = self.surfaceAtZ(z=maxZ)
+        #surfaceMode 'flat' takes the atoms at the largest z
+        #   this is only suitable for perfect surfaces
+        #surfaceMode 'coordination' takes the atoms exposed along positiveDir,
+        #   see exposedAtoms, and bonds them within bondCutoff with a cell list
+        #   steps, adatoms, and vacancies are found as well
+        self.surfaceMode = surfaceMode
+        if surfaceMode == 'flat':
+            maxZ = max([atom.coordinate.z for atom in self.cluster])
+            self.surface = self.surfaceAtZ(z=maxZ)
 
-        #the surfaceConGraph is a networkx.Graph() instance
-        self.surfaceConGraph = self.surface.connectivityGraph()
+            #the surfaceConGraph is a networkx.Graph() instance
+            self.surfaceConGraph = self.surface.connectivityGraph()
+        elif surfaceMode == 'coordination':
+            self.bondCutoff = self.estimateBondCutoff() if bondCutoff is None else bondCutoff
+            self.surface = self.cluster.subCluster(self.exposedAtoms(self.bondCutoff))
+            self.surfaceConGraph = self.bondGraph(self.surface,self.bondCutoff)
+        else:
+            raise ValueError("unknown surfaceMode {}".format(surfaceMode))
 
 
         #list of active sites
         self.sites = []
         #site adjacency graph
         self.siteAdjacency = nx.Graph()
+
+        #symmetry operations of the surface, built on first use
+        self._surfaceSymmetry = None
         
 
+    @property
+    def cell(self):
+        #lattice vectors as rows of a (3,3) array
+        return np.array([self.a,self.b,self.c],dtype=float)
+
+    @property
+    def isPeriodic(self):
+        return any(self.pbc)
+
+    @property
+    def imageShifts(self):
+        #translations to the home cell and its adjacent periodic images
+        return latticeShifts(self.cell,self.pbc)
+
+    @property
+    def surfaceSymmetry(self):
+        #SurfaceSymmetry instance of self.surface, built on first use
+        if self._surfaceSymmetry is None:
+            self._surfaceSymmetry = SurfaceSymmetry(self)
+        return self._surfaceSymmetry
+
+    @property
+    def cellWidths(self):
+        #distance between opposite cell faces along each lattice vector
+        cell = self.cell
+        volume = abs(np.linalg.det(cell))
+        return np.array([volume/np.linalg.norm(np.cross(cell[(i+1)%3],cell[(i+2)%3]))
+                         for i in range(3)])
+
+    def imageShiftsWithin(self,cutoff):
+        #translations to every periodic image closer than cutoff to the home cell
+        #   imageShifts only reaches the adjacent images, which is not enough
+        #   once cutoff exceeds the width of the cell
+        widths = self.cellWidths[np.array(self.pbc,dtype=bool)]
+        reach = max(1,int(np.ceil(cutoff/widths.min()))) if len(widths) > 0 else 1
+        return latticeShifts(self.cell,self.pbc,reach=reach)
+
+    def supercell(self,n,m):
+        #the n x m supercell of this substrate, tiled from its sites and adjacency
+        #   no site is generated again, see Supercell.tileSubstrate
+        #   the sites of this cell must be complete, i.e. include those over the
+        #   bonds and faces across its periodic boundary
+        return tileSubstrate(self,n,m)
+
+    def minimumImage(self,vecs):
+        #shortest periodic image of displacement vectors, shape (...,3)
+        return minimumImage(vecs,self.cell,self.pbc)
+
+    def wrap(self,coords):
+        #coordinates translated into the home cell, shape (...,3)
+        return wrapCoordinates(coords,self.cell,self.pbc)
+
+    def nearImages(self,coords,margin):
+        #the points of coords and their periodic images within margin of the home cell
+        #input - coords: (n,3) array of coordinates inside the home cell
+        #        margin: the distance from the cell faces that is kept
+        #output - (m,3) array, m >= n
+        coords = np.asarray(coords,dtype=float).reshape(-1,3)
+        if not self.isPeriodic:
+            return coords
+        cell = self.cell
+        images = (coords[None,:,:] + self.imageShifts[:,None,:]).reshape(-1,3)
+        frac = images @ np.linalg.inv(cell)
+        fracMargin = margin/self.cellWidths
+        periodic = np.array(self.pbc,dtype=bool)
+        inside = ((frac[:,periodic] > -fracMargin[periodic]) &
+                  (frac[:,periodic] < 1.+fracMargin[periodic])).all(axis=1)
+        return images[inside]
+
     def surfaceAtZ(self,z = 0.,zVar=0.1):
         #gives a cluster of atoms between z-zVar and z+zVar
         
@@ -52,6 +155,64 @@ class SubstrateLattice(object):
         surfaceCluster = self.cluster.subCluster(surfaceAtoms)
         return surfaceCluster
     
+    def estimateBondCutoff(self,scale=1.2):
+        #scale times the median distance between an atom and its nearest neighbour
+        coords = np.array(self.absAtomCoordinate(withAtoms=False),dtype=float).reshape(-1,3)
+        if len(coords) < 2 and not self.isPeriodic:
+            raise ValueError("a bond cutoff needs at least two atoms")
+        shifts = self.imageShifts
+        images = (coords[None,:,:] + shifts[:,None,:]).reshape(-1,3)
+        #the nearest point to an atom is the atom itself
+        dists = cKDTree(images).query(coords,k=2)[0][:,1]
+        return scale*float(np.median(dists))
+
+    def coordinationAnalysis(self,bondCutoff):
+        #coordination number of every atom and the number of its neighbours
+        #   covering it, i.e. lying more than coverElevation above the surface plane
+        #input - bondCutoff: the largest distance between bonded atoms
+        #output - (coordinationNumbers,coverNumbers) int arrays in cluster order
+        coords = np.array(self.absAtomCoordinate(withAtoms=False),dtype=float).reshape(-1,3)
+        natom = len(coords)
+        i,j,shiftIndex,dist = neighbourPairs(coords,bondCutoff,shifts=self.imageShifts)
+        coordinationNumbers = np.bincount(i,minlength=natom) + np.bincount(j,minlength=natom)
+        #elevation of j seen from i, that of i seen from j is its negative
+        bondVecs = coords[j] + self.imageShifts[shiftIndex] - coords[i]
+        height = (bondVecs @ self.positiveDir)/(np.linalg.norm(self.positiveDir)*dist)
+        cover = np.sin(self.coverElevation)
+        coverNumbers = (np.bincount(i[height > cover],minlength=natom) +
+                        np.bincount(j[height < -cover],minlength=natom))
+        return coordinationNumbers,coverNumbers
+
+    def exposedAtoms(self,bondCutoff):
+        #the atoms of the cluster exposed along positiveDir
+        #   the most coordinated atoms are taken as bulk, an atom is exposed if
+        #   fewer neighbours cover it than cover the most covered bulk atom
+        #   with a single layer, no atom is covered and every atom is exposed
+        #input - bondCutoff: the largest distance between bonded atoms
+        #output - list of the exposed atom data entries
+        coordinationNumbers,coverNumbers = self.coordinationAnalysis(bondCutoff)
+        #kept for reporting
+        self.coordinationNumbers = coordinationNumbers
+        self.coverNumbers = coverNumbers
+        isExposed = np.ones(len(coverNumbers),dtype=bool)
+        if len(coverNumbers) > 0:
+            isBulk = coordinationNumbers == coordinationNumbers.max()
+            bulkCover = coverNumbers[isBulk].max()
+            if bulkCover > 0:
+                isExposed = coverNumbers < bulkCover
+        return [atom for atom,exposed in zip(self.cluster,isExposed) if exposed]
+
+    def bondGraph(self,atoms,bondCutoff):
+        #networkx.Graph of the atoms, joining those closer than bondCutoff
+        #   bonds across a periodic boundary join the nearest images
+        atoms = list(atoms)
+        coords = np.array([np.array(atom.coordinate) for atom in atoms],dtype=float).reshape(-1,3)
+        i,j,shiftIndex,dist = neighbourPairs(coords,bondCutoff,shifts=self.imageShifts)
+        graph = nx.Graph()
+        graph.add_nodes_from(atoms)
+        graph.add_edges_from((atoms[a],atoms[b]) for a,b in zip(i,j))
+        return graph
+
     def absAtomCoordinate(self,withAtoms=True):
         atomCoords = []
         for atomData in self.cluster:
@@ -0,0 +1,227 @@
+"""
+Supercells tiled from the sites of a smaller cell
+The sites and site adjacency of a periodic cell (e.g. the primitive surface
+    cell) are generated once, the n x m supercell repeats them along a and b
+Atoms, sites, and bonds are translated copies, and the bonds and adjacency
+    crossing the cell boundary join the copies in the neighbouring tiles
+Pairs are taken over every periodic image of the small cell, so the bonds
+    and adjacency of the supercell are complete
+The sites themselves are only copied, so the cell must be large enough for
+    its own sites to be complete: no surface atom may be bonded to its own
+    image or to two images of one atom, which a bond graph cannot hold
+    (e.g. fcc(111) needs a 3x3 cell), smaller cells are rejected
+No site geometry is computed again, the supercell only costs array operations
+    and the objects holding the copies
+"""
+import copy
+
+import networkx as nx
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ..Utilities.ArrayCoordinate import ArrayCoordinate
+from ..Utilities.CellList import neighbourPairs
+
+
+class AtomImage(object):
+    """
+    A translated copy of an atom data entry of a cluster
+    Answers .atom and .coordinate like the HOLUDA data entry it copies
+    atom   - the atom of the copied entry
+    coords - the (n,3) coordinate array shared by all copies
+    index  - the row of coords holding this copy
+    """
+    __slots__ = ('atom','_coords','_index')
+
+    def __init__(self,atom,coords,index):
+        super().__init__()
+        self.atom = atom
+        self._coords = coords
+        self._index = index
+
+    @property
+    def coordinate(self):
+        return self._coords[self._index].view(ArrayCoordinate)
+
+
+class ImageCluster(object):
+    """
+    The AtomImage entries of a supercell, standing in for a HOLUDA cluster
+    entries - list of AtomImage instances
+    graph   - the connectivity of the entries (networkx.Graph instance)
+                a graph without edges if None
+    """
+    def __init__(self,entries,graph=None):
+        super().__init__()
+        self.dataEntries = list(entries)
+        if graph is None:
+            graph = nx.Graph()
+            graph.add_nodes_from(self.dataEntries)
+        self._graph = graph
+
+    def __iter__(self):
+        return iter(self.dataEntries)
+
+    def __len__(self):
+        return len(self.dataEntries)
+
+    def __getitem__(self,i):
+        return self.dataEntries[i]
+
+    @property
+    def atomCount(self):
+        return len(self.dataEntries)
+
+    def subCluster(self,entries):
+        entries = list(entries)
+        return ImageCluster(entries,self._graph.subgraph(entries).copy())
+
+    def connectivityGraph(self):
+        return self._graph.copy()
+
+
+def _entryIndices(entries,clusterEntries,clusterCoords):
+    #index of each entry in clusterEntries, by identity or else by coordinate
+    #   (a cluster may hand out new entries for its subclusters)
+    index = {entry:k for k,entry in enumerate(clusterEntries)}
+    found = [index.get(entry,-1) for entry in entries]
+    missing = [n for n,k in enumerate(found) if k < 0]
+    if len(missing) > 0:
+        coords = np.array([np.array(entries[n].coordinate) for n in missing],dtype=float).reshape(-1,3)
+        dist,nearest = cKDTree(clusterCoords).query(coords)
+        if (dist > 1e-6).any():
+            raise ValueError("atoms that are not in the cluster of the cell")
+        for n,k in zip(missing,nearest):
+            found[n] = int(k)
+    return np.array(found,dtype=np.int64)
+
+
+def tileSubstrate(cell,n,m):
+    #the n x m supercell of a substrate with sites
+    #input - cell: the SubstrateLattice to repeat, periodic along a and b, its
+    #               sites and site adjacency built
+    #        n, m: the number of copies along a and b
+    #output - a new instance of type(cell) whose lattice vectors are n*a, m*b,
+    #           and c, its cluster and surface ImageCluster instances
+    #         tile t = p*m + q is translated by p*a + q*b, the atoms and
+    #           sites of each tile are in the order of those of cell
+    #         other attributes of cell are shared with the supercell
+    if not (cell.pbc[0] and cell.pbc[1]):
+        raise ValueError("only cells periodic along a and b can be tiled")
+    if n < 1 or m < 1:
+        raise ValueError("the supercell needs at least one tile along a and b")
+    ntile = n*m
+    tileP,tileQ = np.divmod(np.arange(ntile),m)
+    offsets = tileP[:,None]*np.asarray(cell.a,dtype=float) + tileQ[:,None]*np.asarray(cell.b,dtype=float)
+    toFrac = np.linalg.inv(cell.cell)
+
+    def tiledPairs(i,j,shifts,nitem):
+        #(i,j) pairs of every tile, j taken from the tile holding its image
+        #   shifts - translation of the image of j in each template pair
+        steps = np.rint(np.asarray(shifts).reshape(-1,3) @ toFrac).astype(np.int64)
+        imageTiles = (((tileP[:,None] + steps[None,:,0]) % n)*m +
+                      (tileQ[:,None] + steps[None,:,1]) % m)
+        tiledI = np.arange(ntile)[:,None]*nitem + np.asarray(i)[None,:]
+        tiledJ = imageTiles*nitem + np.asarray(j)[None,:]
+        return tiledI.ravel(),tiledJ.ravel()
+
+    #atoms, the coordinates of all copies in one array
+    atomData = list(cell.cluster)
+    natom = len(atomData)
+    coords = np.array([np.array(entry.coordinate) for entry in atomData],dtype=float).reshape(-1,3)
+    tiledCoords = (offsets[:,None,:] + coords[None,:,:]).reshape(-1,3)
+    entries = [AtomImage(entry.atom,tiledCoords,t*natom+k)
+               for t in range(ntile) for k,entry in enumerate(atomData)]
+
+    #surface atoms and their bonds
+    #   an image pair is bonded if it is no longer than the longest bond
+    #   between the same elements in cell
+    surfaceAtoms = list(cell.surface)
+    surfaceIndex = _entryIndices(surfaceAtoms,atomData,coords)
+    surfaceCoords = coords[surfaceIndex]
+    surfaceSlot = {atom:k for k,atom in enumerate(surfaceAtoms)}
+    symbols = [atom.atom.symbol for atom in surfaceAtoms]
+    bondLengths = {}
+    for atomA,atomB in cell.surfaceConGraph.edges():
+        ka,kb = surfaceSlot[atomA],surfaceSlot[atomB]
+        length = np.linalg.norm(cell.minimumImage(surfaceCoords[kb] - surfaceCoords[ka]))
+        key = tuple(sorted((symbols[ka],symbols[kb])))
+        bondLengths[key] = max(bondLengths.get(key,0.),length)
+    graph = nx.Graph()
+    surfaceEntries = [entries[t*natom + k] for t in range(ntile) for k in surfaceIndex]
+    graph.add_nodes_from(surfaceEntries)
+    #a cell of one surface atom per layer only has bonds to its own images,
+    #   which leave the graph without edges
+    if len(surfaceAtoms) > 0 and len(bondLengths) == 0:
+        raise ValueError("the cell is too small to hold all of its sites, "
+                         "its surface atoms have no bonds within it")
+    if len(bondLengths) > 0:
+        cutoff = max(bondLengths.values())*(1. + 1e-6)
+        shifts = cell.imageShiftsWithin(cutoff)
+        i,j,shiftIndex,dist = neighbourPairs(surfaceCoords,cutoff,shifts=shifts,allImages=True)
+        maxLength = np.array([bondLengths.get(tuple(sorted((symbols[a],symbols[b]))),-1.)
+                              for a,b in zip(i,j)]).reshape(-1)
+        bonded = dist <= maxLength*(1. + 1e-6)
+        #bonds to the atom itself come with both shifts
+        nbond = np.count_nonzero(bonded & (i < j)) + np.count_nonzero(bonded & (i == j))//2
+        if nbond != cell.surfaceConGraph.number_of_edges():
+            raise ValueError("the cell is too small to hold all of its sites, "
+                             "its atoms are bonded to several images of one atom")
+        tiledI,tiledJ = tiledPairs(i[bonded],j[bonded],shifts[shiftIndex[bonded]],len(surfaceAtoms))
+        graph.add_edges_from(zip([surfaceEntries[k] for k in tiledI],
+                                 [surfaceEntries[k] for k in tiledJ]))
+
+    #sites, copied with their origin moved and their atoms replaced
+    templateSites = list(cell.sites)
+    nsite = len(templateSites)
+    origins = np.array([site.origin for site in templateSites],dtype=float).reshape(-1,3)
+    tiledOrigins = (offsets[:,None,:] + origins[None,:,:]).reshape(-1,3)
+    clusterIndex = {entry:k for k,entry in enumerate(atomData)}
+    clusterIndex.update({atom:int(k) for atom,k in zip(surfaceAtoms,surfaceIndex)})
+    bound = [[clusterIndex[atom] for atom in site.boundAtoms] for site in templateSites]
+    sites = []
+    for t in range(ntile):
+        base = t*natom
+        for k,site in enumerate(templateSites):
+            tiled = copy.copy(site)
+            tiled._origin = tiledOrigins[t*nsite + k]
+            tiled.boundAtoms = [entries[base + a] for a in bound[k]]
+            sites.append(tiled)
+
+    #site adjacency
+    #   the image pairs of cell are found again from its adjacency threshold,
+    #   otherwise the edges of its siteAdjacency join the nearest images
+    siteSlot = {site:k for k,site in enumerate(templateSites)}
+    if getattr(cell,'adjThresh',None) is not None and hasattr(cell,'adjacentSitePairs'):
+        asList,i,j,pairShifts = cell.adjacentSitePairs(allImages=True)
+        asIndex = np.array([siteSlot[site] for site in asList],dtype=np.int64)
+        i,j = asIndex[i],asIndex[j]
+    else:
+        edges = np.array([(siteSlot[siteA],siteSlot[siteB])
+                          for siteA,siteB in cell.siteAdjacency.edges()],dtype=np.int64).reshape(-1,2)
+        i,j = edges[:,0],edges[:,1]
+        displacements = origins[j] - origins[i]
+        pairShifts = cell.minimumImage(displacements) - displacements
+    siteAdjacency = nx.Graph()
+    siteAdjacency.add_nodes_from(site for site,templateSite in zip(sites,templateSites*ntile)
+                                 if templateSite in cell.siteAdjacency)
+    tiledI,tiledJ = tiledPairs(i,j,pairShifts,nsite)
+    siteAdjacency.add_edges_from(zip([sites[k] for k in tiledI],[sites[k] for k in tiledJ]))
+
+    supercell = object.__new__(type(cell))
+    supercell.__dict__.update(cell.__dict__)
+    supercell.a = n*np.asarray(cell.a,dtype=float)
+    supercell.b = m*np.asarray(cell.b,dtype=float)
+    supercell.cluster = ImageCluster(entries)
+    supercell.surface = ImageCluster(surfaceEntries,graph)
+    supercell.surfaceConGraph = graph
+    supercell.sites = sites
+    supercell.siteAdjacency = siteAdjacency
+    supercell._surfaceSymmetry = None
+    #the normals of the copies are those of the atoms they copy
+    normals = cell.__dict__.get('_surfaceAtomNormals')
+    if normals is not None:
+        templateNormals = [normals[atom] for atom in surfaceAtoms]
+        supercell._surfaceAtomNormals = {entry:templateNormals[k % len(surfaceAtoms)]
+                                         for k,entry in enumerate(surfaceEntries)}
+    return supercell
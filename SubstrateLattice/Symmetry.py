@@ -0,0 +1,429 @@
+"""
+Symmetry of the active sites of a substrate
+An operation x -> R x + t, R being a rotation about the surface normal, is a
+    symmetry of the site set if it maps every site onto a site of the same
+    type, origin, and tangent direction (up to the lattice periodicity)
+    The tangent of a vertex site is only matched if asked for, as it does not
+    matter when the adsorbates on vertex sites are symmetric about the normal
+Each operation is stored as a permutation of the site indices, which is all
+    that is needed to canonicalize an occupation state
+The surface atoms have a symmetry of their own (SurfaceSymmetry), whose orbits
+    tell which atoms, and so which sites, only differ by a symmetry operation
+"""
+import hashlib
+import zlib
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+
+def rotationAbout(axis,theta):
+    #rotation matrix of angle theta around axis (Rodrigues' formula)
+    axis = np.asarray(axis,dtype=float)
+    axis = axis/np.linalg.norm(axis)
+    K = np.array([[0.,-axis[2],axis[1]],
+                  [axis[2],0.,-axis[0]],
+                  [-axis[1],axis[0],0.]])
+    return np.identity(3) + np.sin(theta)*K + (1.-np.cos(theta))*np.dot(K,K)
+
+
+def mirrorAcross(planeNormal):
+    #reflection matrix through the plane of normal planeNormal containing the origin
+    m = np.asarray(planeNormal,dtype=float)
+    m = m/np.linalg.norm(m)
+    return np.identity(3) - 2.*np.outer(m,m)
+
+
+def orbitLabels(npoint,perms):
+    #orbit label of each of npoint points under the group generated by perms
+    #   labels are numbered in the order of the first point of each orbit
+    #output - (labels,representatives), representatives being the first
+    #           point of each orbit
+    perms = [np.asarray(perm,dtype=np.int64) for perm in perms]
+    if npoint == 0:
+        return np.empty(0,dtype=np.int64),np.empty(0,dtype=np.int64)
+    if len(perms) == 0:
+        return np.arange(npoint),np.arange(npoint)
+    rows = np.tile(np.arange(npoint),len(perms))
+    cols = np.concatenate(perms)
+    graph = coo_matrix((np.ones(len(rows),dtype=np.int8),(rows,cols)),shape=(npoint,npoint))
+    labels = connected_components(graph,directed=True,connection='weak')[1]
+    #renumber by first occurrence
+    _,first,inverse = np.unique(labels,return_index=True,return_inverse=True)
+    rank = np.argsort(np.argsort(first))
+    return rank[inverse.ravel()],np.sort(first)
+
+
+def rowGroups(rows):
+    #group index of each row of a 2d int array, equal rows share their index
+    #   (a lexsort is much faster than np.unique(axis=0) on tall arrays)
+    order = np.lexsort(rows.T[::-1])
+    sortedRows = rows[order]
+    isNew = np.ones(len(rows),dtype=bool)
+    isNew[1:] = (sortedRows[1:] != sortedRows[:-1]).any(axis=1)
+    groups = np.empty(len(rows),dtype=np.int64)
+    groups[order] = np.cumsum(isNew) - 1
+    return groups
+
+
+def templateLabel(adsorbate):
+    #an integer label of the adsorbate template, stable across processes
+    #   adsorbates copied from one template share their name
+    return zlib.crc32(adsorbate.name.encode())
+
+
+class SiteSymmetry(object):
+    """
+    The translation and rotation symmetry operations of a site set
+    sites     - the list of active sites, their order defines the site indices
+    substrate - the SubstrateLattice holding the sites
+                    its lattice vectors and pbc flags define the periodicity
+                    and its positiveDir the rotation axis
+    folds     - the rotation orders to test, e.g. (2,3,4,6)
+    tol       - the distance below which two sites are considered identical
+    vertexTangents - whether the tangents of vertex sites are matched, needed
+                    unless every vertex adsorbate lies on the site normal
+    """
+    #weights of the tangent direction and the site type when matching sites
+    tangentWeight = 1.0
+    typeWeight = 100.0
+    #the number of sites checked for every candidate operation before all are
+    nProbe = 8
+
+    def __init__(self,sites,substrate,folds=(2,3,4,6),tol=0.05,vertexTangents=True):
+        super().__init__()
+        self.sites = list(sites)
+        self.substrate = substrate
+        self.tol = tol
+        self.vertexTangents = vertexTangents
+        #list of (R,t) tuples
+        self.operations = []
+        #(n_operations,n_sites) array, row k maps site i onto site permutations[k,i]
+        self.permutations = np.empty((0,len(self.sites)),dtype=np.int64)
+
+        angles = sorted({2*np.pi*m/f for f in folds for m in range(f)})
+        self._findOperations([rotationAbout(substrate.positiveDir,theta) for theta in angles])
+
+    def _matchKeys(self,origins,tangents,types,tangentWeights):
+        #points in the space in which sites are matched
+        origins = self.substrate.wrap(origins)
+        return np.concatenate([origins,
+                               tangents*tangentWeights[...,None],
+                               types[...,None]*self.typeWeight],axis=-1)
+
+    def _findOperations(self,rotations):
+        nsite = len(self.sites)
+        if nsite == 0:
+            return
+        origins = np.array([site.origin for site in self.sites],dtype=float)
+        tangents = np.array([site.tangentDir for site in self.sites],dtype=float)
+        types = np.array([site.type.value for site in self.sites],dtype=float)
+        #without vertexTangents, a rotation about a vertex site maps it onto
+        #   itself whatever it does to the tangent
+        tangentWeights = np.array([0. if site.type == site.V and not self.vertexTangents
+                                   else self.tangentWeight for site in self.sites])
+
+        #tree of the site keys, including the periodic images of the origins
+        #   so that sites mapped across the cell boundary are still matched
+        keys = self._matchKeys(origins,tangents,types,tangentWeights)
+        shifts = self.substrate.imageShifts
+        imageKeys = np.concatenate([keys + np.concatenate([shift,np.zeros(4)]) for shift in shifts])
+        imageIndex = np.tile(np.arange(nsite),len(shifts))
+        tree = cKDTree(imageKeys)
+
+        #every operation maps a reference site onto a site of the same type
+        #   the type with the fewest sites gives the fewest candidates
+        #   sites labelled with their orbit only map onto sites of that orbit
+        orbits = np.array([-1 if getattr(site,'orbit',None) is None else site.orbit
+                           for site in self.sites])
+        groups = orbits if (orbits >= 0).all() else types
+        groupValues,groupCounts = np.unique(groups,return_counts=True)
+        targets = np.flatnonzero(groups == groupValues[np.argmin(groupCounts)])
+        ref = targets[0]
+        #a few sites spread over the set reject most candidates cheaply
+        probe = np.unique(np.linspace(0,nsite-1,min(self.nProbe,nsite)).astype(np.int64))
+
+        def siteMatches(R,t,members):
+            #index of the site matching the image of each of members, -1 if none
+            imgKeys = self._matchKeys(origins[members] @ R.T + t,tangents[members] @ R.T,
+                                      types[members],tangentWeights[members])
+            dist,idx = tree.query(imgKeys.reshape(-1,7),distance_upper_bound=self.tol)
+            found = np.isfinite(dist)
+            matches = np.full(len(members),-1,dtype=np.int64)
+            matches[found] = imageIndex[idx[found]]
+            return matches
+
+        perms = []
+        seen = set()
+        allSites = np.arange(nsite)
+        for R in rotations:
+            for t in origins[targets] - origins[ref] @ R.T:
+                if (siteMatches(R,t,probe) < 0).any():
+                    continue
+                perm = siteMatches(R,t,allSites)
+                if (perm < 0).any():
+                    continue
+                #sites sharing an origin give the same t more than once
+                if perm.tobytes() in seen:
+                    continue
+                if len(np.unique(perm)) == nsite:
+                    seen.add(perm.tobytes())
+                    self.operations.append((R,t))
+                    perms.append(perm)
+        if len(perms) > 0:
+            self.permutations = np.array(perms,dtype=np.int64)
+
+    def __len__(self):
+        return len(self.operations)
+
+    def canonicalForm(self,siteIndices,labels):
+        #the canonical representative of an occupation state
+        #input - siteIndices: indices of the occupied sites
+        #        labels: integer template labels of the adsorbates on them
+        #output - sorted int64 array, equal for all symmetry-equivalent states
+        siteIndices = np.asarray(siteIndices,dtype=np.int64)
+        labels = np.asarray(labels,dtype=np.int64)
+        if len(siteIndices) == 0 or len(self.permutations) == 0:
+            return np.sort((siteIndices << 32) | labels)
+        keys = (self.permutations[:,siteIndices] << 32) | labels[None,:]
+        keys.sort(axis=1)
+        #lexicographically smallest row, column 0 being the primary key
+        best = np.lexsort(keys.T[::-1])[0]
+        return keys[best]
+
+    def fingerprint(self,siteIndices,labels):
+        #compact hash of the canonical form of an occupation state
+        canonical = self.canonicalForm(siteIndices,labels)
+        return hashlib.blake2b(canonical.tobytes(),digest_size=16).digest()
+
+
+
+class SurfaceSymmetry(object):
+    """
+    The symmetry operations of the surface atoms of a substrate and their orbits
+    An operation x -> R x + t, R being a rotation about or a mirror plane
+        containing the surface normal, is a symmetry if it maps every atom of
+        the substrate onto an atom of the same element (up to the lattice
+        periodicity) and every bond of surfaceConGraph onto a bond
+    The atoms below the surface count, so that e.g. the fcc and hcp hollows of
+        an fcc(111) slab fall into different orbits
+    Only a generating set of the operations is kept, which is enough to find
+        the orbits of the atoms and of anything built from them
+    substrate - the SubstrateLattice, its surface and surfaceConGraph are analysed
+    folds     - the rotation orders to test, e.g. (2,3,4,6)
+                    mirror planes are tested at multiples of pi/fold from
+                    the lattice vector a
+    tol       - the distance below which two atoms are considered identical
+    nTargets  - the number of atoms, nearest first, tried as the image of the
+                    reference atom under each rotation or mirror
+    """
+    #weight of the element when matching atoms
+    elementWeight = 100.0
+    #smallest cosine between the image of a site tangent and the matched tangent
+    tangentCos = 0.99
+
+    def __init__(self,substrate,folds=(2,3,4,6),tol=0.05,nTargets=24):
+        super().__init__()
+        self.substrate = substrate
+        self.tol = tol
+        self.atoms = list(substrate.surface)
+        #surface atom data entry -> atom index
+        self.atomIndex = {atom:n for n,atom in enumerate(self.atoms)}
+        natom = len(self.atoms)
+        #generating set of (R,t) tuples
+        self.operations = []
+        #(n_operations,n_atoms) array, row k maps atom i onto atom permutations[k,i]
+        self.permutations = np.empty((0,natom),dtype=np.int64)
+        #orbit label of each atom and the first atom of each orbit
+        self.atomOrbits = np.arange(natom)
+        self.representatives = np.arange(natom)
+        #(n_atoms,3,3) array, the point operation taking the normal of the
+        #   representative of each atom's orbit onto that atom
+        self.orbitRotations = np.tile(np.identity(3),(natom,1,1))
+        if natom == 0:
+            return
+
+        pdir = np.asarray(substrate.positiveDir,dtype=float)
+        pdir = pdir/np.linalg.norm(pdir)
+        angles = sorted({2*np.pi*m/f for f in folds for m in range(f)} - {0.})
+        pointOps = [rotationAbout(pdir,theta) for theta in angles]
+        #mirror planes, measured from the in-plane part of a
+        inPlane = substrate.a - np.dot(substrate.a,pdir)*pdir
+        if np.linalg.norm(inPlane) > 1e-8:
+            u = inPlane/np.linalg.norm(inPlane)
+            v = np.cross(pdir,u)
+            phis = sorted({np.pi*m/f for f in folds for m in range(f)})
+            pointOps += [mirrorAcross(np.cos(phi)*v - np.sin(phi)*u) for phi in phis]
+        self._findGenerators(pointOps,nTargets)
+        self._findOrbits()
+
+    def _matchKeys(self,coords,elements):
+        #points in the space in which atoms are matched
+        coords = self.substrate.wrap(coords)
+        return np.concatenate([coords,elements[...,None]*self.elementWeight],axis=-1)
+
+    def _findGenerators(self,pointOps,nTargets):
+        natom = len(self.atoms)
+        coords = np.array([np.array(atom.coordinate) for atom in self.atoms],dtype=float).reshape(-1,3)
+        allAtoms = self.substrate.absAtomCoordinate()
+        allCoords = np.array([coord for atom,coord in allAtoms],dtype=float).reshape(-1,3)
+        symbolCodes = {symbol:n for n,symbol in enumerate(sorted({atom.symbol for atom,coord in allAtoms}))}
+        elements = np.array([symbolCodes[atom.atom.symbol] for atom in self.atoms],dtype=float)
+        allElements = np.array([symbolCodes[atom.symbol] for atom,coord in allAtoms],dtype=float)
+
+        #trees of the atom keys, including the periodic images of the coordinates
+        shifts = self.substrate.imageShifts
+        def imageTree(keys):
+            imageKeys = np.concatenate([keys + np.concatenate([shift,[0.]]) for shift in shifts])
+            return cKDTree(imageKeys),np.tile(np.arange(len(keys)),len(shifts))
+        tree,imageIndex = imageTree(self._matchKeys(coords,elements))
+        allTree,allImageIndex = imageTree(self._matchKeys(allCoords,allElements))
+
+        def isSubstrateSymmetry(R,t):
+            #whether R x + t maps every atom of the substrate onto an atom
+            #   the atoms around the reference atom are checked first
+            dist = allTree.query(self._matchKeys(allLocal @ R.T + t,allLocalElements),
+                                 distance_upper_bound=self.tol)[0]
+            if not np.isfinite(dist).all():
+                return False
+            dist,idx = allTree.query(self._matchKeys(allCoords @ R.T + t,allElements),
+                                     distance_upper_bound=self.tol)
+            return (np.isfinite(dist).all() and
+                    len(np.unique(allImageIndex[idx])) == len(allCoords))
+
+        #directed bonds, an operation must map them onto bonds
+        graph = self.substrate.surfaceConGraph
+        bonds = np.array([(self.atomIndex[atomA],self.atomIndex[atomB])
+                          for atomA,atomB in graph.edges()],dtype=np.int64).reshape(-1,2)
+        bonds = np.concatenate([bonds,bonds[:,::-1]])
+        bondKeys = bonds[:,0]*natom + bonds[:,1]
+        bondOrder = np.argsort(bondKeys)
+        sortedBondKeys = bondKeys[bondOrder]
+
+        def bondPermutation(perm):
+            #permutation of the directed bonds, None if a bond maps onto no bond
+            mapped = perm[bonds[:,0]]*natom + perm[bonds[:,1]]
+            pos = np.minimum(np.searchsorted(sortedBondKeys,mapped),len(bonds)-1)
+            if len(bonds) > 0 and not (sortedBondKeys[pos] == mapped).all():
+                return None
+            return bondOrder[pos]
+
+        #reference atom of the rarest element, its images are its nearest
+        #   atoms of the same element
+        counts = np.bincount(elements.astype(np.int64))
+        sameElement = np.flatnonzero(elements == np.argmin(counts))
+        ref = sameElement[0]
+        refDists = np.linalg.norm(self.substrate.minimumImage(coords - coords[ref]),axis=-1)
+        targets = sameElement[np.argsort(refDists[sameElement],kind='stable')[:nTargets]]
+        #the neighbourhood of the reference atom is checked before all atoms
+        local = np.argsort(refDists,kind='stable')[:16]
+        allRefDists = np.linalg.norm(self.substrate.minimumImage(allCoords - coords[ref]),axis=-1)
+        allLocal = allCoords[np.argsort(allRefDists,kind='stable')[:32]]
+        allLocalElements = allElements[np.argsort(allRefDists,kind='stable')[:32]]
+
+        #an operation is kept if it joins orbits of atoms or directed bonds,
+        #   the latter so that point operations are kept alongside translations
+        identity = np.arange(natom)
+        npoint = natom + len(bonds)
+        minOrbits = 1 + (len(bonds) > 0)
+        pointPerms = []
+        labels = np.arange(npoint)
+        norbit = npoint
+        perms = []
+        for R in [np.identity(3)] + pointOps:
+            rotCoords = coords @ R.T
+            trans = coords[targets] - rotCoords[ref]
+            localKeys = self._matchKeys(rotCoords[local][None,:,:] + trans[:,None,:],
+                                        np.broadcast_to(elements[local],(len(trans),len(local))))
+            dist = tree.query(localKeys.reshape(-1,4),distance_upper_bound=self.tol)[0]
+            isLocalMatch = np.isfinite(dist.reshape(len(trans),len(local))).all(axis=1)
+            for t in trans[isLocalMatch]:
+                if norbit <= minOrbits:
+                    break
+                dist,idx = tree.query(self._matchKeys(rotCoords + t,elements),
+                                      distance_upper_bound=self.tol)
+                if not np.isfinite(dist).all():
+                    continue
+                perm = imageIndex[idx]
+                if np.array_equal(perm,identity) or len(np.unique(perm)) != natom:
+                    continue
+                bondPerm = bondPermutation(perm)
+                if bondPerm is None:
+                    continue
+                pointPerm = np.concatenate([perm,natom + bondPerm])
+                #operations of the group generated so far keep every orbit
+                if (labels[pointPerm] == labels).all():
+                    continue
+                if not isSubstrateSymmetry(R,t):
+                    continue
+                pointPerms.append(pointPerm)
+                labels = orbitLabels(npoint,pointPerms)[0]
+                norbit = labels.max() + 1
+                self.operations.append((R,self.substrate.minimumImage(t)))
+                perms.append(perm)
+        if len(perms) > 0:
+            self.permutations = np.array(perms,dtype=np.int64)
+
+    def _findOrbits(self):
+        #orbit labels of the atoms, and the point operation reaching each atom
+        #   from its representative, by a breadth first walk over the generators
+        natom = len(self.atoms)
+        self.atomOrbits,self.representatives = orbitLabels(natom,self.permutations)
+        reached = np.zeros(natom,dtype=bool)
+        reached[self.representatives] = True
+        frontier = self.representatives
+        while len(frontier) > 0:
+            found = []
+            for (R,t),perm in zip(self.operations,self.permutations):
+                images = perm[frontier]
+                fresh = ~reached[images]
+                images,first = np.unique(images[fresh],return_index=True)
+                sources = frontier[fresh][first]
+                self.orbitRotations[images] = R @ self.orbitRotations[sources]
+                reached[images] = True
+                found.append(images)
+            frontier = np.concatenate(found) if len(found) > 0 else found
+
+    @property
+    def norbit(self):
+        return len(self.representatives)
+
+    def siteOrbits(self,sites):
+        #orbit label of each site, equal for sites mapped onto each other
+        #   a site maps onto the site of the same type over the image of its
+        #   bound atoms whose tangent direction is closest to the image tangent
+        #input - sites: active sites bound to atoms of the surface
+        #output - (n_sites,) int array, numbered in the order of the first site
+        #           of each orbit
+        nsite = len(sites)
+        if nsite == 0:
+            return np.empty(0,dtype=np.int64)
+        nbound = max(len(site.boundAtoms) for site in sites)
+        bound = np.full((nsite,nbound),-1,dtype=np.int64)
+        for n,site in enumerate(sites):
+            bound[n,:len(site.boundAtoms)] = [self.atomIndex[atom] for atom in site.boundAtoms]
+        types = np.array([site.type.value for site in sites],dtype=np.int64)
+        tangents = np.array([site.tangentDir for site in sites],dtype=float).reshape(-1,3)
+        siteKeys = np.concatenate([types[:,None],np.sort(bound,axis=1)],axis=1)
+
+        sitePerms = []
+        for (R,t),perm in zip(self.operations,self.permutations):
+            mappedBound = np.where(bound >= 0,perm[np.maximum(bound,0)],-1)
+            mappedKeys = np.concatenate([types[:,None],np.sort(mappedBound,axis=1)],axis=1)
+            groups = rowGroups(np.concatenate([siteKeys,mappedKeys]))
+            #the sites sharing the key of each image
+            order = np.argsort(groups[:nsite],kind='stable')
+            sortedGroups = groups[:nsite][order]
+            starts = np.searchsorted(sortedGroups,groups[nsite:],side='left')
+            counts = np.searchsorted(sortedGroups,groups[nsite:],side='right') - starts
+            offsets = np.minimum(np.arange(max(counts.max(),1))[None,:],
+                                 np.maximum(counts[:,None]-1,0))
+            candidates = order[np.minimum(starts[:,None] + offsets,nsite-1)]
+            scores = np.einsum('sk,sck->sc',tangents @ R.T,tangents[candidates])
+            best = np.argmax(scores,axis=1)
+            isMatch = (counts == 1) | ((counts > 1) & (scores[np.arange(nsite),best] > self.tangentCos))
+            #unmatched sites map onto themselves
+            sitePerms.append(np.where(isMatch,candidates[np.arange(nsite),best],np.arange(nsite)))
+        return orbitLabels(nsite,sitePerms)[0]
@@ -0,0 +1,274 @@
+"""
+Binary trajectory files for packer output
+Data file
+    header       - fixed size, see HEADER_FORMAT
+                     magic, version, coordinate item size, default atom count,
+                     number of symbols, symbol table capacity, offset of the
+                     first frame, lattice vectors (3x3 float64)
+    symbol table - symbolCapacity entries of 4 bytes, ascii
+    default codes- uint8 symbol table codes of the default atoms
+    frames       - (natoms,3) coordinates in float32 or float64, followed by
+                     natoms uint8 codes (padded to 8 bytes) only if the atoms
+                     differ from the default ones
+Index file (data file name + '.idx')
+    one INDEX_DTYPE record per frame: coordinate offset, atom count, and the
+    offset of the codes (0 for the default atoms)
+Frames are appended to the end of both files, and read back through np.memmap
+    with O(1) access to any frame
+"""
+import os
+import struct
+
+import numpy as np
+
+
+MAGIC = b'ADSTRAJ\x00'
+VERSION = 1
+#magic, version, itemsize, natoms, nsymbols, symbolCapacity, reserved, dataOffset, lattice
+HEADER_FORMAT = '<8s6IQ9d'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SYMBOL_SIZE = 4
+INDEX_DTYPE = np.dtype([('offset','<u8'),('natoms','<u8'),('codes','<u8')])
+
+
+class TrajectoryFormatError(Exception):
+    pass
+
+
+def _padded(nbytes,alignment=8):
+    return -(-nbytes//alignment)*alignment
+
+
+def _readHeader(handle):
+    raw = handle.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise TrajectoryFormatError("truncated trajectory header")
+    fields = struct.unpack(HEADER_FORMAT,raw)
+    if fields[0] != MAGIC:
+        raise TrajectoryFormatError("not a trajectory file")
+    if fields[1] != VERSION:
+        raise TrajectoryFormatError("unsupported trajectory version {}".format(fields[1]))
+    itemsize,natoms,nsymbols,capacity = fields[2:6]
+    dataOffset = fields[7]
+    lattice = np.array(fields[8:],dtype=float).reshape(3,3)
+    table = np.frombuffer(handle.read(capacity*SYMBOL_SIZE),dtype='S{}'.format(SYMBOL_SIZE))
+    symbols = [symbol.decode() for symbol in table[:nsymbols]]
+    codes = np.frombuffer(handle.read(natoms),dtype=np.uint8).copy()
+    header = {'dtype':np.dtype('<f{}'.format(itemsize)),
+              'natoms':natoms,
+              'symbolCapacity':capacity,
+              'dataOffset':dataOffset,
+              'lattice':lattice}
+    return header,symbols,codes
+
+
+class TrajectoryWriter(object):
+    """
+    Appends frames to a trajectory file
+    path           - the data file, the index goes to path + '.idx'
+    symbols        - the element symbols of the default frame, e.g.
+                        AdsorbatePacker.conformationSymbols()
+    lattice        - the (3,3) lattice vectors, rows a, b, c, zero if None
+    dtype          - np.float32 or np.float64, the coordinate precision
+    append         - if True and path exists, frames are added to it and
+                        symbols, lattice, and dtype are taken from the file
+    symbolCapacity - the maximum number of distinct symbols in the file
+    """
+    def __init__(self,path,symbols=None,lattice=None,dtype=np.float32,append=False,symbolCapacity=128):
+        super().__init__()
+        self.path = path
+        self.indexPath = path + '.idx'
+        self._handle = None
+        if append and os.path.exists(path):
+            self._handle = open(path,'r+b')
+            header,self.symbols,self.defaultCodes = _readHeader(self._handle)
+            self.dtype = header['dtype']
+            self.natoms = header['natoms']
+            self.symbolCapacity = header['symbolCapacity']
+            self.lattice = header['lattice']
+            self._symbolCodes = {symbol:code for code,symbol in enumerate(self.symbols)}
+            self._handle.seek(0,os.SEEK_END)
+            self._index = open(self.indexPath,'ab')
+        else:
+            if symbols is None:
+                raise ValueError("symbols are needed to create a trajectory")
+            self.dtype = np.dtype(dtype).newbyteorder('<')
+            if self.dtype.kind != 'f' or self.dtype.itemsize not in (4,8):
+                raise ValueError("coordinates are stored as float32 or float64")
+            self.symbols = []
+            #symbol -> symbol table code
+            self._symbolCodes = {}
+            self.symbolCapacity = symbolCapacity
+            self.defaultCodes = self._encode(symbols)
+            self.natoms = len(self.defaultCodes)
+            self.lattice = np.zeros((3,3)) if lattice is None else np.asarray(lattice,dtype=float).reshape(3,3)
+            self._handle = open(path,'w+b')
+            self._index = open(self.indexPath,'wb')
+            self._writeHeader()
+
+    def _headerBytes(self,dataOffset):
+        table = np.zeros(self.symbolCapacity,dtype='S{}'.format(SYMBOL_SIZE))
+        table[:len(self.symbols)] = [symbol.encode() for symbol in self.symbols]
+        return (struct.pack(HEADER_FORMAT,MAGIC,VERSION,self.dtype.itemsize,self.natoms,
+                            len(self.symbols),self.symbolCapacity,0,dataOffset,
+                            *self.lattice.ravel()) +
+                table.tobytes())
+
+    def _writeHeader(self):
+        headerSize = HEADER_SIZE + self.symbolCapacity*SYMBOL_SIZE + self.natoms
+        dataOffset = _padded(headerSize)
+        self._handle.seek(0)
+        self._handle.write(self._headerBytes(dataOffset))
+        self._handle.write(self.defaultCodes.tobytes())
+        self._handle.write(bytes(dataOffset - headerSize))
+
+    def _encode(self,symbols):
+        #uint8 symbol table codes of symbols, new symbols are added to the table
+        codes = np.empty(len(symbols),dtype=np.uint8)
+        table = self._symbolCodes
+        for i,symbol in enumerate(symbols):
+            symbol = str(symbol)
+            if symbol not in table:
+                if len(self.symbols) >= self.symbolCapacity:
+                    raise TrajectoryFormatError("symbol table is full")
+                if len(symbol.encode()) > SYMBOL_SIZE:
+                    raise TrajectoryFormatError("symbol {} is too long".format(symbol))
+                table[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+                if self._handle is not None:
+                    self._updateSymbolTable()
+            codes[i] = table[symbol]
+        return codes
+
+    def _updateSymbolTable(self):
+        #rewrite the symbol count and table in place
+        position = self._handle.tell()
+        self._handle.seek(0)
+        header = _readHeader(self._handle)[0]
+        self._handle.seek(0)
+        self._handle.write(self._headerBytes(header['dataOffset']))
+        self._handle.seek(position)
+
+    def write(self,coords,symbols=None):
+        #append frames
+        #input - coords: (natoms,3) array of one frame, or (k,natoms,3) of k frames
+        #        symbols: the element symbols of the frames, default symbols if None
+        coords = np.asarray(coords)
+        if coords.ndim == 2:
+            coords = coords[None]
+        nframe,natoms = coords.shape[:2]
+        codes = None
+        if symbols is not None:
+            if len(symbols) != natoms:
+                raise ValueError("{} symbols for frames of {} atoms".format(len(symbols),natoms))
+            codes = self._encode(symbols)
+            #frames of the default atoms are stored without their codes
+            if natoms == self.natoms and np.array_equal(codes,self.defaultCodes):
+                codes = None
+        elif natoms != self.natoms:
+            raise ValueError("frames of {} atoms need their symbols".format(natoms))
+
+        frameBytes = natoms*3*self.dtype.itemsize
+        codesBytes = 0 if codes is None else _padded(natoms)
+        start = self._handle.seek(0,os.SEEK_END)
+        records = np.zeros(nframe,dtype=INDEX_DTYPE)
+        records['offset'] = start + np.arange(nframe)*(frameBytes+codesBytes)
+        records['natoms'] = natoms
+        if codes is None:
+            #one contiguous block for the whole batch
+            self._handle.write(np.ascontiguousarray(coords,dtype=self.dtype).tobytes())
+        else:
+            records['codes'] = records['offset'] + frameBytes
+            codeBlock = np.zeros(codesBytes,dtype=np.uint8)
+            codeBlock[:natoms] = codes
+            for frame in coords:
+                self._handle.write(np.ascontiguousarray(frame,dtype=self.dtype).tobytes())
+                self._handle.write(codeBlock.tobytes())
+        self._index.write(records.tobytes())
+
+    def flush(self):
+        self._handle.flush()
+        self._index.flush()
+
+    def close(self):
+        self._handle.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*excInfo):
+        self.close()
+
+
+class TrajectoryReader(object):
+    """
+    Memory-mapped random access to the frames of a trajectory file
+    path - the data file, its index is read from path + '.idx'
+    """
+    def __init__(self,path):
+        super().__init__()
+        self.path = path
+        with open(path,'rb') as handle:
+            header,self.symbols,self.defaultCodes = _readHeader(handle)
+        self.dtype = header['dtype']
+        self.natoms = header['natoms']
+        self.lattice = header['lattice']
+        self._dataOffset = header['dataOffset']
+        self._data = np.memmap(path,dtype=np.uint8,mode='r')
+        if os.path.getsize(path + '.idx') > 0:
+            self.index = np.memmap(path + '.idx',dtype=INDEX_DTYPE,mode='r')
+        else:
+            self.index = np.zeros(0,dtype=INDEX_DTYPE)
+        self._symbolArray = np.array(self.symbols + [''])
+
+    def __len__(self):
+        return len(self.index)
+
+    def _frameCoords(self,i):
+        offset,natoms,codes = self.index[i]
+        nbytes = int(natoms)*3*self.dtype.itemsize
+        return self._data[offset:offset+nbytes].view(self.dtype).reshape(int(natoms),3)
+
+    def __getitem__(self,i):
+        #(natoms,3) read-only view of the coordinates of frame i
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("frame {} out of range".format(i))
+        return self._frameCoords(i)
+
+    def codes(self,i):
+        #uint8 symbol table codes of the atoms of frame i
+        offset,natoms,codes = self.index[i]
+        if codes == 0:
+            return self.defaultCodes
+        return np.asarray(self._data[codes:codes+natoms])
+
+    def frameSymbols(self,i):
+        #element symbols of the atoms of frame i
+        return self._symbolArray[self.codes(i)]
+
+    @property
+    def isUniform(self):
+        #whether every frame holds the default atoms, back to back
+        if len(self) == 0:
+            return True
+        frameBytes = self.natoms*3*self.dtype.itemsize
+        expected = self._dataOffset + np.arange(len(self),dtype=np.uint64)*frameBytes
+        return (bool((self.index['codes'] == 0).all()) and
+                np.array_equal(self.index['offset'],expected))
+
+    def frames(self):
+        #(n_frames,natoms,3) read-only memmap of all frames of a uniform file
+        if not self.isUniform:
+            raise TrajectoryFormatError("frames differ in size or atoms")
+        if len(self) == 0:
+            return np.empty((0,self.natoms,3),dtype=self.dtype)
+        return np.memmap(self.path,dtype=self.dtype,mode='r',offset=self._dataOffset,
+                         shape=(len(self),self.natoms,3))
+
+    def __iter__(self):
+        #yield (symbols,coords) of every frame
+        for i in range(len(self)):
+            yield self.frameSymbols(i),self._frameCoords(i)
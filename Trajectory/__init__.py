@@ -0,0 +1 @@
+from .Trajectory import TrajectoryWriter,TrajectoryReader
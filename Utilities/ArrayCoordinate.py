@@ -0,0 +1,20 @@
+"""
+A coordinate held in a numpy array that answers .x, .y, and .z like the
+    coordinates of HOLUDA data entries
+"""
+import numpy as np
+
+
+class ArrayCoordinate(np.ndarray):
+    #a (3,) array viewed as a coordinate, e.g. np.array(xyz).view(ArrayCoordinate)
+    @property
+    def x(self):
+        return float(self[0])
+
+    @property
+    def y(self):
+        return float(self[1])
+
+    @property
+    def z(self):
+        return float(self[2])
@@ -0,0 +1,177 @@
+"""
+Cell list (spatial hashing) utilities
+Points are binned into a uniform grid of cubic cells so that a distance query
+    only needs to look at the cells surrounding the query points
+"""
+import numpy as np
+
+
+class SpatialHash(object):
+    """
+    A uniform grid of cubic cells holding groups of points
+    Each group of points is stored under a key (e.g. an adsorbate instance)
+        so that it can be inserted, removed, or replaced as a whole
+    cellSize - the edge length of a cell, usually the largest query cutoff
+    """
+    def __init__(self,cellSize):
+        super().__init__()
+        self.cellSize = float(cellSize)
+        #cell index tuple -> {key: coordinates of the key's points in that cell}
+        self._cells = {}
+        #key -> list of the cell indices holding points of the key
+        self._keyCells = {}
+
+    def __contains__(self,key):
+        return key in self._keyCells
+
+    def __len__(self):
+        return len(self._keyCells)
+
+    def cellIndices(self,coords):
+        #the integer cell index of each point in coords
+        return np.floor(np.asarray(coords)/self.cellSize).astype(int)
+
+    def insert(self,key,coords):
+        #store coords under key, replacing whatever the key held before
+        #input - key: any hashable object
+        #        coords: (n,3) array-like of cartesian coordinates
+        if key in self._keyCells:
+            self.remove(key)
+        coords = np.asarray(coords,dtype=float).reshape(-1,3)
+        #group the points by cell
+        #   plain python is faster than numpy for the few atoms of an adsorbate
+        groups = {}
+        for n,cell in enumerate(map(tuple,self.cellIndices(coords).tolist())):
+            groups.setdefault(cell,[]).append(n)
+        for cell,members in groups.items():
+            self._cells.setdefault(cell,{})[key] = coords[members]
+        self._keyCells[key] = list(groups)
+
+    #synonym used when the points of a key have moved
+    update = insert
+
+    def remove(self,key):
+        #drop all points stored under key
+        for cell in self._keyCells.pop(key):
+            bucket = self._cells[cell]
+            del bucket[key]
+            if len(bucket) == 0:
+                del self._cells[cell]
+
+    def clear(self):
+        self._cells = {}
+        self._keyCells = {}
+
+    def neighbourCoords(self,coords,cutoff,exclude=None):
+        #gather the stored points in the cells within cutoff of coords
+        #input - coords: (n,3) array of query points
+        #        cutoff: the query distance
+        #        exclude: a key whose points are skipped
+        #output - (m,3) array of candidate points, a superset of the points
+        #           within cutoff of any query point
+        coords = np.asarray(coords,dtype=float).reshape(-1,3)
+        reach = int(np.ceil(cutoff/self.cellSize))
+        span = range(-reach,reach+1)
+        qcells = set(map(tuple,self.cellIndices(coords).tolist()))
+        ncells = {(cx+ox,cy+oy,cz+oz) for cx,cy,cz in qcells
+                  for ox in span for oy in span for oz in span}
+        found = []
+        for cell in ncells:
+            bucket = self._cells.get(cell)
+            if bucket is None:
+                continue
+            for key,pts in bucket.items():
+                if key is not exclude:
+                    found.append(pts)
+        if len(found) == 0:
+            return np.empty((0,3))
+        return np.concatenate(found)
+
+    def hasPointWithin(self,coords,cutoff,exclude=None):
+        #whether any stored point (except those of exclude) is closer than cutoff
+        #   to any of the query points
+        coords = np.asarray(coords,dtype=float).reshape(-1,3)
+        rest = self.neighbourCoords(coords,cutoff,exclude=exclude)
+        if len(rest) == 0:
+            return False
+        diff = coords[:,None,:] - rest[None,:,:]
+        dist2 = np.einsum('ijk,ijk->ij',diff,diff)
+        return bool((dist2 < cutoff**2).any())
+
+
+def neighbourPairs(coords,cutoff,shifts=None,allImages=False):
+    #all pairs of points closer than cutoff, found with a vectorized cell list
+    #input - coords: (n,3) array of points
+    #        cutoff: the pair distance
+    #        shifts: optional (s,3) array of periodic image translations,
+    #                   containing the zero shift and closed under negation
+    #        allImages: if True, every image of j within cutoff of i is
+    #                   paired, including the images of i itself (i == j)
+    #output - (i,j,shiftIndex,dist) arrays, one entry per pair i < j
+    #           coords[j] + shifts[shiftIndex] is the image of j nearest to i
+    #           pairs are sorted by i, then j (then shiftIndex for allImages)
+    coords = np.asarray(coords,dtype=float).reshape(-1,3)
+    if shifts is None:
+        shifts = np.zeros((1,3))
+    shifts = np.asarray(shifts,dtype=float).reshape(-1,3)
+    empty = (np.empty(0,dtype=np.int64),np.empty(0,dtype=np.int64),
+             np.empty(0,dtype=np.int64),np.empty(0))
+    npoint = len(coords)
+    if npoint < 2 or cutoff <= 0.:
+        return empty
+
+    #cell of every stored point and every image query point
+    queries = (coords[None,:,:] - shifts[:,None,:]).reshape(-1,3)
+    storeCells = np.floor(coords/cutoff).astype(np.int64)
+    queryCells = np.floor(queries/cutoff).astype(np.int64)
+    low = np.minimum(storeCells.min(axis=0),queryCells.min(axis=0)) - 1
+    dims = np.maximum(storeCells.max(axis=0),queryCells.max(axis=0)) - low + 2
+
+    def cellKeys(cells):
+        cells = cells - low
+        return (cells[...,0]*dims[1] + cells[...,1])*dims[2] + cells[...,2]
+
+    storeKeys = cellKeys(storeCells)
+    order = np.argsort(storeKeys,kind='stable')
+    sortedKeys = storeKeys[order]
+
+    pairI,pairJ,pairShift = [],[],[]
+    queryIndex = np.arange(len(queries))
+    for offset in np.array(np.meshgrid([-1,0,1],[-1,0,1],[-1,0,1],indexing='ij')).reshape(3,-1).T:
+        keys = cellKeys(queryCells + offset)
+        starts = np.searchsorted(sortedKeys,keys,side='left')
+        counts = np.searchsorted(sortedKeys,keys,side='right') - starts
+        total = counts.sum()
+        if total == 0:
+            continue
+        #expand the (start,count) ranges into one entry per candidate pair
+        q = np.repeat(queryIndex,counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts,counts)
+        pairJ.append(order[np.repeat(starts,counts) + within])
+        pairI.append(q % npoint)
+        pairShift.append(q // npoint)
+    if len(pairI) == 0:
+        return empty
+    i = np.concatenate(pairI)
+    j = np.concatenate(pairJ)
+    s = np.concatenate(pairShift)
+    if allImages:
+        keep = (i < j) | ((i == j) & (np.abs(shifts[s]).max(axis=1) > 0.))
+    else:
+        keep = i < j
+    i,j,s = i[keep],j[keep],s[keep]
+    #query coords[i] - shift matched coords[j], i.e. coords[j] + shift is near coords[i]
+    dvecs = coords[j] + shifts[s] - coords[i]
+    dist = np.sqrt(np.einsum('ij,ij->i',dvecs,dvecs))
+    keep = dist < cutoff
+    i,j,s,dist = i[keep],j[keep],s[keep],dist[keep]
+    if allImages:
+        sort = np.lexsort((s,j,i))
+        return i[sort],j[sort],s[sort],dist[sort]
+
+    #keep the nearest image of each pair
+    sort = np.lexsort((dist,j,i))
+    i,j,s,dist = i[sort],j[sort],s[sort],dist[sort]
+    first = np.ones(len(i),dtype=bool)
+    first[1:] = (i[1:] != i[:-1]) | (j[1:] != j[:-1])
+    return i[first],j[first],s[first],dist[first]
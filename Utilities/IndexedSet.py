@@ -0,0 +1,49 @@
+"""
+A set with O(1) insertion, removal, and random access by position
+Removal swaps the removed item with the last one, so the order of the
+    items is arbitrary
+"""
+
+
+class IndexedSet(object):
+    def __init__(self,items=()):
+        super().__init__()
+        #the stored items, in arbitrary order
+        self._items = []
+        #item -> its position in self._items
+        self._position = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self,item):
+        return item in self._position
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self,i):
+        return self._items[i]
+
+    def add(self,item):
+        if item not in self._position:
+            self._position[item] = len(self._items)
+            self._items.append(item)
+
+    def discard(self,item):
+        #swap-remove item if present
+        pos = self._position.pop(item,None)
+        if pos is None:
+            return
+        last = self._items.pop()
+        if pos < len(self._items):
+            self._items[pos] = last
+            self._position[last] = pos
+
+    def copy(self):
+        newSet = IndexedSet()
+        newSet._items = list(self._items)
+        newSet._position = dict(self._position)
+        return newSet
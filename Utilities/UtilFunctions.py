@@ -1,3 +1,5 @@
+from itertools import product
+
 import numpy as np
 import networkx as nx
 
@@ -64,3 +66,46 @@ def con2graph(cluster):
     return conGraph
 
 
+def latticeShifts(cell,pbc,reach=1):
+    #translation vectors from the home cell to its adjacent periodic images
+    #input - cell: (3,3) array whose rows are the lattice vectors a, b, c
+    #        pbc: 3 bools, whether the lattice is periodic along a, b, c
+    #        reach: the images up to reach cells away along each periodic
+    #                 direction are included
+    #output - (k,3) array of translations, the first one is the zero vector
+    steps = (0,) + tuple(sign*n for n in range(1,reach+1) for sign in (-1,1))
+    ranges = [steps if periodic else (0,) for periodic in pbc]
+    return np.array([np.dot(n,cell) for n in product(*ranges)],dtype=float)
+
+
+def minimumImage(vecs,cell,pbc):
+    #map displacement vectors onto their shortest periodic image
+    #input - vecs: (...,3) array of displacement vectors
+    #        cell, pbc: see latticeShifts
+    #output - array of the same shape as vecs
+    vecs = np.asarray(vecs,dtype=float)
+    if not any(pbc):
+        return vecs
+    periodic = np.array(pbc,dtype=bool)
+    frac = vecs @ np.linalg.inv(cell)
+    frac[...,periodic] -= np.round(frac[...,periodic])
+    reduced = frac @ cell
+
+    #rounding the fractional coordinates is exact only for orthogonal cells
+    #   for skewed cells (e.g. hexagonal 111 surfaces) the adjacent images
+    #   are checked as well
+    images = reduced[...,None,:] + latticeShifts(cell,pbc)
+    dist2 = np.einsum('...ij,...ij->...i',images,images)
+    nearest = np.argmin(dist2,axis=-1)
+    return np.take_along_axis(images,nearest[...,None,None],axis=-2)[...,0,:]
+
+
+def wrapCoordinates(coords,cell,pbc):
+    #translate coordinates into the home cell along the periodic directions
+    coords = np.asarray(coords,dtype=float)
+    if not any(pbc):
+        return coords
+    periodic = np.array(pbc,dtype=bool)
+    frac = coords @ np.linalg.inv(cell)
+    frac[...,periodic] -= np.floor(frac[...,periodic])
+    return frac @ cell
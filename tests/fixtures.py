@@ -0,0 +1,73 @@
+#doubles of the HOLUDA clusters and small substrates shared by the tests
+#   importing this module needs HOLUDA and CO2RRfragGen, skip them first
+import numpy as np
+
+from CO2RRfragGen.ActiveSite.MonodentateAS import MonodentateAS as MonoAS
+
+from ..ASGeneratorMixin.Monodentate import VEFASMixin
+from ..Adsorbate import Adsorbate,AdsorbateDistortor
+from ..SubstrateLattice.SubstrateLattice import SubstrateLattice
+
+
+class Element(object):
+    def __init__(self,symbol):
+        self.symbol = symbol
+
+
+class AtomEntry(object):
+    def __init__(self,symbol,coordinate):
+        self.atom = Element(symbol)
+        self.coordinate = None if coordinate is None else np.array(coordinate,dtype=float)
+
+
+class Cluster(object):
+    #the part of HOLUDA.Cluster used by adsorbates and substrates
+    #   entry 0 is the base of the cluster and is not iterated
+    def __init__(self,symbols,coords):
+        self.dataEntries = [AtomEntry('X',None)] + [AtomEntry(symbol,coord)
+                                                    for symbol,coord in zip(symbols,coords)]
+
+    def __iter__(self):
+        return iter(self.dataEntries[1:])
+
+    @property
+    def atomCount(self):
+        return len(self.dataEntries) - 1
+
+    def addConnection(self,atomA,atomB,bondOrder=1.):
+        pass
+
+    def subCluster(self,entries):
+        cluster = Cluster([],[])
+        cluster.dataEntries = self.dataEntries[:1] + list(entries)
+        return cluster
+
+
+class Lattice(SubstrateLattice,VEFASMixin):
+    def __init__(self,cluster,a,b,c,adjThresh=2.6,**kwargs):
+        SubstrateLattice.__init__(self,cluster,a=a,b=b,c=c,pbc=True,surfaceMode='coordination')
+        VEFASMixin.__init__(self,adjThresh=adjThresh,**kwargs)
+
+
+def fcc111(n,layers=3,d=2.55,**kwargs):
+    #an n x n cell of an fcc(111) slab, kwargs are passed to VEFASMixin
+    a1 = np.array([d,0.,0.])
+    a2 = np.array([d/2,d*np.sqrt(3)/2,0.])
+    stacking = [np.zeros(3),(a1+a2)/3,2*(a1+a2)/3]
+    coords = [i*a1 + j*a2 + stacking[l % 3] + [0.,0.,l*d*np.sqrt(2/3)]
+              for l in range(layers) for i in range(n) for j in range(n)]
+    return Lattice(Cluster(['Cu']*len(coords),coords),n*a1,n*a2,np.array([0.,0.,20.]),**kwargs)
+
+
+def jiggle(cmanip,scale,rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    for atomData in cmanip.cluster:
+        atomData.coordinate = np.array(atomData.coordinate) + rng.normal(0.,scale,3)
+
+
+def carbonMonoxide(siteType=MonoAS.V,name='CO',scale=0.1):
+    cluster = Cluster(['C','O'],[[0.,0.,1.],[0.,0.,2.15]])
+    distortor = AdsorbateDistortor(cluster)
+    distortor.addDistFunction(jiggle,(scale,))
+    return Adsorbate(MonoAS(siteType=siteType),cluster,name=name,distortionMethod=distortor)
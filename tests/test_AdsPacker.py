@@ -0,0 +1,121 @@
+import itertools
+
+import numpy as np
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from CO2RRfragGen.ActiveSite.MonodentateAS import MonodentateAS as MonoAS
+
+from ..AdsPacker import AdsorbatePacker
+from ..CoverageSolver import CoverageSolver
+from .fixtures import carbonMonoxide,fcc111
+
+
+@pytest.fixture(scope='module')
+def lattice():
+    return fcc111(4)
+
+
+def test_samplePacksReferenceGeometries(lattice,monkeypatch):
+    adsorbates = [carbonMonoxide() for _ in range(3)]
+    packer = AdsorbatePacker(lattice,adsorbates,seed=4)
+    packer.buildConflictGraph()
+    randomPacking = packer.randomPacking
+    distortedAtPacking = []
+    def checkedPacking(**kwargs):
+        distortedAtPacking.append(any(ads.isDistorted for ads in adsorbates))
+        return randomPacking(**kwargs)
+    monkeypatch.setattr(packer,'randomPacking',checkedPacking)
+
+    conformations = list(packer.sample(4,maxBacktrack=10))
+    assert len(conformations) == 4
+    #every packing starts from the reference geometries the conflict graph covers
+    assert distortedAtPacking == [False]*4
+    assert any(ads.isDistorted for ads in adsorbates)
+
+
+def test_coverageSolverMatchesBruteForce(lattice):
+    adsorbates = [carbonMonoxide(scale=0.)]
+    packer = AdsorbatePacker(lattice,adsorbates,seed=5,collisionThresh=2.0)
+    solver = CoverageSolver(packer)
+    weight,upperBound = solver.solve('exact',timeBudget=30.)
+    assert solver.isOptimal
+
+    nnode = len(solver.nodes)
+    best = 0
+    for chosen in itertools.product((0,1),repeat=nnode):
+        mask = sum(1 << k for k in range(nnode) if chosen[k])
+        if all(solver.adjacency[k] & mask == 0 for k in range(nnode) if chosen[k]):
+            best = max(best,sum(chosen))
+    assert weight == best
+
+    #the packing is applied without collisions, the caller's adsorbate is kept
+    assert len(solver.placed) == best
+    assert adsorbates[0] in packer.adsorbates
+    assert len(packer.adsorbates) == best
+    for ads in solver.placed:
+        assert not packer.hasCollision(ads)
+
+
+def test_conformationLeavesOutFreeAdsorbates(lattice):
+    #more adsorbates than fit, the solver leaves the rest free
+    adsorbates = [carbonMonoxide(scale=0.) for _ in range(8)]
+    packer = AdsorbatePacker(lattice,adsorbates,seed=6,collisionThresh=2.0)
+    solver = CoverageSolver(packer)
+    solver.solve('greedy')
+    nfree = sum(1 for ads in packer.adsorbates if ads.isFreeAdsorbate())
+    assert 0 < nfree < len(adsorbates)
+
+    coords = packer.conformationArray()
+    symbols = packer.conformationSymbols()
+    nsub = len(packer.substrate.absAtomCoordinate())
+    assert coords.shape == (nsub + 2*len(solver.placed),3)
+    assert len(symbols) == len(coords)
+    assert list(symbols[nsub:]) == ['C','O']*len(solver.placed)
+    placedCoords = np.concatenate([ads.absCoordinateArray() for ads in packer.adsorbates
+                                   if not ads.isFreeAdsorbate()])
+    assert np.array_equal(coords[nsub:],placedCoords)
+    assert len(packer.conformationSymbols(includeFree=True)) == nsub + 2*len(adsorbates)
+    assert len(packer.conformation()) == len(coords)
+
+
+def test_rebuildReproducesSampledRecords(lattice):
+    adsorbates = [carbonMonoxide() for _ in range(3)] + [carbonMonoxide(MonoAS.E,'HCCH')]
+    packer = AdsorbatePacker(lattice,adsorbates,seed=3)
+    for nTrials in (1,3):
+        records = packer.sampleRecords(5,maxBacktrack=10,nTrials=nTrials)
+        last = packer.conformationArray().copy()
+        assert np.array_equal(packer.rebuild(records[-1]),last)
+
+        forward = [packer.rebuild(rec).copy() for rec in records]
+        backward = [coords.copy() for symbols,coords in packer.reconstruct(records[::-1])][::-1]
+        for coords,other in zip(forward,backward):
+            assert np.array_equal(coords,other)
+        #the records hold distinct, distorted conformations
+        assert len({coords.tobytes() for coords in forward}) == len(records)
+
+
+def test_recordsWithFreeAdsorbates(lattice):
+    adsorbates = [carbonMonoxide() for _ in range(3)]
+    packer = AdsorbatePacker(lattice,adsorbates,seed=7)
+    full = packer.sampleRecords(2,maxBacktrack=10)
+    #the last adsorbate of the first conformation left free
+    packer.removeAdsorbate(adsorbates[2])
+    packer.seededConformation(11)
+    partial = packer.record(11)
+    expected = packer.conformationArray().copy()
+    assert partial['sites'][2] == -1
+    assert np.array_equal(packer.rebuild(partial),expected)
+
+    records = np.array([partial,full[0],full[1],partial],dtype=full.dtype)
+    yields = list(packer.reconstruct(records,batchSize=3))
+    #batches end where the placed adsorbates change
+    assert [len(coords) for symbols,coords in yields] == [1,2,1]
+    nsub = len(packer.substrate.absAtomCoordinate())
+    for (symbols,coords),nads in zip(yields,[2,3,2]):
+        assert len(symbols) == coords.shape[1] == nsub + 2*nads
+    assert np.array_equal(yields[0][1][0],expected)
+    assert np.array_equal(yields[2][1][0],expected)
+    assert yields[0][0] is yields[2][0]
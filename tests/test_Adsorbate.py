@@ -0,0 +1,106 @@
+import pickle
+
+import numpy as np
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from ..Adsorbate import AdsorbateDistortor
+from ..Utilities.ArrayCoordinate import ArrayCoordinate
+from .fixtures import Cluster,carbonMonoxide
+
+
+def placed(ads):
+    ads.origin = np.array([1.,2.,3.])
+    ads.normalDir = np.array([0.,0.,1.])
+    ads.tangentDir = np.array([0.,1.,0.])
+    return ads
+
+
+def test_geomChangedHasNoSideEffect():
+    ads = placed(carbonMonoxide())
+    reference = ads.relCoordinateArray().copy()
+    assert not ads.geomChanged
+    ads.distort(rng=np.random.default_rng(0))
+    #reading the flag, here or on the distortor, does not consume it
+    assert ads.geomChanged and ads.geomChanged
+    ads._cdistort.geomChanged
+    distorted = ads.relCoordinateArray()
+    assert not np.allclose(distorted,reference)
+    assert np.allclose(ads.absCoordinateArray(),distorted + [1.,2.,3.])
+    assert not ads.geomChanged
+
+    ads.undistort()
+    assert ads.geomChanged
+    assert np.array_equal(ads.relCoordinateArray(),reference)
+
+
+def test_adsorbatesPickledWithoutCachesLoad():
+    ads = placed(carbonMonoxide())
+    ads.distort(rng=np.random.default_rng(1))
+    expected = ads.absCoordinateArray().copy()
+    #as pickled before the coordinate caches existed
+    for name in ('_relCoords','_relCoordsVersion','_poseCoords'):
+        del ads.__dict__[name]
+    del ads._cdistort.__dict__['_version']
+
+    loaded = pickle.loads(pickle.dumps(ads))
+    assert np.array_equal(loaded.absCoordinateArray(),expected)
+    loaded.undistort()
+    assert loaded.geomChanged
+    assert not np.allclose(loaded.absCoordinateArray(),expected)
+
+
+def shift(cmanip,step,rng=None):
+    #moves the atoms in place, keeping their coordinate objects
+    for atomData in cmanip.cluster:
+        atomData.coordinate += step
+
+
+@pytest.mark.parametrize('inPlace',[True,False])
+def test_undoKeepsCoordinateObjects(inPlace):
+    ads = carbonMonoxide()
+    distortor = ads._cdistort
+    entries = list(ads.cluster)
+    for atomData in entries:
+        atomData.coordinate = atomData.coordinate.view(ArrayCoordinate)
+    if inPlace:
+        distortor._functions = []
+        distortor._fargs = []
+        distortor.addDistFunction(shift,(np.array([0.,0.,0.5]),))
+    objects = [atomData.coordinate for atomData in entries]
+    reference = np.array([atomData.coordinate for atomData in entries])
+
+    ads.distort(rng=np.random.default_rng(2))
+    distortor.trialCoordinates(3,rng=np.random.default_rng(3))
+    ads.undistort()
+    assert np.array_equal([atomData.coordinate for atomData in entries],reference)
+    ads.distort(rng=np.random.default_rng(4))
+    ads.resetGeometry()
+    for atomData,obj in zip(entries,objects):
+        assert atomData.coordinate.z == obj.z
+        if inPlace:
+            assert atomData.coordinate is obj
+
+
+def test_legacyDistortorPickleLoads():
+    ads = carbonMonoxide()
+    distortor = ads._cdistort
+    reference = distortor.coordinates()
+    ads.distort(rng=np.random.default_rng(5))
+    distorted = distortor.coordinates()
+    #the state of a distortor pickled before the coordinate buffers existed
+    legacy = AdsorbateDistortor.__new__(AdsorbateDistortor)
+    legacy.__dict__.update(cmanip=distortor.cmanip,_functions=distortor._functions,
+                           _fargs=distortor._fargs,_geomChanged=True,
+                           _last=Cluster(['C','O'],reference))
+
+    loaded = pickle.loads(pickle.dumps(legacy))
+    assert np.array_equal(loaded.coordinates(),distorted)
+    assert loaded.nApplied == 1
+    loaded.undo()
+    assert np.array_equal(loaded.coordinates(),reference)
+    loaded()
+    loaded.restoreReference()
+    assert np.array_equal(loaded.coordinates(),reference)
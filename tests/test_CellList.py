@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from ..Utilities.CellList import SpatialHash,neighbourPairs
+from ..Utilities.UtilFunctions import latticeShifts
+
+
+def bruteForcePairs(coords,cutoff,shifts,allImages):
+    #(i,j,shift index) -> distance of every pair found by checking all images
+    pairs = {}
+    for i in range(len(coords)):
+        for j in range(i,len(coords)):
+            dists = np.linalg.norm(coords[j] + shifts - coords[i],axis=1)
+            if allImages:
+                for s,dist in enumerate(dists):
+                    if dist < cutoff and (i < j or np.abs(shifts[s]).max() > 0.):
+                        pairs[(i,j,s)] = dist
+            elif i < j and dists.min() < cutoff:
+                pairs[(i,j,int(np.argmin(dists)))] = dists.min()
+    return pairs
+
+
+@pytest.mark.parametrize('pbc',[(False,False,False),(True,True,False),(True,True,True)])
+@pytest.mark.parametrize('allImages',[False,True])
+def test_neighbourPairsMatchBruteForce(pbc,allImages):
+    rng = np.random.default_rng(0)
+    cell = np.array([[7.,0.,0.],[2.,6.,0.],[0.,0.,8.]])
+    coords = rng.random((120,3)) @ cell
+    shifts = latticeShifts(cell,pbc)
+    i,j,shiftIndex,dist = neighbourPairs(coords,2.5,shifts=shifts,allImages=allImages)
+
+    expected = bruteForcePairs(coords,2.5,shifts,allImages)
+    found = dict(zip(zip(i.tolist(),j.tolist(),shiftIndex.tolist()),dist))
+    assert set(found) == set(expected)
+    for key,value in found.items():
+        assert value == pytest.approx(expected[key])
+    #sorted by i, then j
+    assert np.all(np.diff(i*len(coords) + j) >= 0)
+
+
+def test_neighbourPairsWithoutPairs():
+    i,j,shiftIndex,dist = neighbourPairs(np.zeros((1,3)),1.)
+    assert len(i) == len(j) == len(shiftIndex) == len(dist) == 0
+    i,j,shiftIndex,dist = neighbourPairs([[0.,0.,0.],[5.,0.,0.]],1.)
+    assert len(i) == 0
+
+
+def test_spatialHashFindsPointsWithinCutoff():
+    spatialHash = SpatialHash(1.5)
+    spatialHash.insert('a',[[0.,0.,0.],[3.,0.,0.]])
+    spatialHash.insert('b',[[10.,0.,0.]])
+    assert spatialHash.hasPointWithin([[1.,0.,0.]],1.2)
+    assert not spatialHash.hasPointWithin([[1.,0.,0.]],1.2,exclude='a')
+    assert spatialHash.hasPointWithin([[9.,0.,0.]],1.2,exclude='a')
+
+    spatialHash.update('b',[[20.,0.,0.]])
+    assert not spatialHash.hasPointWithin([[9.,0.,0.]],1.2)
+    spatialHash.remove('a')
+    assert 'a' not in spatialHash
+    assert len(spatialHash) == 1
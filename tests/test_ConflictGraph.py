@@ -0,0 +1,49 @@
+import itertools
+
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from CO2RRfragGen.ActiveSite.MonodentateAS import MonodentateAS as MonoAS
+
+from ..AdsPacker import AdsorbatePacker,AdsorbateHinderedException
+from ..Adsorbate import Adsorbate
+from .fixtures import Cluster,carbonMonoxide,fcc111
+
+
+def flatChain(name):
+    #three atoms lying along the tangent, reaching over the neighbouring sites
+    cluster = Cluster(['C','C','C'],[[0.,0.,1.],[0.,1.3,1.],[0.,2.6,1.]])
+    return Adsorbate(MonoAS(siteType=MonoAS.V),cluster,name=name)
+
+
+def hinderedPairs(packer):
+    #whether the second adsorbate is hindered, for every pair of vertex sites
+    hindered = []
+    first,second = packer.adsorbates
+    for siteA,siteB in itertools.permutations(packer.vsites,2):
+        packer.reset()
+        packer.placeAdsorbate(first,siteA)
+        try:
+            packer.placeAdsorbate(second,siteB)
+            hindered.append(False)
+        except AdsorbateHinderedException:
+            hindered.append(True)
+    packer.reset()
+    return hindered
+
+
+@pytest.mark.parametrize('names',[('CO','CCC'),('',''),('CO','CO')])
+def test_conflictGraphAgreesWithExactChecks(names):
+    lattice = fcc111(3)
+    #a shared label must not give the chain the conflicts of the small adsorbate
+    adsorbates = [carbonMonoxide(name=names[0],scale=0.),flatChain(names[1])]
+    exact = hinderedPairs(AdsorbatePacker(lattice,adsorbates,collisionThresh=1.5))
+    packer = AdsorbatePacker(lattice,adsorbates,collisionThresh=1.5)
+    packer.buildConflictGraph()
+    graph = packer.conflictGraph
+    assert any(exact) and not all(exact)
+    assert hinderedPairs(packer) == exact
+    assert graph.covers(adsorbates[0])
+    assert graph.covers(adsorbates[1]) == (names[0] != names[1])
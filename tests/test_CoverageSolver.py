@@ -0,0 +1,63 @@
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+from ..CoverageSolver import CoverageSolver
+
+
+class Packer(object):
+    #the packer attributes read by the search methods
+    def __init__(self,seed):
+        self.rng = np.random.default_rng(seed)
+
+
+def graphSolver(nnode,edges,weights,seed=0):
+    #a CoverageSolver searching a given conflict graph
+    solver = CoverageSolver.__new__(CoverageSolver)
+    solver.packer = Packer(seed)
+    solver.nodes = [(0,k) for k in range(nnode)]
+    solver.weights = list(weights)
+    solver.adjacency = [0]*nnode
+    for a,b in edges:
+        solver.adjacency[a] |= 1 << b
+        solver.adjacency[b] |= 1 << a
+    solver.allNodes = (1 << nnode) - 1
+    solver.bestNodes = 0
+    solver.bestWeight = 0.
+    return solver
+
+
+def bruteForceBest(nnode,edges,weights):
+    best = 0.
+    for chosen in itertools.product((0,1),repeat=nnode):
+        if all(not (chosen[a] and chosen[b]) for a,b in edges):
+            best = max(best,sum(w for c,w in zip(chosen,weights) if c))
+    return best
+
+
+def isIndependent(solver,mask):
+    return all(solver.adjacency[k] & mask == 0 for k in range(len(solver.nodes)) if (mask >> k) & 1)
+
+
+@pytest.mark.parametrize('seed',range(6))
+def test_solversAgainstBruteForce(seed):
+    rng = np.random.default_rng(seed)
+    nnode = 14
+    edges = [(a,b) for a in range(nnode) for b in range(a+1,nnode) if rng.random() < 0.25]
+    weights = rng.integers(1,4,nnode).astype(float)
+    best = bruteForceBest(nnode,edges,weights)
+    solver = graphSolver(nnode,edges,weights,seed)
+
+    assert solver.cliqueCoverBound(solver.allNodes) >= best - 1e-9
+    greedy = solver.greedy()
+    assert isIndependent(solver,greedy)
+    assert solver.weightOf(greedy) <= best + 1e-9
+    local = solver.localSearch(greedy,time.perf_counter() + 0.2,target=best)
+    assert isIndependent(solver,local)
+    assert solver.weightOf(local) >= solver.weightOf(greedy)
+
+    solver._branch(solver.allNodes,0,0.,time.perf_counter() + 10.)
+    assert isIndependent(solver,solver.bestNodes)
+    assert solver.bestWeight == pytest.approx(best)
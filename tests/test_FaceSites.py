@@ -0,0 +1,46 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from .fixtures import Cluster,Lattice,fcc111
+
+
+def squareSlab(n,layers=2,d=2.55):
+    coords = [[i*d,j*d,l*d] for l in range(layers) for i in range(n) for j in range(n)]
+    return Lattice(Cluster(['Cu']*len(coords),coords),np.array([n*d,0.,0.]),
+                   np.array([0.,n*d,0.]),np.array([0.,0.,20.]))
+
+
+def referenceFaces(lattice,edgePerFace):
+    #closed chordless cycles of the surface graph
+    cycles = [cycle for cycle in nx.chordless_cycles(lattice.surfaceConGraph,
+                                                     length_bound=max(edgePerFace))
+              if len(cycle) in edgePerFace]
+    return {frozenset(face) for face in lattice._closedFaces(cycles)}
+
+
+@pytest.mark.parametrize('makeLattice,edgePerFace,nface',
+                         [(lambda: fcc111(3),(3,),18),
+                          (lambda: fcc111(4),(3,4),32),
+                          (lambda: squareSlab(4),(3,4),16)])
+def test_findFacesMatchesChordlessCycles(makeLattice,edgePerFace,nface):
+    lattice = makeLattice()
+    faces = lattice.findFaces(edgePerFace)
+    assert len(faces) == len({frozenset(face) for face in faces}) == nface
+    assert {frozenset(face) for face in faces} == referenceFaces(lattice,edgePerFace)
+    #each face is listed in the order of its atoms
+    graph = lattice.surfaceConGraph
+    for face in faces:
+        assert all(graph.has_edge(face[k-1],face[k]) for k in range(len(face)))
+
+
+def test_faceSitesOfFcc111():
+    lattice = fcc111(3)
+    fsites = [site for site in lattice.sites if site.type == site.F]
+    #two hollows per surface atom, one site per face atom
+    assert len(fsites) == 3*18
+    origins = {tuple(np.round(lattice.wrap(site.origin),6)) for site in fsites}
+    assert len(origins) == 18
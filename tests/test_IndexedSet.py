@@ -0,0 +1,44 @@
+import random
+
+from ..Utilities.IndexedSet import IndexedSet
+
+
+def test_indexedSetBehavesLikeASet():
+    indexedSet = IndexedSet([3,1,3,2])
+    assert len(indexedSet) == 3
+    assert sorted(indexedSet) == [1,2,3]
+    assert 3 in indexedSet and 4 not in indexedSet
+
+    indexedSet.discard(1)
+    indexedSet.discard(4)
+    assert sorted(indexedSet) == [2,3]
+    assert sorted(indexedSet[i] for i in range(len(indexedSet))) == [2,3]
+
+
+def test_indexedSetStaysConsistentUnderRandomEdits():
+    rng = random.Random(0)
+    indexedSet = IndexedSet()
+    reference = set()
+    for step in range(2000):
+        item = rng.randrange(50)
+        if rng.random() < 0.5:
+            indexedSet.add(item)
+            reference.add(item)
+        else:
+            indexedSet.discard(item)
+            reference.discard(item)
+        assert len(indexedSet) == len(reference)
+    assert set(indexedSet) == reference
+    #positions address every item exactly once
+    assert {indexedSet[i] for i in range(len(indexedSet))} == reference
+    for item in reference:
+        assert indexedSet[indexedSet._position[item]] == item
+
+
+def test_indexedSetCopyIsIndependent():
+    indexedSet = IndexedSet(range(5))
+    copied = indexedSet.copy()
+    copied.discard(0)
+    copied.add(9)
+    assert sorted(indexedSet) == [0,1,2,3,4]
+    assert sorted(copied) == [1,2,3,4,9]
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from CO2RRfragGen.ActiveSite.MonodentateAS import MonodentateAS as MonoAS
+
+from ..AdsPacker import AdsorbatePacker
+from ..MonteCarlo import DistancePairEnergy,MonteCarlo
+from .fixtures import carbonMonoxide,fcc111
+
+
+def test_grandCanonicalCoverageFollowsLangmuir():
+    #independent vertex sites, two species competing for them
+    #   the coverage of species s is K_s/(1 + sum K), K_s = exp((mu_s - e_s)/kT)
+    lattice = fcc111(3,adjThresh=1.)
+    nsite = sum(1 for site in lattice.sites if site.type == MonoAS.V)
+    kT = 1.
+    mu = {'CO':0.,'NO':-0.5}
+    siteEnergies = {('CO',MonoAS.V):-0.2,('NO',MonoAS.V):0.3}
+    #reservoirs of different sizes, the selection must not depend on them
+    adsorbates = ([carbonMonoxide(name='CO',scale=0.) for _ in range(nsite)] +
+                  [carbonMonoxide(name='NO',scale=0.) for _ in range(3*nsite)])
+    packer = AdsorbatePacker(lattice,adsorbates,collisionThresh=1.,seed=0)
+    model = DistancePairEnergy(lambda nameA,nameB,distance: 0.,cutoff=0.,
+                               siteEnergies=siteEnergies)
+    montecarlo = MonteCarlo(packer,model,kT=kT,mu=mu,
+                            moveWeights={'insert':1.,'delete':1.})
+
+    counts = {name:0 for name in mu}
+    nSteps = 10000
+    montecarlo.run(1000)
+    for step in range(nSteps):
+        montecarlo.step()
+        for ads in packer.occupiedAdsorbates:
+            counts[ads.name] += 1
+
+    K = {name:np.exp((mu[name] - siteEnergies[(name,MonoAS.V)])/kT) for name in mu}
+    for name in mu:
+        expected = K[name]/(1. + sum(K.values()))
+        assert counts[name]/(nSteps*nsite) == pytest.approx(expected,abs=0.03)
+    assert montecarlo.energy == pytest.approx(montecarlo.totalEnergy())
@@ -0,0 +1,43 @@
+import itertools
+
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from ..AdsPacker import AdsorbatePacker,AdsorbateHinderedException
+from ..PackingEnumerator import PackingEnumerator
+from .fixtures import carbonMonoxide,fcc111
+
+
+def bruteForceFingerprints(packer,enumerator,symmetric):
+    #keys of every packing of the adsorbates onto distinct vertex sites
+    keys = set()
+    vertices = [i for i,site in enumerate(packer.sites) if site.type == site.V]
+    for chosen in itertools.combinations(vertices,len(packer.adsorbates)):
+        if any(enumerator.exclusion[i] >> j & 1 for i,j in itertools.combinations(chosen,2)):
+            continue
+        packer.reset()
+        try:
+            for ads,i in zip(packer.adsorbates,chosen):
+                packer.placeAdsorbate(ads,packer.sites[i])
+        except AdsorbateHinderedException:
+            continue
+        keys.add(packer.fingerprint() if symmetric else frozenset(chosen))
+    packer.reset()
+    return keys
+
+
+@pytest.mark.parametrize('symmetric',[True,False])
+def test_enumeratorYieldsEachInequivalentPackingOnce(symmetric):
+    packer = AdsorbatePacker(fcc111(4),[carbonMonoxide(scale=0.) for _ in range(3)])
+    enumerator = PackingEnumerator(packer,symmetric=symmetric)
+    keys = []
+    for packing in enumerator:
+        assert len(packing) == 3
+        keys.append(packer.fingerprint() if symmetric
+                    else frozenset(packer.siteIndex[site] for site,ads in packing))
+    assert len(keys) == len(set(keys))
+    assert set(keys) == bruteForceFingerprints(packer,enumerator,symmetric)
+    assert enumerator.count() == len(keys)
+    assert len(packer.siteOccupation) == 0
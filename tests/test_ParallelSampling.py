@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from ..AdsPacker import AdsorbatePacker
+from ..ParallelSampling import parallelSample
+from .fixtures import carbonMonoxide,fcc111
+
+
+@pytest.fixture(scope='module')
+def packer():
+    return AdsorbatePacker(fcc111(4),[carbonMonoxide() for _ in range(3)],seed=0)
+
+
+def sampled(packer,seed,nWorkers):
+    chunks = list(parallelSample(packer,7,seed=seed,nWorkers=nWorkers,chunkSize=2,
+                                 maxBacktrack=10))
+    assert [len(coords) for symbols,coords in chunks] == [2,2,2,1]
+    return np.concatenate([coords for symbols,coords in chunks])
+
+
+def test_parallelSampleDependsOnlyOnTheSeed(packer):
+    globalState = np.random.get_state()[1].copy()
+    serial = sampled(packer,11,0)
+    assert np.array_equal(sampled(packer,11,0),serial)
+    assert np.array_equal(sampled(packer,11,2),serial)
+    assert not np.array_equal(sampled(packer,12,0),serial)
+    #the conformations are distorted and differ between chunks
+    assert len({coords.tobytes() for coords in serial}) == len(serial)
+    #the global random state is left alone
+    assert np.array_equal(np.random.get_state()[1],globalState)
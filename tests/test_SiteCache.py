@@ -0,0 +1,121 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+#the site classes are imported under the package name used by the mixins
+pytest.importorskip('CO2RRfragGen')
+
+from CO2RRfragGen.ActiveSite.MonodentateAS import MonodentateAS as MonoAS
+
+from ..ASGeneratorMixin import SiteCache
+from ..ASGeneratorMixin.SiteCache import loadSites,saveSites,siteCacheKey
+
+
+class Element(object):
+    def __init__(self,symbol):
+        self.symbol = symbol
+
+
+class AtomEntry(object):
+    #stands in for a cluster data entry
+    def __init__(self,symbol,coordinate):
+        self.atom = Element(symbol)
+        self.coordinate = np.array(coordinate,dtype=float)
+
+
+class Substrate(object):
+    #the attributes of a SubstrateLattice the cache reads and writes
+    def __init__(self,atoms,surface,surfaceConGraph,surfaceMode='flat'):
+        self.atoms = atoms
+        self.surface = surface
+        self.surfaceConGraph = surfaceConGraph
+        self.surfaceMode = surfaceMode
+        self.cell = np.diag([6.,6.,20.])
+        self.pbc = (True,True,False)
+        self.sites = []
+        self.siteAdjacency = nx.Graph()
+
+    def absAtomCoordinate(self):
+        return [(atom.atom,atom.coordinate) for atom in self.atoms]
+
+
+def makeSubstrate(surfaceMode='flat',withBonds=True):
+    atoms = [AtomEntry('Cu',(x,y,z)) for z in (0.,2.) for x in (0.,3.) for y in (0.,3.)]
+    surface = atoms[4:]
+    graph = nx.Graph()
+    graph.add_nodes_from(surface)
+    if withBonds:
+        graph.add_edges_from([(surface[0],surface[1]),(surface[1],surface[3]),(surface[2],surface[3])])
+    return Substrate(atoms,surface,graph,surfaceMode)
+
+
+def test_savedSitesLoadEqual(tmp_path):
+    substrate = makeSubstrate()
+    surface = substrate.surface
+    substrate.sites = [MonoAS(siteType=MonoAS.V,origin=(0.,0.,3.),boundAtoms=[surface[0]]),
+                       MonoAS(siteType=MonoAS.E,origin=(0.,1.5,3.),tangentDir=(0.,-1.,0.),
+                              boundAtoms=[surface[0],surface[1]]),
+                       MonoAS(siteType=MonoAS.F,origin=(1.,1.,3.),normalDir=(0.,0.6,0.8),
+                              tangentDir=(1.,0.,0.),boundAtoms=surface[:3])]
+    substrate.sites[0].orbit = 0
+    substrate.sites[2].orbit = 5
+    substrate.siteAdjacency.add_nodes_from(substrate.sites)
+    substrate.siteAdjacency.add_edges_from([(substrate.sites[0],substrate.sites[1]),
+                                            (substrate.sites[1],substrate.sites[2])])
+    path = str(tmp_path/'sites.npz')
+    saveSites(path,substrate)
+    assert [p.name for p in tmp_path.iterdir()] == ['sites.npz']
+
+    loaded = makeSubstrate()
+    loaded.surface = surface
+    sites = loadSites(path,loaded)
+    assert loaded.sites == sites
+    for site,other in zip(substrate.sites,sites):
+        assert other.type == site.type
+        assert np.array_equal(other.origin,site.origin)
+        assert np.array_equal(other.normalDir,site.normalDir)
+        assert np.array_equal(other.tangentDir,site.tangentDir)
+        assert other.boundAtoms == site.boundAtoms
+        assert other.orbit == site.orbit
+    index = {site:n for n,site in enumerate(sites)}
+    assert {frozenset((index[a],index[b])) for a,b in loaded.siteAdjacency.edges()} == \
+           {frozenset((0,1)),frozenset((1,2))}
+
+
+def test_siteCacheKeyFollowsSubstrateAndParameters(monkeypatch):
+    params = {'adjThresh':1.0}
+    key = siteCacheKey(makeSubstrate(),params)
+    assert key == siteCacheKey(makeSubstrate(),dict(params))
+    assert key != siteCacheKey(makeSubstrate(),{'adjThresh':1.5})
+    moved = makeSubstrate()
+    moved.atoms[0].coordinate = moved.atoms[0].coordinate + 0.01
+    assert key != siteCacheKey(moved,params)
+    #the same slab with a surface detected or bonded differently
+    assert key != siteCacheKey(makeSubstrate(surfaceMode='coordination'),params)
+    assert key != siteCacheKey(makeSubstrate(withBonds=False),params)
+
+    #a new cache version invalidates every file
+    monkeypatch.setattr(SiteCache,'CACHE_VERSION',SiteCache.CACHE_VERSION + 1)
+    assert key != siteCacheKey(makeSubstrate(),params)
+
+
+def test_latticeReusesCachedSitesOfTheSameVersion(tmp_path,monkeypatch,capsys):
+    pytest.importorskip('HOLUDA')
+    from .fixtures import fcc111
+    fresh = fcc111(3,cacheDir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+    capsys.readouterr()
+
+    cached = fcc111(3,cacheDir=str(tmp_path))
+    assert "Loading cached AS" in capsys.readouterr().out
+    assert len(cached.sites) == len(fresh.sites)
+    for site,other in zip(fresh.sites,cached.sites):
+        assert other.type == site.type
+        assert np.allclose(other.origin,site.origin)
+        assert np.allclose(other.tangentDir,site.tangentDir)
+    assert cached.siteAdjacency.number_of_edges() == fresh.siteAdjacency.number_of_edges()
+
+    monkeypatch.setattr(SiteCache,'CACHE_VERSION',SiteCache.CACHE_VERSION + 1)
+    fcc111(3,cacheDir=str(tmp_path))
+    assert "Loading cached AS" not in capsys.readouterr().out
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('CO2RRfragGen')
+
+from ..ASGeneratorMixin.ASMixin import ASMixin
+
+
+def test_findNormalsMatchesLeastSingularVector():
+    rng = np.random.default_rng(0)
+    pdir = np.array([0.2,-0.1,1.])
+    vecSets = [rng.normal(size=(size,3)) for size in (3,4,4,5,6,3,7)]
+    normals = ASMixin.findNormals(vecSets,positiveDirection=pdir)
+    for vecs,normal in zip(vecSets,normals):
+        expected = np.linalg.svd(vecs)[2][-1]
+        expected *= np.sign(expected @ pdir)
+        assert normal == pytest.approx(expected,abs=1e-8)
+
+
+def test_findNormalsOfDegenerateSets():
+    pdir = np.array([0.,0.,1.])
+    sets = [np.array([[1.,0.,0.]]),
+            np.array([[2.,0.,0.],[0.,1.,0.]]),
+            np.array([[1.,0.,0.],[-1.,0.,0.]]),
+            np.array([[1.,0.,1.],[-1.,0.,-1.],[2.,0.,2.]])]
+    normals = ASMixin.findNormals(sets,positiveDirection=pdir)
+    #too few vectors, or two collinear ones, give positiveDirection
+    assert normals[0] == pytest.approx(pdir)
+    assert normals[1] == pytest.approx([0.,0.,1.])
+    assert normals[2] == pytest.approx(pdir)
+    #collinear sets give the direction perpendicular to them closest to it
+    assert normals[3] == pytest.approx([-np.sqrt(0.5),0.,np.sqrt(0.5)])
+    assert np.linalg.norm(normals,axis=1) == pytest.approx(np.ones(4))
+
+
+def test_findNormalsConeAxis():
+    #an adatom standing on three atoms below it, on a cone around z
+    vecs = np.array([[np.cos(t),np.sin(t),-1.] for t in 2*np.pi*np.arange(3)/3])
+    #the plane fit misses the axis
+    fitted = ASMixin.findNormals([vecs],positiveDirection=(0.,0.,1.))[0]
+    assert abs(fitted[2]) < 1e-8
+    axis = ASMixin.findNormals([vecs],positiveDirection=(0.3,0.,1.),coneAxis=True)[0]
+    assert axis == pytest.approx([0.,0.,1.])
+
+
+def test_siteGeometryOfFlatSurface():
+    pytest.importorskip('HOLUDA')
+    from .fixtures import fcc111
+    lattice = fcc111(3)
+    z = np.array([0.,0.,1.])
+    for site in lattice.sites:
+        bound = np.array([np.array(atom.coordinate) for atom in site.boundAtoms])
+        bound = bound[0] + lattice.minimumImage(bound - bound[0])
+        center = bound.mean(axis=0)
+        assert site.normalDir == pytest.approx(z,abs=1e-8)
+        assert site.origin == pytest.approx(center + z,abs=1e-8)
+        assert np.linalg.norm(site.tangentDir) == pytest.approx(1.)
+        assert abs(site.tangentDir @ z) < 1e-8
+        if site.type == site.E:
+            bond = (bound[0] - bound[1])/np.linalg.norm(bound[0] - bound[1])
+            assert abs(site.tangentDir @ bond) == pytest.approx(1.)
+
+
+def rippledFcc111(n,shift,d=2.55,height=0.3):
+    #an n x n fcc(111) slab whose top layer ripples along a, translated by
+    #   shift and wrapped back into the cell
+    from .fixtures import Cluster,Lattice
+    a1 = np.array([d,0.,0.])
+    a2 = np.array([d/2,d*np.sqrt(3)/2,0.])
+    stacking = [np.zeros(3),(a1+a2)/3,2*(a1+a2)/3]
+    coords = np.array([i*a1 + j*a2 + stacking[l] + [0.,0.,l*d*np.sqrt(2/3)]
+                       for l in range(3) for i in range(n) for j in range(n)])
+    coords[2*n*n:,2] += height*np.cos(2*np.pi*np.repeat(np.arange(n),n)/n)
+    cell = np.array([n*a1,n*a2,[0.,0.,20.]])
+    frac = (coords + shift) @ np.linalg.inv(cell)
+    frac[:,:2] %= 1.
+    return Lattice(Cluster(['Cu']*len(coords),frac @ cell),*cell)
+
+
+def test_atomNormalsDoNotDependOnTheCellBoundary():
+    pytest.importorskip('HOLUDA')
+    def normalsByPosition(shift):
+        lattice = rippledFcc111(3,shift)
+        normals = {}
+        for atom,normal in lattice.surfaceAtomNormals().items():
+            frac = (np.array(atom.coordinate) - shift) @ np.linalg.inv(lattice.cell)
+            frac[:2] = np.round(frac[:2],5) % 1.
+            normals[tuple(np.round(frac,4))] = normal
+        return normals
+    #the translation moves other atoms onto the cell boundary
+    normals = normalsByPosition(np.zeros(3))
+    shifted = normalsByPosition(np.array([4.,2.,0.]))
+    assert len(normals) == 9
+    assert normals.keys() == shifted.keys()
+    for position,normal in normals.items():
+        assert shifted[position] == pytest.approx(normal,abs=1e-8)
+    #the crests of the ripple are level
+    crests = [normal for position,normal in normals.items() if position[0] == 0.2222]
+    assert len(crests) == 3
+    for normal in crests:
+        assert normal == pytest.approx([0.,0.,1.],abs=1e-8)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from ..SubstrateLattice.Supercell import tileSubstrate
+from .fixtures import fcc111
+
+
+def siteKey(lattice,site):
+    #type, fractional origin in the cell, normal, and tangent of a site
+    frac = np.asarray(site.origin,dtype=float) @ np.linalg.inv(lattice.cell)
+    frac[:2] = np.round(frac[:2],5) % 1.
+    return ((site.type.value,) + tuple(np.round(frac,4)) + tuple(np.round(site.normalDir,4))
+            + tuple(np.round(site.tangentDir,4)))
+
+
+@pytest.mark.parametrize('ncell,ntile',[(3,2),(3,1),(4,2)])
+def test_tiledSitesMatchDirectGeneration(ncell,ntile):
+    direct = fcc111(ncell*ntile)
+    tiled = tileSubstrate(fcc111(ncell),ntile,ntile)
+    assert np.allclose(tiled.cell,direct.cell)
+    assert len(tiled.sites) == len(direct.sites)
+    directKeys = [siteKey(direct,site) for site in direct.sites]
+    tiledKeys = [siteKey(tiled,site) for site in tiled.sites]
+    assert sorted(tiledKeys) == sorted(directKeys)
+    assert len(set(tiledKeys)) == len(tiledKeys)
+
+    def edgeKeys(lattice,keys):
+        index = dict(zip(lattice.sites,keys))
+        return {frozenset((index[siteA],index[siteB])) for siteA,siteB in lattice.siteAdjacency.edges()}
+    assert edgeKeys(tiled,tiledKeys) == edgeKeys(direct,directKeys)
+    assert tiled.siteAdjacency.number_of_edges() == direct.siteAdjacency.number_of_edges()
+
+    #the tiled atoms are those of the direct supercell
+    directCoords = np.array([coord for atom,coord in direct.absAtomCoordinate()],dtype=float)
+    tiledCoords = np.array([coord for atom,coord in tiled.absAtomCoordinate()],dtype=float)
+    def fractional(coords):
+        frac = coords @ np.linalg.inv(direct.cell)
+        frac[:,:2] = np.round(frac[:,:2],5) % 1.
+        return sorted(map(tuple,np.round(frac,4)))
+    assert fractional(tiledCoords) == fractional(directCoords)
+
+
+@pytest.mark.parametrize('ncell',[1,2])
+def test_cellsTooSmallForTheirSitesAreRejected(ncell):
+    #their bond graph merges the bonds to different images of an atom
+    with pytest.raises(ValueError):
+        tileSubstrate(fcc111(ncell),3,3)
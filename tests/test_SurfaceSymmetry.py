@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from .fixtures import fcc111
+
+
+def environment(lattice,coords,point,nearest=12):
+    #sorted distances from point to its nearest atoms, over periodic images
+    dists = np.linalg.norm(lattice.minimumImage(coords - point),axis=1)
+    return tuple(np.round(np.sort(dists)[:nearest],4))
+
+
+def siteEnvironment(lattice,coords,site):
+    #environments of the origin and of a point along the tangent, so that
+    #   the orientation of the site counts
+    return (site.type,environment(lattice,coords,site.origin),
+            environment(lattice,coords,np.asarray(site.origin) + site.tangentDir))
+
+
+def test_siteOrbitsGroupEquivalentSites():
+    lattice = fcc111(3,useSymmetry=True)
+    coords = np.array([coord for atom,coord in lattice.absAtomCoordinate()],dtype=float)
+    assert lattice.surfaceSymmetry.norbit == 1
+    orbits = {}
+    for site in lattice.sites:
+        assert site.orbit is not None
+        orbits.setdefault(site.orbit,set()).add(siteEnvironment(lattice,coords,site))
+    #every site of an orbit has the same surroundings
+    for environments in orbits.values():
+        assert len(environments) == 1
+    #the fcc and hcp hollows differ by the atoms below them
+    hollows = {site.orbit for site in lattice.sites if site.type == site.F}
+    assert len(hollows) == 2
+
+
+def test_symmetryGivesTheSameSites():
+    plain = fcc111(3)
+    symmetric = fcc111(3,useSymmetry=True)
+    assert len(plain.sites) == len(symmetric.sites)
+    for site,other in zip(plain.sites,symmetric.sites):
+        assert other.type == site.type
+        assert other.origin == pytest.approx(site.origin,abs=1e-8)
+        assert other.normalDir == pytest.approx(site.normalDir,abs=1e-8)
+        assert other.tangentDir == pytest.approx(site.tangentDir,abs=1e-8)
+    assert all(site.orbit is None for site in plain.sites)
@@ -0,0 +1,56 @@
+import itertools
+
+import numpy as np
+import pytest
+
+pytest.importorskip('HOLUDA')
+pytest.importorskip('CO2RRfragGen')
+
+from CO2RRfragGen.ActiveSite.MonodentateAS import MonodentateAS as MonoAS
+
+from ..AdsPacker import AdsorbatePacker,AdsorbateHinderedException
+from ..Adsorbate import Adsorbate
+from .fixtures import Cluster,carbonMonoxide,fcc111
+
+
+def bentAdsorbate():
+    cluster = Cluster(['C','O'],[[0.,0.,1.],[0.,1.,1.7]])
+    return Adsorbate(MonoAS(siteType=MonoAS.V),cluster,name='COO')
+
+
+def pairInvariant(packer,adsorbates):
+    #sorted minimum image distances between the atoms of two adsorbates
+    coordsA,coordsB = [ads.absCoordinateArray() for ads in adsorbates]
+    vecs = packer.substrate.minimumImage((coordsB[None,:,:] - coordsA[:,None,:]).reshape(-1,3))
+    return tuple(np.round(np.sort(np.linalg.norm(vecs,axis=1)),3))
+
+
+def fingerprintClasses(packer):
+    #fingerprint -> invariants of every pair of vertex sites
+    classes = {}
+    for siteA,siteB in itertools.combinations(packer.vsites,2):
+        packer.reset()
+        try:
+            packer.placeAdsorbate(packer.adsorbates[0],siteA)
+            packer.placeAdsorbate(packer.adsorbates[1],siteB)
+        except AdsorbateHinderedException:
+            continue
+        classes.setdefault(packer.fingerprint(),set()).add(pairInvariant(packer,packer.adsorbates))
+    return classes
+
+
+@pytest.mark.parametrize('makeAdsorbate',[bentAdsorbate,lambda: carbonMonoxide(scale=0.)])
+def test_fingerprintsOnlyMergeEquivalentPackings(makeAdsorbate):
+    lattice = fcc111(3)
+    packer = AdsorbatePacker(lattice,[makeAdsorbate(),makeAdsorbate()],collisionThresh=1.)
+    classes = fingerprintClasses(packer)
+    assert len(classes) > 1
+    for invariants in classes.values():
+        assert len(invariants) == 1
+    nvertex = len(packer.vsites)
+    if packer.siteSymmetry.vertexTangents:
+        #a bent adsorbate is only mapped onto itself by translations
+        assert len(packer.siteSymmetry) == nvertex
+    else:
+        #an axial one is mapped by the rotations about its site as well
+        assert len(packer.siteSymmetry) > nvertex
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from ..Trajectory import TrajectoryReader,TrajectoryWriter
+from ..Trajectory.Trajectory import TrajectoryFormatError
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path/'traj.bin')
+
+
+def test_trajectoryRoundTrip(path):
+    rng = np.random.default_rng(1)
+    symbols = ['Cu']*4 + ['C','O']
+    lattice = np.diag([5.,6.,20.])
+    frames = rng.random((7,6,3))
+    with TrajectoryWriter(path,symbols,lattice=lattice,dtype=np.float64) as writer:
+        writer.write(frames[0])
+        writer.write(frames[1:])
+
+    reader = TrajectoryReader(path)
+    assert len(reader) == 7
+    assert reader.isUniform
+    assert np.array_equal(reader.lattice,lattice)
+    assert np.array_equal(reader.frames(),frames)
+    assert np.array_equal(reader[-1],frames[-1])
+    for frameSymbols,coords in reader:
+        assert frameSymbols.tolist() == symbols
+    with pytest.raises(IndexError):
+        reader[7]
+
+
+def test_trajectoryVariableAtomCounts(path):
+    rng = np.random.default_rng(2)
+    symbols = ['Cu','Cu','C','O']
+    frames = [(symbols,rng.random((4,3))),
+              (['Cu','Cu','C','O','H'],rng.random((5,3))),
+              (['Cu','H','C','O'],rng.random((4,3))),
+              (['Cu','Cu','C'],rng.random((3,3))),
+              (symbols,rng.random((4,3)))]
+    with TrajectoryWriter(path,symbols) as writer:
+        for frameSymbols,coords in frames:
+            writer.write(coords,symbols=frameSymbols)
+
+    reader = TrajectoryReader(path)
+    assert len(reader) == len(frames)
+    assert not reader.isUniform
+    for i,(frameSymbols,coords) in enumerate(frames):
+        assert reader.frameSymbols(i).tolist() == frameSymbols
+        assert np.allclose(reader[i],coords,atol=1e-6)
+    with pytest.raises(TrajectoryFormatError):
+        reader.frames()
+
+
+def test_trajectoryAppend(path):
+    rng = np.random.default_rng(3)
+    first,second = rng.random((2,3)),rng.random((2,3))
+    with TrajectoryWriter(path,['C','O']) as writer:
+        writer.write(first)
+    with TrajectoryWriter(path,append=True) as writer:
+        writer.write(second,symbols=['N','O'])
+    reader = TrajectoryReader(path)
+    assert len(reader) == 2
+    assert reader.frameSymbols(1).tolist() == ['N','O']
+    assert np.allclose(reader[1],second,atol=1e-6)
+
+
+def test_trajectoryChecksSymbolCount(path):
+    with TrajectoryWriter(path,['C','O']) as writer:
+        with pytest.raises(ValueError):
+            writer.write(np.zeros((3,3)))
+        with pytest.raises(ValueError):
+            writer.write(np.zeros((3,3)),symbols=['C','O'])
+        with pytest.raises(ValueError):
+            writer.write(np.zeros((2,3)),symbols=['C'])